@@ -0,0 +1,191 @@
+"""
+Circuit breaker for the LLM API, shared by every worker through Redis.
+
+The router records the outcome and latency of each call (after fallbacks).
+Over the last LLM_BREAKER_WINDOW calls, once at least LLM_BREAKER_MIN_CALLS
+are in, the circuit opens when either:
+- the error rate reaches LLM_BREAKER_ERROR_RATE, or
+- the mean latency reaches LLM_BREAKER_SLOW_S.
+While open, `is_open()` is True: workers stop taking work (or, with
+LLM_FALLBACK=heuristic, classify it locally, see app.ai.heuristics), and
+router calls fail fast.
+
+After LLM_BREAKER_OPEN_S the circuit is half-open. The router's `allow()`
+hands the probe to one call, in one thread of one process; `is_open()` stays
+True for everyone else while it is out. The probe call closes the circuit if
+it succeeds in time, or reopens it with the open time doubled (up to
+LLM_BREAKER_MAX_OPEN_S). Workers only check `is_open()`, which has no side
+effects, so an idle worker never holds the probe.
+
+Without Redis (all-in-one runtime) the state is kept in-process.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+from app.metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self.window = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+        self.min_calls = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+        self.error_rate = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+        self.slow_s = float(os.getenv("LLM_BREAKER_SLOW_S", "30"))
+        self.open_s = float(os.getenv("LLM_BREAKER_OPEN_S", "30"))
+        self.max_open_s = float(os.getenv("LLM_BREAKER_MAX_OPEN_S", "600"))
+        self.heuristic = os.getenv("LLM_FALLBACK", "pause") == "heuristic"
+        self._client = None
+        self._lock = threading.Lock()
+        # Thread ident of this process's probe call, while it is out
+        self._probe_owner: Optional[int] = None
+        # In-process state, used until attach() is given a Redis client
+        self._state = {"state": CLOSED, "open_until": 0.0, "open_s": self.open_s}
+        self._calls: deque = deque(maxlen=self.window)
+        self._probe_until = 0.0
+
+    def attach(self, client):
+        """Share state through Redis (workers pass `storage.client`; None keeps it in-process)."""
+        self._client = client
+
+    @property
+    def _key(self) -> str:
+        return f"breaker:{self.name}"
+
+    def _get_state(self) -> dict:
+        if self._client is None:
+            return dict(self._state)
+        raw = self._client.hgetall(self._key)
+        if not raw:
+            return {"state": CLOSED, "open_until": 0.0, "open_s": self.open_s}
+        raw = {k.decode(): v.decode() for k, v in raw.items()}
+        return {"state": raw["state"], "open_until": float(raw["open_until"]), "open_s": float(raw["open_s"])}
+
+    def _set_state(self, state: str, open_until: float = 0.0, open_s: Optional[float] = None):
+        data = {"state": state, "open_until": open_until, "open_s": open_s or self.open_s}
+        if self._client is None:
+            self._state = data
+        else:
+            self._client.hset(self._key, mapping=data)
+        metrics.set("llm_breaker_open", 0.0 if state == CLOSED else 1.0, breaker=self.name)
+        metrics.inc("llm_breaker_transitions_total", breaker=self.name, to=state)
+
+    def _push_call(self, ok: bool, latency_s: float) -> List[Tuple[bool, float]]:
+        """Adds a call to the window and returns the window."""
+        if self._client is None:
+            self._calls.append((ok, latency_s))
+            return list(self._calls)
+        key = f"{self._key}:calls"
+        pipe = self._client.pipeline()
+        pipe.lpush(key, f"{int(ok)}:{latency_s:.3f}")
+        pipe.ltrim(key, 0, self.window - 1)
+        pipe.lrange(key, 0, -1)
+        raw = pipe.execute()[-1]
+        return [(item.startswith(b"1"), float(item.split(b":")[1])) for item in raw]
+
+    def _clear_calls(self):
+        if self._client is None:
+            self._calls.clear()
+        else:
+            self._client.delete(f"{self._key}:calls")
+
+    def _take_probe(self, ttl_s: float) -> bool:
+        if self._client is None:
+            now = time.time()
+            if now < self._probe_until:
+                return False
+            self._probe_until = now + ttl_s
+            return True
+        return bool(self._client.set(f"{self._key}:probe", "1", nx=True, ex=max(1, int(ttl_s))))
+
+    def _probe_held(self) -> bool:
+        if self._client is None:
+            return time.time() < self._probe_until
+        return bool(self._client.exists(f"{self._key}:probe"))
+
+    def _release_probe(self):
+        if self._client is None:
+            self._probe_until = 0.0
+        else:
+            self._client.delete(f"{self._key}:probe")
+
+    def status(self) -> dict:
+        state = self._get_state()
+        return {**state, "heuristic_fallback": self.heuristic}
+
+    def is_closed(self) -> bool:
+        return self._get_state()["state"] == CLOSED
+
+    def is_open(self) -> bool:
+        """
+        Whether LLM calls would be refused right now: the circuit is open, or
+        half-open with the probe already out. Reads only, for workers deciding
+        whether to take work.
+        """
+        state = self._get_state()
+        if state["state"] == CLOSED:
+            return False
+        return time.time() < state["open_until"] or self._probe_held()
+
+    def allow(self) -> bool:
+        """
+        Whether an LLM call may go out now; call it right before the call and
+        `record` its outcome. In half-open state the first caller takes the
+        probe and is the only one let through until it records.
+        """
+        with self._lock:
+            if self._probe_owner is not None:
+                return False
+            state = self._get_state()
+            if state["state"] == CLOSED:
+                return True
+            if time.time() < state["open_until"]:
+                return False
+            # The probe expires if its holder dies mid-call
+            if not self._take_probe(self.slow_s * 2):
+                return False
+            self._probe_owner = threading.get_ident()
+            if state["state"] != HALF_OPEN:
+                self._set_state(HALF_OPEN, open_s=state["open_s"])
+                print(f"Circuit {self.name}: HALF-OPEN, probing", flush=True)
+            return True
+
+    def record(self, ok: bool, latency_s: float):
+        with self._lock:
+            if self._probe_owner == threading.get_ident():
+                self._probe_owner = None
+                self._release_probe()
+                state = self._get_state()
+                if ok and latency_s < self.slow_s:
+                    self._clear_calls()
+                    self._set_state(CLOSED)
+                    print(f"Circuit {self.name}: CLOSED, probe succeeded", flush=True)
+                else:
+                    self._open(min(state["open_s"] * 2, self.max_open_s))
+                return
+
+            calls = self._push_call(ok, latency_s)
+            if len(calls) < self.min_calls or not self.is_closed():
+                return
+            errors = sum(1 for call_ok, _ in calls if not call_ok)
+            mean_latency = sum(latency for _, latency in calls) / len(calls)
+            if errors / len(calls) >= self.error_rate or mean_latency >= self.slow_s:
+                print(f"Circuit {self.name}: {errors}/{len(calls)} errors, mean latency {mean_latency:.1f}s", flush=True)
+                self._open(self.open_s)
+
+    def _open(self, open_s: float):
+        self._set_state(OPEN, open_until=time.time() + open_s, open_s=open_s)
+        print(f"Circuit {self.name}: OPEN for {open_s:.0f}s", flush=True)
+
+
+llm_breaker = CircuitBreaker("llm")
@@ -0,0 +1,164 @@
+"""
+Local, CPU-only text embeddings for matching headlines to assets.
+
+Hashed TF-IDF: words and word bigrams are hashed into DIM signed buckets, so
+there is no vocabulary to fit or ship. Only the term-frequency part is stored
+per headline (a float32 blob); IDF weights come from the documents currently
+in the NewsIndex, so stored vectors never go stale as the news mix shifts.
+"""
+
+import re
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DIM = 512
+
+TOKEN_RE = re.compile(r"[a-z0-9&$^=]+(?:[.'-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or over says said "
+    "than that the their this to under was were will with after amid new".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    words = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Crude plural folding so "cuts"/"cut" and "prices"/"price" share a bucket
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def embed(text: str) -> np.ndarray:
+    """L2-normalised, sublinear term-frequency vector of hashed tokens."""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for token in tokenize(text):
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % DIM] += 1.0 if h & 0x80000000 else -1.0
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def news_text(title: str, event: Optional[dict]) -> str:
+    """The text embedded for a headline: its title plus the extracted event fields."""
+    if not event:
+        return title
+    assets = event.get("affected_assets") or []
+    if isinstance(assets, str):
+        assets = [assets]
+    return " ".join([title, *map(str, assets), str(event.get("event_type") or "")])
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return vector.astype(np.float32).tobytes()
+
+
+def from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class NewsIndex:
+    """
+    In-memory nearest-neighbour index over headlines embedded within the last
+    `window_s` seconds (by publish time).
+
+    The window holds at most a few thousand vectors, so search is an exact
+    matrix-vector product rather than an approximate index.
+    """
+
+    def __init__(self, window_s: float = 24 * 3600):
+        self.window_s = window_s
+        self._items: List[dict] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = np.zeros((0, DIM), dtype=np.float32)
+        self._times = np.zeros(0)
+        self._last_created = 0.0
+        self._backfilled = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def refresh(self, db, now: Optional[float] = None):
+        """Pull vectors stored since the last refresh and drop ones that left the window."""
+        now = now or time.time()
+        oldest = now - self.window_s
+        if not self._backfilled:
+            self._backfill(db, oldest)
+        rows = db.get_news_embeddings(created_after=self._last_created, published_after=oldest)
+        if rows:
+            self._last_created = rows[-1]["created"]
+            self.add([(row, from_bytes(row.pop("vector"))) for row in rows])
+        self.prune(oldest)
+
+    def _backfill(self, db, oldest: float):
+        # Headlines saved before embeddings existed
+        missing = db.get_unembedded_news(published_after=oldest)
+        if missing:
+            db.save_embeddings([(n["hash"], to_bytes(embed(news_text(n["title"], n["event"])))) for n in missing])
+        self._backfilled = True
+
+    def add(self, entries: List[Tuple[dict, np.ndarray]]):
+        """Adds (news item, vector) pairs; an item already indexed (same "hash") is replaced."""
+        new_rows = []
+        for item, vector in entries:
+            position = self._positions.get(item["hash"])
+            if position is not None:
+                self._items[position] = item
+                self._matrix[position] = vector
+                self._times[position] = item["timestamp"]
+                continue
+            self._positions[item["hash"]] = len(self._items) + len(new_rows)
+            new_rows.append((item, vector))
+        if new_rows:
+            self._items.extend(item for item, _ in new_rows)
+            self._matrix = np.vstack([self._matrix, np.stack([v for _, v in new_rows])])
+            self._times = np.concatenate([self._times, [item["timestamp"] for item, _ in new_rows]])
+
+    def prune(self, oldest: float):
+        keep = self._times >= oldest
+        if keep.all():
+            return
+        self._items = [item for item, k in zip(self._items, keep) if k]
+        self._matrix = self._matrix[keep]
+        self._times = self._times[keep]
+        self._positions = {item["hash"]: i for i, item in enumerate(self._items)}
+
+    def idf(self) -> np.ndarray:
+        df = np.count_nonzero(self._matrix, axis=0)
+        return np.log((1 + len(self._items)) / (1 + df)) + 1
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[dict, float]]:
+        """Top-`k` items by TF-IDF cosine similarity to `query`, optionally within [start, end]."""
+        if not self._items:
+            return []
+        idf = self.idf()
+        docs = self._matrix * idf
+        doc_norms = np.linalg.norm(docs, axis=1)
+        q = embed(query) * idf
+        q_norm = np.linalg.norm(q)
+        if not q_norm:
+            return []
+        scores = (docs @ q) / (np.where(doc_norms > 0, doc_norms, 1.0) * q_norm)
+
+        mask = (scores > 0) & (scores >= min_score)
+        if start is not None:
+            mask &= self._times >= start
+        if end is not None:
+            mask &= self._times <= end
+        candidates = np.flatnonzero(mask)
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        return [(self._items[i], float(scores[i])) for i in ranked]
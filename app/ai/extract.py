@@ -1,8 +1,8 @@
-from google import genai
 from typing import List, Optional
 import os
-import json
-from app.ai.utils import RateLimiter
+from app.ai.router import ModelRouter
+from app.ai.utils import collect_indexed_items
+from app.metrics import metrics
 
 class EventExtractor:
     def __init__(self):
@@ -10,9 +10,7 @@ class EventExtractor:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        self.client = genai.Client(api_key=self.api_key)
-        self.model = os.getenv("GEMINI_MODEL", "gemma-3-12b-it")
-        self.rate_limiter = RateLimiter(rpm=30)
+        self.router = ModelRouter.shared(self.api_key)
 
     def _get_batch_prompt(self, headlines: List[str]) -> str:
         numbered_list = "\n".join([f"{i+1}. {h}" for i, h in enumerate(headlines)])
@@ -22,8 +20,9 @@ class EventExtractor:
         Headlines:
         {numbered_list}
         
-        Respond with ONLY a valid JSON array containing {len(headlines)} objects (one for each headline in order), matching this schema for each element:
+        Respond with ONLY a valid JSON array containing {len(headlines)} objects (one for each headline), matching this schema for each element, where "i" is the headline's number:
         {{
+            "i": 1,
             "event_type": "Geopolitical, Macroeconomic, Corporate, or Regulatory",
             "affected_assets": ["S&P500", "Gold", etc.],
             "impact_direction": "Bullish, Bearish, or Volatile",
@@ -31,34 +30,33 @@ class EventExtractor:
         }}
         """
 
+    @staticmethod
+    def is_valid_event(item: dict) -> bool:
+        return isinstance(item.get("event_type"), str) and isinstance(item.get("affected_assets", []), list)
+
     def extract_events_batch(self, headlines: List[str]) -> List[Optional[dict]]:
+        """One event per headline, or None for headlines without a valid event in the response."""
         if not headlines:
             return []
         try:
-            self.rate_limiter.wait()
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=self._get_batch_prompt(headlines)
-            )
-            
-            text = response.text.strip()
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0].strip()
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0].strip()
-            
-            results = json.loads(text)
-            
-            if not isinstance(results, list):
-                results = [results]
+            metrics.observe("llm_batch_size", len(headlines), stage="extraction")
+            response = self.router.generate("extraction", self._get_batch_prompt(headlines), json_mode=True)
             
-            while len(results) < len(headlines):
-                results.append(None)
+            items = collect_indexed_items(response.text or "", len(headlines), self.is_valid_event)
+            results = []
+            for item in items:
+                if item is not None:
+                    item = {k: v for k, v in item.items() if k != "i"}
+                results.append(item)
             
-            return results[:len(headlines)]
+            missing = results.count(None)
+            if missing:
+                metrics.inc("parse_failures_total", missing, stage="extraction")
+                print(f"Batch Extraction: {missing}/{len(headlines)} items missing or invalid", flush=True)
+            return results
             
         except Exception as e:
+            metrics.inc("llm_errors_total", stage="extraction")
             print(f"Batch Extraction Error: {e}", flush=True)
             return [None] * len(headlines)
 
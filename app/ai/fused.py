@@ -0,0 +1,80 @@
+from typing import List, Optional
+import os
+from app.ai.extract import EventExtractor
+from app.ai.router import ModelRouter
+from app.ai.utils import collect_indexed_items
+from app.metrics import metrics
+
+class FusedAnalyzer:
+    """
+    Relevance and event extraction in a single LLM call.
+
+    Used by the relevance worker when PIPELINE_MODE=fused: relevant headlines
+    come back with their event already extracted, so they skip the extraction
+    queue and cost one request from the shared rpm budget instead of two.
+    """
+
+    def __init__(self):
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        
+        self.router = ModelRouter.shared(self.api_key)
+
+    def _get_batch_prompt(self, headlines: List[str]) -> str:
+        numbered_list = "\n".join([f"{i+1}. {h}" for i, h in enumerate(headlines)])
+        return f"""
+        Analyze the following news headlines. For each one, decide whether it has potential impact on GLOBAL FINANCIAL MARKETS and, if it does, extract structured market data.
+        A headline is relevant if it relates to:
+        1. Macroeconomic data (GDP, inflation, employment).
+        2. Central bank actions or statements (Fed, ECB, etc.).
+        3. Significant news about major publicly traded companies (S&P 500, etc.) that could move their stock price.
+        4. Geopolitical events (wars, trade deals, elections).
+        5. Commodity price drivers (oil, gold, etc.).
+        
+        Headlines:
+        {numbered_list}
+        
+        Respond with ONLY a valid JSON array containing {len(headlines)} objects (one for each headline), matching this schema for each element, where "i" is the headline's number:
+        {{
+            "i": 1,
+            "relevant": true or false,
+            "event": null if not relevant, otherwise {{
+                "event_type": "Geopolitical, Macroeconomic, Corporate, or Regulatory",
+                "affected_assets": ["S&P500", "Gold", etc.],
+                "impact_direction": "Bullish, Bearish, or Volatile",
+                "certainty_score": 0.0 to 1.0
+            }}
+        }}
+        """
+
+    def analyze_batch(self, headlines: List[str]) -> List[Optional[dict]]:
+        """
+        Returns one `{"relevant": bool, "event": dict | None}` per headline,
+        or None for headlines the model gave no usable answer for.
+        """
+        if not headlines:
+            return []
+        try:
+            metrics.observe("llm_batch_size", len(headlines), stage="fused")
+            response = self.router.generate("fused", self._get_batch_prompt(headlines), json_mode=True)
+            
+            items = collect_indexed_items(response.text or "", len(headlines), lambda o: isinstance(o.get("relevant"), bool))
+            results = []
+            for item in items:
+                if item is None:
+                    results.append(None)
+                    continue
+                event = item.get("event")
+                valid = isinstance(event, dict) and EventExtractor.is_valid_event(event)
+                results.append({"relevant": item["relevant"], "event": event if valid else None})
+            
+            missing = results.count(None)
+            if missing:
+                metrics.inc("parse_failures_total", missing, stage="fused")
+            return results
+            
+        except Exception as e:
+            metrics.inc("llm_errors_total", stage="fused")
+            print(f"Fused Analysis Error: {e}", flush=True)
+            return [None] * len(headlines)
@@ -0,0 +1,65 @@
+"""
+Keyword stand-ins for the LLM stages, used while the LLM circuit is open and
+LLM_FALLBACK=heuristic (see app.ai.breaker).
+
+They mirror the interfaces of RelevanceFilter, EventExtractor and
+FusedAnalyzer. Events they produce carry `"source": "heuristic"` and a low
+certainty, so they never earn the scorer's certainty bonus.
+"""
+
+import re
+from typing import List, Optional
+
+from app.market.anomalies import ASSET_KEYWORDS
+
+# Word-level cues per event type; any of them also makes a headline relevant
+EVENT_TERMS = {
+    "Macroeconomic": ["fed", "federal reserve", "inflation", "cpi", "gdp", "jobs report", "payrolls",
+                      "unemployment", "interest rate", "rate cut", "rate hike", "recession", "central bank",
+                      "ecb", "bank of japan", "treasury", "bond yields"],
+    "Geopolitical": ["war", "sanctions", "tariff", "tariffs", "trade deal", "election", "missile", "invasion",
+                     "ceasefire", "embargo", "opec"],
+    "Corporate": ["earnings", "revenue", "profit", "merger", "acquisition", "ipo", "shares", "stock",
+                  "layoffs", "guidance", "bankruptcy"],
+    "Regulatory": ["sec", "regulator", "antitrust", "ban", "lawsuit", "fine", "approval", "etf"],
+}
+
+CERTAINTY = 0.3
+
+
+def _pattern(terms: List[str]) -> re.Pattern:
+    return re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+
+
+EVENT_PATTERNS = {event_type: _pattern(terms) for event_type, terms in EVENT_TERMS.items()}
+ASSET_PATTERNS = {ticker: _pattern(keywords) for ticker, keywords in ASSET_KEYWORDS.items()}
+
+
+class HeuristicAnalyzer:
+    def is_relevant_batch(self, headlines: List[str]) -> List[Optional[bool]]:
+        return [self._is_relevant(h) for h in headlines]
+
+    def extract_events_batch(self, headlines: List[str]) -> List[Optional[dict]]:
+        return [self._event(h) for h in headlines]
+
+    def analyze_batch(self, headlines: List[str]) -> List[Optional[dict]]:
+        return [{"relevant": self._is_relevant(h), "event": self._event(h) if self._is_relevant(h) else None}
+                for h in headlines]
+
+    @staticmethod
+    def _is_relevant(headline: str) -> bool:
+        return any(p.search(headline) for p in EVENT_PATTERNS.values()) or \
+            any(p.search(headline) for p in ASSET_PATTERNS.values())
+
+    @staticmethod
+    def _event(headline: str) -> dict:
+        matches = {t: len(p.findall(headline)) for t, p in EVENT_PATTERNS.items()}
+        event_type = max(matches, key=matches.get) if any(matches.values()) else "Macroeconomic"
+        assets = [ASSET_KEYWORDS[t][0] for t, p in ASSET_PATTERNS.items() if p.search(headline)]
+        return {
+            "event_type": event_type,
+            "affected_assets": assets,
+            "impact_direction": "Volatile",
+            "certainty_score": CERTAINTY,
+            "source": "heuristic",
+        }
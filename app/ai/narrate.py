@@ -1,6 +1,7 @@
-from google import genai
 import os
 from typing import List, Dict
+from app.ai.router import ModelRouter
+from app.metrics import metrics
 
 class AlertNarrator:
     def __init__(self):
@@ -8,15 +9,14 @@ class AlertNarrator:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        self.client = genai.Client(api_key=self.api_key)
-        self.model = os.getenv("GEMINI_MODEL", "gemma-3-12b-it")
+        self.router = ModelRouter.shared(self.api_key)
     
     def narrate_alert(self, anomaly: Dict, correlations: List[Dict]) -> str:
         """
         Generate a concise, professional alert narrative for a market anomaly.
         
         Args:
-            anomaly: Dict with ticker, change_pct, score, level
+            anomaly: Dict with ticker, change_pct, score, level and optional cross_asset
             correlations: List of correlated news items
         
         Returns:
@@ -31,6 +31,18 @@ class AlertNarrator:
         if correlations:
             news_titles = [n['title'] for n in correlations[:2]]  # Top 2 news
             news_context = f"\n\nRelated news:\n" + "\n".join([f"- {t}" for t in news_titles])
+
+        # Cross-asset picture from the market worker's correlation monitor
+        cross_asset = anomaly.get('cross_asset')
+        if cross_asset:
+            peers = [t for t in cross_asset['cluster'] if t != ticker]
+            if peers:
+                scope = "market-wide" if cross_asset['market_wide'] else "shared"
+                news_context += f"\n\nCross-asset: {scope} move, together with {', '.join(peers)}."
+            else:
+                news_context += "\n\nCross-asset: no other tracked asset moved with it (looks idiosyncratic)."
+            for b in cross_asset['breaks'][:2]:
+                news_context += f"\nCorrelation break: {b['pair'][0]}/{b['pair'][1]} {b['baseline']:+.2f} -> {b['recent']:+.2f}."
         
         prompt = f"""You are a financial market analyst. Generate a concise, professional alert message (2-3 sentences max) for the following market event:
 
@@ -45,12 +57,10 @@ Also include ONE explicit recommended next step, phrased as: "Next step: ...".
 The next step should be specific and immediately actionable (e.g., check related news, verify if the move is headline-driven vs broader market, review exposure/hedges, set an alert level, or wait for confirmation if appropriate)."""
 
         try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
+            response = self.router.generate("narration", prompt)
             return response.text.strip()
         except Exception as e:
+            metrics.inc("llm_errors_total", stage="narration")
             # Fallback to simple message if AI fails
             return (
                 f"🚨 {level} Alert: {ticker} moved {change_pct:+.2f}%. "
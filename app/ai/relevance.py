@@ -1,7 +1,12 @@
-from google import genai
 import os
-import time
-from app.ai.utils import RateLimiter
+import re
+from typing import Optional
+from app.ai.router import ModelRouter
+from app.ai.utils import collect_indexed_items
+from app.metrics import metrics
+
+# "3. YES" / "3) no" style answers, for models that ignore the JSON instruction
+NUMBERED_ANSWER = re.compile(r"^\W*(\d+)\s*[.):-]\s*\**\s*(YES|NO)\b", re.IGNORECASE | re.MULTILINE)
 
 class RelevanceFilter:
     def __init__(self):
@@ -9,8 +14,7 @@ class RelevanceFilter:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        self.client = genai.Client(api_key=self.api_key)
-        self.rate_limiter = RateLimiter(rpm=30)
+        self.router = ModelRouter.shared(self.api_key)
         
     def _get_batch_prompt(self, headlines: list[str]) -> str:
         numbered_list = "\n".join([f"{i+1}. {h}" for i, h in enumerate(headlines)])
@@ -26,37 +30,41 @@ class RelevanceFilter:
         Headlines:
         {numbered_list}
         
-        Respond with a numbered list of ONLY "YES" or "NO" for each headline (e.g., "1. YES\n2. NO").
+        Respond with ONLY a valid JSON array containing {len(headlines)} objects, one per headline, where "i" is the headline's number:
+        [{{"i": 1, "relevant": true}}, {{"i": 2, "relevant": false}}]
         """
 
-    def is_relevant_batch(self, headlines: list[str]) -> list[bool]:
+    def is_relevant_batch(self, headlines: list[str]) -> list[Optional[bool]]:
+        """
+        One answer per headline: True/False, or None when the model gave no
+        usable answer for it (the caller should retry that headline).
+        """
         if not headlines:
             return []
         try:
-            self.rate_limiter.wait()
-            
-            response = self.client.models.generate_content(
-                model=os.getenv("GEMINI_MODEL", "gemma-3-12b-it"),
-                contents=self._get_batch_prompt(headlines)
-            )
+            metrics.observe("llm_batch_size", len(headlines), stage="relevance")
+            response = self.router.generate("relevance", self._get_batch_prompt(headlines), json_mode=True)
             
-            lines = response.text.strip().split("\n")
-            results = []
-            for line in lines:
-                upper_line = line.upper()
-                if "YES" in upper_line:
-                    results.append(True)
-                elif "NO" in upper_line:
-                    results.append(False)
+            text = response.text or ""
+            items = collect_indexed_items(text, len(headlines), lambda o: isinstance(o.get("relevant"), bool))
+            results = [item["relevant"] if item else None for item in items]
             
-            while len(results) < len(headlines):
-                results.append(False)
+            # Fall back to "1. YES" lines, matched by number rather than position
+            if None in results:
+                for match in NUMBERED_ANSWER.finditer(text):
+                    idx = int(match.group(1)) - 1
+                    if 0 <= idx < len(results) and results[idx] is None:
+                        results[idx] = match.group(2).upper() == "YES"
             
-            return results[:len(headlines)]
+            missing = results.count(None)
+            if missing:
+                metrics.inc("parse_failures_total", missing, stage="relevance")
+            return results
             
         except Exception as e:
+            metrics.inc("llm_errors_total", stage="relevance")
             print(f"Batch AI Filter Error: {e}")
-            return [False] * len(headlines)
+            return [None] * len(headlines)
 
-    def is_relevant(self, headline: str) -> bool:
+    def is_relevant(self, headline: str) -> Optional[bool]:
         return self.is_relevant_batch([headline])[0]
@@ -0,0 +1,276 @@
+"""
+Model routing for the LLM stages.
+
+Each stage (relevance, extraction, fused, narration, schema) uses a tier: an
+ordered list of models. Calls go to the first model in the tier that is
+neither cooling down nor slow. A model cools down after a quota error, or
+after a few errors in a row. It counts as slow once its smoothed latency
+passes LLM_SLOW_S. A failed call falls through to the next model in the tier.
+
+Configuration:
+    LLM_TIERS="fast=gemma-3-12b-it,gemini-2.0-flash-lite;strong=gemma-3-27b-it,gemini-2.0-flash"
+    LLM_STAGE_TIERS="relevance=fast,extraction=strong"
+    LLM_PRICES="gemini-2.0-flash=0.10/0.40"   (USD per 1M input/output tokens)
+
+GEMINI_MODEL, if set, is tried first in every tier. Requests time out after
+LLM_TIMEOUT_S, and every call's overall outcome feeds the shared circuit
+breaker (app.ai.breaker); while it is open, calls fail fast with
+CircuitOpenError. Token counts come from the response's usage metadata, or
+are estimated at ~4 characters per token. Tokens and cost are recorded per
+stage and model in the metrics registry (see `usage_summary`).
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.ai.breaker import CircuitOpenError, llm_breaker
+from app.ai.utils import RateLimiter, json_output_config
+from app.metrics import metrics
+
+DEFAULT_TIERS = {
+    "fast": ["gemma-3-12b-it", "gemini-2.0-flash-lite"],
+    "strong": ["gemma-3-27b-it", "gemini-2.0-flash"],
+}
+
+# The YES/NO relevance call and schema guessing are easy; events and alerts need the stronger tier
+DEFAULT_STAGE_TIERS = {
+    "relevance": "fast",
+    "schema": "fast",
+    "extraction": "strong",
+    "fused": "strong",
+    "narration": "strong",
+}
+
+# USD per 1M (input, output) tokens; models not listed (e.g. Gemma on the API) are counted as free
+DEFAULT_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+QUOTA_ERROR = re.compile(r"429|RESOURCE_EXHAUSTED|quota", re.IGNORECASE)
+
+
+def _parse_tiers(spec: str) -> Dict[str, List[str]]:
+    tiers = {}
+    for part in spec.split(";"):
+        name, _, models = part.strip().partition("=")
+        if name and models:
+            tiers[name.strip()] = [m.strip() for m in models.split(",") if m.strip()]
+    return tiers
+
+
+def _parse_pairs(spec: str) -> Dict[str, str]:
+    pairs = {}
+    for part in spec.split(","):
+        key, _, value = part.strip().partition("=")
+        if key and value:
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+def _parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    prices = {}
+    for model, value in _parse_pairs(spec).items():
+        inp, _, out = value.partition("/")
+        prices[model] = (float(inp), float(out or inp))
+    return prices
+
+
+class ModelHealth:
+    LATENCY_ALPHA = 0.2
+    ERRORS_BEFORE_COOLDOWN = 3
+
+    def __init__(self):
+        self.latency_s: Optional[float] = None
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency_s: float):
+        if self.latency_s is None:
+            self.latency_s = latency_s
+        else:
+            self.latency_s += self.LATENCY_ALPHA * (latency_s - self.latency_s)
+        self.consecutive_errors = 0
+
+    def record_error(self, error: Exception, quota_cooldown_s: float, error_cooldown_s: float):
+        self.consecutive_errors += 1
+        if QUOTA_ERROR.search(str(error)):
+            self.cooldown_until = time.time() + quota_cooldown_s
+        elif self.consecutive_errors >= self.ERRORS_BEFORE_COOLDOWN:
+            self.cooldown_until = time.time() + error_cooldown_s
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+class ModelRouter:
+    _shared: Optional["ModelRouter"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._client = None
+        primary = os.getenv("GEMINI_MODEL")
+        tiers = {**DEFAULT_TIERS, **_parse_tiers(os.getenv("LLM_TIERS", ""))}
+        if primary:
+            tiers = {name: [primary] + [m for m in models if m != primary] for name, models in tiers.items()}
+        self.tiers = tiers
+        self.stage_tiers = {**DEFAULT_STAGE_TIERS, **_parse_pairs(os.getenv("LLM_STAGE_TIERS", ""))}
+        self.prices = {**DEFAULT_PRICES, **_parse_prices(os.getenv("LLM_PRICES", ""))}
+        self.slow_s = float(os.getenv("LLM_SLOW_S", "15"))
+        self.quota_cooldown_s = float(os.getenv("LLM_QUOTA_COOLDOWN_S", "60"))
+        self.error_cooldown_s = float(os.getenv("LLM_ERROR_COOLDOWN_S", "30"))
+        self.timeout_s = float(os.getenv("LLM_TIMEOUT_S", "60"))
+        self.rate_limiter = RateLimiter.shared("gemini", rpm=int(os.getenv("GEMINI_RPM", "30")))
+        self.health: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, api_key: str) -> "ModelRouter":
+        """One router per process, so every stage sees the same model health."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(api_key)
+            return cls._shared
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai  # heavy SDK, loaded on first use
+            # A hung request counts as an error instead of blocking the worker
+            self._client = genai.Client(api_key=self.api_key, http_options={"timeout": int(self.timeout_s * 1000)})
+        return self._client
+
+    def _health(self, model: str) -> ModelHealth:
+        with self._lock:
+            return self.health.setdefault(model, ModelHealth())
+
+    def models_for(self, stage: str) -> List[str]:
+        """The stage's tier in call order: healthy models, then slow ones, then cooling-down ones."""
+        tier = self.tiers.get(self.stage_tiers.get(stage, "strong")) or self.tiers["strong"]
+        now = time.time()
+        healthy, slow, cooling = [], [], []
+        for model in tier:
+            health = self._health(model)
+            if not health.available(now):
+                cooling.append(model)
+            elif health.latency_s is not None and health.latency_s > self.slow_s:
+                slow.append(model)
+            else:
+                healthy.append(model)
+        cooling.sort(key=lambda m: self._health(m).cooldown_until)
+        return healthy + slow + cooling
+
+    def generate(self, stage: str, contents: str, json_mode: bool = False):
+        """
+        Runs one generate_content call for `stage`, falling back through the
+        tier on errors. Raises the last error if every model failed, or
+        CircuitOpenError without calling the API while the circuit is open.
+        """
+        if not llm_breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open")
+        start = time.perf_counter()
+        try:
+            response = self._generate(stage, contents, json_mode)
+        except Exception:
+            llm_breaker.record(False, time.perf_counter() - start)
+            raise
+        llm_breaker.record(True, time.perf_counter() - start)
+        return response
+
+    def _generate(self, stage: str, contents: str, json_mode: bool):
+        last_error = None
+        models = self.models_for(stage)
+        for model in models:
+            self.rate_limiter.wait()
+            health = self._health(model)
+            start = time.perf_counter()
+            try:
+                with metrics.timer("llm_request_seconds", stage=stage, model=model):
+                    response = self.client.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=json_output_config(model) if json_mode else None
+                    )
+            except Exception as e:
+                last_error = e
+                health.record_error(e, self.quota_cooldown_s, self.error_cooldown_s)
+                metrics.inc("llm_requests_total", stage=stage, model=model, outcome="error")
+                self._publish(model, health)
+                if model != models[-1]:
+                    print(f"LLM {stage}: {model} failed ({e}), falling back", flush=True)
+                continue
+
+            health.record_success(time.perf_counter() - start)
+            metrics.inc("llm_requests_total", stage=stage, model=model, outcome="ok")
+            self._publish(model, health)
+            self._account(stage, model, contents, response)
+            return response
+        raise last_error
+
+    def _publish(self, model: str, health: ModelHealth):
+        if health.latency_s is not None:
+            metrics.set("llm_model_latency_seconds", health.latency_s, model=model)
+        metrics.set("llm_model_available", 1.0 if health.available(time.time()) else 0.0, model=model)
+
+    def _account(self, stage: str, model: str, contents: str, response):
+        usage = getattr(response, "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", None) or len(contents) // 4
+        output_tokens = getattr(usage, "candidates_token_count", None) or len(getattr(response, "text", None) or "") // 4
+        metrics.inc("llm_tokens_total", input_tokens, stage=stage, model=model, direction="input")
+        metrics.inc("llm_tokens_total", output_tokens, stage=stage, model=model, direction="output")
+        price_in, price_out = self.prices.get(model, (0.0, 0.0))
+        cost = (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+        if cost:
+            metrics.inc("llm_cost_usd_total", cost, stage=stage, model=model)
+
+
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def _labels(series: str) -> Dict[str, str]:
+    return dict(LABEL.findall(series.partition("{")[2]))
+
+
+def usage_summary(counters: Dict[str, float], gauges: Dict[str, float]) -> dict:
+    """Per-stage calls, tokens and cost, and per-model health, from aggregated metric series."""
+    stages: Dict[str, dict] = {}
+    models: Dict[str, dict] = {}
+
+    def stage_row(name):
+        return stages.setdefault(name, {"calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0,
+                                        "cost_usd": 0.0, "models": {}})
+
+    for series, value in counters.items():
+        name = series.partition("{")[0]
+        labels = _labels(series)
+        if name == "llm_requests_total":
+            row = stage_row(labels["stage"])
+            key = "calls" if labels["outcome"] == "ok" else "errors"
+            row[key] += int(value)
+            if labels["outcome"] == "ok":
+                row["models"][labels["model"]] = row["models"].get(labels["model"], 0) + int(value)
+        elif name == "llm_tokens_total":
+            stage_row(labels["stage"])[f"{labels['direction']}_tokens"] += int(value)
+        elif name == "llm_cost_usd_total":
+            stage_row(labels["stage"])["cost_usd"] += value
+
+    for series, value in gauges.items():
+        name = series.partition("{")[0]
+        if name not in ("llm_model_latency_seconds", "llm_model_available"):
+            continue
+        row = models.setdefault(_labels(series)["model"], {"latency_s": None, "available": True})
+        # One gauge per worker process: report the slowest view and any cooldown
+        if name == "llm_model_latency_seconds":
+            row["latency_s"] = round(max(value, row["latency_s"] or 0.0), 3)
+        elif not value:
+            row["available"] = False
+
+    for row in stages.values():
+        row["cost_usd"] = round(row["cost_usd"], 6)
+    return {"stages": stages, "models": models}
@@ -1,13 +1,83 @@
+import json
+import os
+import threading
 import time
+from typing import Callable, Dict, Iterator, List, Optional
+from app.metrics import metrics
+
+def json_output_config(model: str) -> Optional[dict]:
+    """
+    Request config for JSON-mode output, or None where the model can't do it.
+
+    Gemini models accept `response_mime_type`; Gemma models reject it, so they
+    rely on the prompt alone. GEMINI_JSON_MODE=on/off overrides the guess.
+    """
+    setting = os.getenv("GEMINI_JSON_MODE", "auto").lower()
+    enabled = model.startswith("gemini") if setting == "auto" else setting in ("1", "on", "true")
+    return {"response_mime_type": "application/json"} if enabled else None
+
+def iter_json_items(text: str, is_item: Callable[[dict], bool]) -> Iterator[dict]:
+    """
+    Yield every well-formed JSON object in `text` that `is_item` accepts.
+
+    Tolerates code fences, prose around the JSON, wrapper objects, truncation
+    and individual broken elements: objects that aren't items are descended
+    into, and unparseable spans are skipped, so every intact item is recovered.
+    """
+    decoder = json.JSONDecoder()
+    pos = text.find("{")
+    while pos != -1:
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except ValueError:
+            pos = text.find("{", pos + 1)
+            continue
+        if isinstance(obj, dict) and is_item(obj):
+            yield obj
+            pos = text.find("{", end)
+        else:
+            pos = text.find("{", pos + 1)
+
+def collect_indexed_items(text: str, count: int, is_valid: Callable[[dict], bool]) -> List[Optional[dict]]:
+    """
+    Place items keyed by a 1-based `"i"` field into a list of `count` slots.
+
+    Missing, out-of-range, duplicate or invalid items leave their slot as None.
+    """
+    results: List[Optional[dict]] = [None] * count
+    for item in iter_json_items(text, lambda o: isinstance(o.get("i"), int) and not isinstance(o.get("i"), bool)):
+        idx = item["i"] - 1
+        if 0 <= idx < count and results[idx] is None and is_valid(item):
+            results[idx] = item
+    return results
 
 class RateLimiter:
+    _shared: Dict[str, "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
     def __init__(self, rpm: int):
         self.interval = 60.0 / rpm
         self.last_call = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, name: str, rpm: int) -> "RateLimiter":
+        """
+        Process-wide limiter for one quota, so every LLM stage running in this
+        process draws from the same budget.
+        """
+        with cls._shared_lock:
+            if name not in cls._shared:
+                cls._shared[name] = cls(rpm)
+            return cls._shared[name]
 
     def wait(self):
-        now = time.time()
-        elapsed = now - self.last_call
-        if elapsed < self.interval:
-            time.sleep(self.interval - elapsed)
-        self.last_call = time.time()
+        with self._lock:
+            now = time.time()
+            elapsed = now - self.last_call
+            waited = 0.0
+            if elapsed < self.interval:
+                waited = self.interval - elapsed
+                time.sleep(waited)
+            metrics.observe("rate_limiter_wait_seconds", waited)
+            self.last_call = time.time()
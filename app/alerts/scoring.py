@@ -1,31 +1,84 @@
-from typing import List, Optional
+import os
+from typing import Dict, List, Optional
+
+# Score components; override with SCORER_WEIGHTS="move_per_pct=25,news_cap=40"
+DEFAULT_WEIGHTS = {
+    "move_per_pct": 20,      # points per 1% move
+    "move_cap": 60,
+    "news_per_item": 15,     # points per correlated headline
+    "news_cap": 30,
+    "certainty_bonus": 10,   # when the top headline's extraction is confident
+    "certainty_min": 0.8,
+    "cluster_bonus": 10,     # asset moved together with correlated assets (see cross_asset)
+    "break_bonus": 5,        # asset is part of a correlation break
+}
+
+# Minimum score per level; override with SCORER_LEVELS="CRITICAL=85,HIGH=55,MEDIUM=25"
+DEFAULT_LEVELS = {"CRITICAL": 80, "HIGH": 50, "MEDIUM": 25}
+
+
+def _parse_overrides(spec: str) -> Dict[str, float]:
+    overrides = {}
+    for part in spec.split(","):
+        key, _, value = part.strip().partition("=")
+        if key and value:
+            overrides[key] = float(value)
+    return overrides
+
+
+def event_certainty(news: dict) -> float:
+    event = news.get('event') or {}
+    return float(event.get('certainty_score', event.get('certainty', 0)) or 0)
+
 
 class SeverityScorer:
-    @staticmethod
-    def calculate_score(anomaly: dict, correlations: List[dict]) -> float:
+    def __init__(self, weights: Optional[Dict[str, float]] = None, levels: Optional[Dict[str, float]] = None):
+        self.weights = {**DEFAULT_WEIGHTS, **_parse_overrides(os.getenv("SCORER_WEIGHTS", "")), **(weights or {})}
+        self.levels = {**DEFAULT_LEVELS, **_parse_overrides(os.getenv("SCORER_LEVELS", "")), **(levels or {})}
+
+    def calculate_score(self, anomaly: dict, correlations: List[dict]) -> float:
         """
         Calculates a severity score (0-100) based on market move and news alignment.
         """
+        # AI certainty bonus looks at the first (best) correlation
+        top_certainty = event_certainty(correlations[0]) if correlations else 0.0
+        cross_asset = anomaly.get('cross_asset') or {}
+        return float(self.calculate_scores(
+            abs(anomaly['change_pct']),
+            len(correlations),
+            top_certainty,
+            in_cluster=bool(cross_asset.get('cluster')),
+            in_break=bool(cross_asset.get('breaks')),
+        ))
+
+    def calculate_scores(self, abs_change_pct, correlation_counts, top_certainty, in_cluster=False, in_break=False):
+        """
+        Vectorized calculate_score: takes numpy arrays (or scalars) of absolute
+        move in %, number of correlations, the top correlation's certainty and
+        the cross-asset flags.
+        """
+        import numpy as np
+
+        w = self.weights
         # Base score from market move magnitude
-        # 1% move = 20 points, 5% move = 100 points
-        move_score = min(abs(anomaly['change_pct']) * 20, 60)
-        
-        # News alignment score
-        news_score = 0
-        if correlations:
-            # More correlations = higher confidence
-            news_score += min(len(correlations) * 15, 30)
-            
-            # AI certainty bonus (look at the first correlation)
-            top_news = correlations[0]
-            if top_news.get('event', {}).get('certainty', 0) > 0.8:
-                news_score += 10
-        
-        return min(move_score + news_score, 100)
-
-    @staticmethod
-    def get_level(score: float) -> str:
-        if score >= 80: return "CRITICAL"
-        if score >= 50: return "HIGH"
-        if score >= 25: return "MEDIUM"
+        move_score = np.minimum(abs_change_pct * w["move_per_pct"], w["move_cap"])
+        # News alignment score: more correlations = higher confidence
+        news_score = np.minimum(correlation_counts * w["news_per_item"], w["news_cap"])
+        news_score = news_score + np.where(
+            (correlation_counts > 0) & (top_certainty > w["certainty_min"]), w["certainty_bonus"], 0
+        )
+        cross_score = np.where(in_cluster, w["cluster_bonus"], 0) + np.where(in_break, w["break_bonus"], 0)
+        return np.minimum(move_score + news_score + cross_score, 100)
+
+    def get_levels(self, scores):
+        """Vectorized get_level over a numpy array of scores."""
+        import numpy as np
+
+        names = ("CRITICAL", "HIGH", "MEDIUM")
+        return np.select([scores >= self.levels[name] for name in names], names, default="LOW")
+
+    def get_level(self, score: float) -> str:
+        for level in ("CRITICAL", "HIGH", "MEDIUM"):
+            if score >= self.levels[level]:
+                return level
         return "LOW"
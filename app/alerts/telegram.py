@@ -1,4 +1,3 @@
-import requests
 import os
 from typing import Optional
 
@@ -34,6 +33,7 @@ class TelegramBot:
             payload["parse_mode"] = parse_mode
         
         try:
+            import requests
             response = requests.post(url, json=payload, timeout=10)
             response.raise_for_status()
             print(f"✓ Telegram message sent successfully", flush=True)
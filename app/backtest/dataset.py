@@ -0,0 +1,119 @@
+"""
+Historical prices and news for the replay engine, as numpy arrays.
+
+Loaded from the dashboard's SQLite database or from CSV exports:
+
+- prices CSV: `ticker,price,timestamp`
+- news CSV: `title,timestamp[,event]`, where `event` is the extracted event as JSON
+"""
+
+import csv
+import json
+import sqlite3
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.ai.embeddings import embed, news_text
+from app.alerts.scoring import event_certainty
+from app.market.anomalies import ASSET_DESCRIPTORS, keyword_match
+
+
+class Dataset:
+    """
+    Price series per ticker (oldest first), relevant news sorted by publish
+    time, and per-ticker similarity/keyword match scores against every headline.
+    """
+
+    def __init__(self, prices: Dict[str, np.ndarray], price_times: Dict[str, np.ndarray], news: List[dict]):
+        self.prices = prices
+        self.price_times = price_times
+        self.news = sorted(news, key=lambda n: n["timestamp"])
+        self.news_times = np.array([n["timestamp"] for n in self.news], dtype=float)
+        self.news_certainty = np.array([event_certainty(n) for n in self.news], dtype=float)
+        self.similarity = self._similarity()
+        self.keyword = {
+            ticker: np.array([keyword_match(ticker, n) for n in self.news], dtype=bool) for ticker in self.prices
+        }
+
+    def _similarity(self) -> Dict[str, np.ndarray]:
+        """TF-IDF cosine similarity of every headline to each asset descriptor (0 for unknown tickers)."""
+        if not self.news:
+            return {ticker: np.zeros(0) for ticker in self.prices}
+        docs = np.stack([embed(news_text(n["title"], n.get("event"))) for n in self.news])
+        idf = np.log((1 + len(docs)) / (1 + np.count_nonzero(docs, axis=0))) + 1
+        docs = docs * idf
+        norms = np.linalg.norm(docs, axis=1, keepdims=True)
+        docs /= np.where(norms > 0, norms, 1)
+
+        similarity = {}
+        for ticker in self.prices:
+            descriptor = ASSET_DESCRIPTORS.get(ticker)
+            if descriptor is None:
+                similarity[ticker] = np.zeros(len(self.news))
+                continue
+            q = embed(descriptor) * idf
+            norm = np.linalg.norm(q)
+            similarity[ticker] = docs @ (q / norm) if norm else np.zeros(len(self.news))
+        return similarity
+
+    @property
+    def span_s(self) -> float:
+        times = [t for t in self.price_times.values() if len(t)]
+        if not times:
+            return 0.0
+        return float(max(t[-1] for t in times) - min(t[0] for t in times))
+
+    def summary(self) -> dict:
+        return {
+            "tickers": len(self.prices),
+            "price_points": int(sum(len(p) for p in self.prices.values())),
+            "news": len(self.news),
+            "span_s": self.span_s,
+        }
+
+
+def _group_prices(rows) -> tuple:
+    by_ticker: Dict[str, list] = {}
+    for ticker, price, ts in rows:
+        by_ticker.setdefault(ticker, []).append((float(ts), float(price)))
+    prices, times = {}, {}
+    for ticker, points in by_ticker.items():
+        points.sort()
+        times[ticker] = np.array([t for t, _ in points])
+        prices[ticker] = np.array([p for _, p in points])
+    return prices, times
+
+
+def load_sqlite(db_path: str, since: Optional[float] = None, until: Optional[float] = None) -> Dataset:
+    since = since or 0.0
+    until = until or float("inf")
+    conn = sqlite3.connect(db_path)
+    try:
+        price_rows = conn.execute(
+            "SELECT ticker, price, timestamp FROM market_prices WHERE timestamp >= ? AND timestamp <= ?",
+            (since, until),
+        ).fetchall()
+        news_rows = conn.execute(
+            "SELECT title, timestamp, event_data FROM news "
+            "WHERE status = 'relevant' AND event_data IS NOT NULL AND timestamp >= ? AND timestamp <= ?",
+            (since, until),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    prices, times = _group_prices(price_rows)
+    news = [{"title": title, "timestamp": ts, "event": json.loads(event)} for title, ts, event in news_rows]
+    return Dataset(prices, times, news)
+
+
+def load_csv(prices_path: str, news_path: Optional[str] = None) -> Dataset:
+    with open(prices_path, newline="") as f:
+        prices, times = _group_prices((r["ticker"], r["price"], r["timestamp"]) for r in csv.DictReader(f))
+    news = []
+    if news_path:
+        with open(news_path, newline="") as f:
+            for row in csv.DictReader(f):
+                event = json.loads(row["event"]) if row.get("event") else {}
+                news.append({"title": row["title"], "timestamp": float(row["timestamp"]), "event": event})
+    return Dataset(prices, times, news)
@@ -0,0 +1,83 @@
+"""
+Precision/recall of news-to-asset correlation against labeled headlines.
+
+Each line of the labels file is a JSON object with a `title`, an optional
+extracted `event`, and the `assets` (tickers) the headline actually concerns.
+Every (ticker, headline) pair is scored with both the similarity matcher and
+the original keyword matcher; time windows are ignored.
+
+Usage:
+    python -m app.bench.correlation
+    python -m app.bench.correlation --labels my_labels.jsonl --sweep 0.05,0.1,0.15,0.2
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List
+
+from app.ai.embeddings import NewsIndex, embed, news_text
+from app.market.anomalies import ASSET_DESCRIPTORS, keyword_match
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "correlation_labels.jsonl")
+
+
+def load_labels(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _scores(tp: int, fp: int, fn: int) -> dict:
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+    return {"tp": tp, "fp": fp, "fn": fn, "precision": precision, "recall": recall, "f1": f1}
+
+
+def evaluate(examples: List[dict], min_similarity: float) -> Dict[str, dict]:
+    """Micro-averaged precision, recall and F1 per matcher ("semantic", "keyword")."""
+    index = NewsIndex(window_s=float("inf"))
+    items = [
+        {"hash": str(i), "title": ex["title"], "event": ex.get("event"), "timestamp": 0.0}
+        for i, ex in enumerate(examples)
+    ]
+    index.add([(item, embed(news_text(item["title"], item["event"]))) for item in items])
+
+    counts = {"semantic": [0, 0, 0], "keyword": [0, 0, 0]}
+    for ticker, descriptor in ASSET_DESCRIPTORS.items():
+        actual = {item["hash"] for item, ex in zip(items, examples) if ticker in ex.get("assets", [])}
+        predicted = {
+            "semantic": {item["hash"] for item, _ in index.search(descriptor, k=len(items), min_score=min_similarity)},
+            "keyword": {item["hash"] for item in items if keyword_match(ticker, item)},
+        }
+        for method, found in predicted.items():
+            counts[method][0] += len(found & actual)
+            counts[method][1] += len(found - actual)
+            counts[method][2] += len(actual - found)
+    return {method: _scores(*c) for method, c in counts.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--min-similarity", type=float, default=float(os.getenv("CORRELATION_MIN_SIMILARITY", "0.1")))
+    parser.add_argument("--sweep", help="comma-separated similarity thresholds to compare")
+    args = parser.parse_args(argv)
+
+    examples = load_labels(args.labels)
+    thresholds = [float(t) for t in args.sweep.split(",")] if args.sweep else [args.min_similarity]
+    print(f"{len(examples)} labeled headlines, {len(ASSET_DESCRIPTORS)} assets")
+
+    fmt = lambda v: f"{v:.2f}" if v is not None else "-"
+    for i, threshold in enumerate(thresholds):
+        results = evaluate(examples, threshold)
+        # The keyword matcher has no threshold, so it is only reported once
+        for method in ("keyword", "semantic") if i == 0 else ("semantic",):
+            s = results[method]
+            label = f"semantic@{threshold}" if method == "semantic" else method
+            print(f"  {label:15} precision={fmt(s['precision'])} recall={fmt(s['recall'])} "
+                  f"f1={fmt(s['f1'])} (tp={s['tp']} fp={s['fp']} fn={s['fn']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Local stand-ins for the external services the pipeline talks to.
+
+- `FakeGenai`: a drop-in for the `google.genai` module whose client answers
+  relevance, extraction, fused, schema and narration prompts with configurable
+  latency and error injection.
+- `FeedServer`: serves synthetic RSS feeds over HTTP on localhost.
+- `FakeYFinance`: a drop-in for `yfinance` that random-walks prices.
+- `start_redis()`: an in-process fakeredis server, or a spawned redis-server.
+
+`install()` registers the module fakes in `sys.modules`, so it must run before
+the app modules (or their lazy imports) pull in the real SDKs.
+"""
+
+import json
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import types
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+MARKET_WORDS = ["Fed", "inflation", "oil", "OPEC", "gold", "Bitcoin", "earnings", "tariffs", "ECB", "S&P 500"]
+NOISE_WORDS = ["celebrity", "recipe", "football", "weather", "movie", "gardening", "travel", "fashion"]
+
+NUMBERED_LINE = re.compile(r"^\s*(\d+)\.\s+(.+?)\s*$", re.MULTILINE)
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModels:
+    def __init__(self, owner: "FakeGenai"):
+        self.owner = owner
+
+    def generate_content(self, model: str, contents: str, config=None) -> FakeResponse:
+        return self.owner.respond(model, contents)
+
+
+class FakeClient:
+    def __init__(self, owner: "FakeGenai", api_key: Optional[str] = None):
+        self.models = FakeModels(owner)
+
+
+class FakeGenai:
+    """Module-shaped fake of `google.genai`: `FakeGenai(...).Client(api_key=...)`."""
+
+    def __init__(self, latency_s: float = 0.05, error_rate: float = 0.0, seed: int = 7):
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.errors = 0
+
+    def Client(self, api_key: Optional[str] = None, http_options=None) -> FakeClient:
+        return FakeClient(self, api_key=api_key)
+
+    def respond(self, model: str, prompt: str) -> FakeResponse:
+        kind = self._classify(prompt)
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            fail = self._random.random() < self.error_rate
+            jitter = self._random.uniform(0.5, 1.5)
+        time.sleep(self.latency_s * jitter)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            raise RuntimeError("injected fake LLM error (503 UNAVAILABLE)")
+
+        headlines = self._headlines(prompt)
+        if kind == "fused":
+            return FakeResponse(json.dumps([
+                {"i": i + 1, "relevant": self._is_market(h), "event": self._event(h) if self._is_market(h) else None}
+                for i, h in enumerate(headlines)
+            ]))
+        if kind == "relevance":
+            return FakeResponse(json.dumps([
+                {"i": i + 1, "relevant": self._is_market(h)} for i, h in enumerate(headlines)
+            ]))
+        if kind == "extraction":
+            return FakeResponse(json.dumps([{"i": i + 1, **self._event(h)} for i, h in enumerate(headlines)]))
+        if kind == "schema":
+            return FakeResponse(json.dumps({
+                "title_field": "title",
+                "link_field": "link",
+                "date_fields": ["published", "updated"],
+                "description_field": "summary",
+                "author_field": "author",
+            }))
+        return FakeResponse("Prices moved sharply on the session. Next step: check the related headlines.")
+
+    @staticmethod
+    def _classify(prompt: str) -> str:
+        if "RSS feed entries" in prompt:
+            return "schema"
+        if "GLOBAL FINANCIAL MARKETS" in prompt and "extract structured" in prompt:
+            return "fused"
+        if "GLOBAL FINANCIAL MARKETS" in prompt:
+            return "relevance"
+        if "Extract structured" in prompt:
+            return "extraction"
+        return "narration"
+
+    @staticmethod
+    def _headlines(prompt: str) -> List[str]:
+        # Only the numbered list after "Headlines:"; the instructions have numbered lists too
+        section = prompt.split("Headlines:", 1)[-1].split("Respond", 1)[0]
+        return [m.group(2) for m in NUMBERED_LINE.finditer(section)]
+
+    @staticmethod
+    def _is_market(headline: str) -> bool:
+        return any(w.lower() in headline.lower() for w in MARKET_WORDS)
+
+    def _event(self, headline: str) -> dict:
+        assets = [w for w in MARKET_WORDS if w.lower() in headline.lower()] or ["S&P500"]
+        return {
+            "event_type": "Macroeconomic",
+            "affected_assets": assets,
+            "impact_direction": self._random.choice(["Bullish", "Bearish", "Volatile"]),
+            "certainty_score": round(self._random.uniform(0.4, 0.95), 2),
+        }
+
+    def as_module(self) -> types.ModuleType:
+        module = types.ModuleType("google.genai")
+        module.Client = self.Client
+        module.types = types.SimpleNamespace()
+        return module
+
+
+def synthetic_headlines(count: int, market_share: float = 0.4, seed: int = 11) -> List[str]:
+    rng = random.Random(seed)
+    headlines = []
+    for i in range(count):
+        words = MARKET_WORDS if rng.random() < market_share else NOISE_WORDS
+        headlines.append(f"{rng.choice(words).capitalize()} update #{i}: {rng.choice(words)} and {rng.choice(NOISE_WORDS)} in focus")
+    return headlines
+
+
+class FeedServer:
+    """Serves `/feed/<n>.xml`, splitting the given headlines across `feeds` RSS documents."""
+
+    def __init__(self, headlines: List[str], feeds: int = 4):
+        self.documents = {}
+        now = time.time()
+        for n in range(feeds):
+            items = []
+            for i, title in enumerate(headlines[n::feeds]):
+                items.append(
+                    f"<item><title>{escape(title)}</title><link>http://bench.local/{n}/{i}</link>"
+                    f"<guid>bench-{n}-{i}</guid><pubDate>{formatdate(now - i, usegmt=True)}</pubDate></item>"
+                )
+            self.documents[f"/feed/{n}.xml"] = (
+                "<?xml version=\"1.0\"?><rss version=\"2.0\"><channel><title>bench</title>"
+                + "".join(items) + "</channel></rss>"
+            ).encode("utf-8")
+
+        documents = self.documents
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = documents.get(self.path)
+                self.send_response(200 if body else 404)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.end_headers()
+                self.wfile.write(body or b"")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def urls(self) -> List[str]:
+        host, port = self.server.server_address
+        return [f"http://{host}:{port}{path}" for path in self.documents]
+
+    def close(self):
+        self.server.shutdown()
+
+
+class FakeYFinance:
+    """Module-shaped fake of `yfinance`: each `fast_info['lastPrice']` read takes one random-walk step."""
+
+    def __init__(self, volatility: float = 0.004, jump_probability: float = 0.01, seed: int = 3):
+        self.volatility = volatility
+        self.jump_probability = jump_probability
+        self._random = random.Random(seed)
+        self._prices: Dict[str, float] = {}
+
+    def _next_price(self, ticker: str) -> float:
+        price = self._prices.get(ticker) or self._random.uniform(10, 5000)
+        step = self._random.gauss(0, self.volatility)
+        if self._random.random() < self.jump_probability:
+            step += self._random.choice([-1, 1]) * self.volatility * 10
+        price *= 1 + step
+        self._prices[ticker] = price
+        return price
+
+    def Ticker(self, ticker: str):
+        fake = self
+        return types.SimpleNamespace(fast_info=_LazyPrice(lambda: fake._next_price(ticker)))
+
+    def as_module(self) -> types.ModuleType:
+        module = types.ModuleType("yfinance")
+        module.Ticker = self.Ticker
+        return module
+
+
+class _LazyPrice:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def __getitem__(self, key):
+        return self._fn()
+
+
+def install(genai: FakeGenai, yfinance: Optional[FakeYFinance] = None):
+    """Register the fakes under the real module names."""
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.genai = genai.as_module()
+    sys.modules["google"] = google
+    sys.modules["google.genai"] = google.genai
+    if yfinance is not None:
+        sys.modules["yfinance"] = yfinance.as_module()
+
+
+def start_redis():
+    """
+    Returns (host, port, stop) for a throwaway Redis.
+
+    Prefers fakeredis (patched in as `redis.Redis` so every NewsStorage
+    shares one in-process server); otherwise spawns a local redis-server.
+    """
+    try:
+        import fakeredis  # type: ignore
+    except ImportError:
+        fakeredis = None
+
+    if fakeredis is not None:
+        import redis
+
+        server = fakeredis.FakeServer()
+        # fakeredis subclasses the real client, so only the name the app calls is swapped
+        redis.Redis = lambda *args, **kwargs: fakeredis.FakeRedis(server=server)
+        return "fakeredis", 0, lambda: None
+
+    binary = shutil.which("redis-server")
+    if not binary:
+        raise RuntimeError("Benchmark needs either the fakeredis package or a redis-server binary")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return "127.0.0.1", port, proc.terminate
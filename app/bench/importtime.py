@@ -0,0 +1,98 @@
+"""
+Cold import-time profile for each entry point, based on `python -X importtime`.
+
+Every module is imported in a fresh interpreter, so the numbers include the
+third-party packages it pulls in, just as a container restart would.
+
+Usage:
+    python -m app.bench.importtime                  # every entry point
+    python -m app.bench.importtime app.workers.market --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+ENTRY_POINTS = [
+    "app.main",
+    "app.workers.ingestor",
+    "app.workers.relevance",
+    "app.workers.extractor",
+    "app.workers.market",
+    "app.workers.anomaly_worker",
+    "app.workers.all_in_one",
+]
+
+# Packages that should only load when they are first used
+HEAVY_MODULES = ["google.genai", "redis", "requests", "feedparser", "yfinance", "numpy"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def profile_import(module: str) -> Dict:
+    """
+    Imports `module` in a fresh interpreter and returns its cumulative import
+    time, the slowest modules it pulled in, and which HEAVY_MODULES got loaded.
+    """
+    code = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_ROOT,
+    )
+
+    # Lines look like "import time:   self_us |  cumulative_us | <indent>name", with
+    # each module listed after everything it imported (children are indented deeper)
+    lines = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        lines.append((len(name) - len(name.lstrip()), {
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        }))
+
+    # Keep only the target's subtree, not interpreter start-up imports
+    subtree = []
+    for i, (depth, entry) in enumerate(lines):
+        if entry["module"] == module:
+            subtree = [entry]
+            for child_depth, child in reversed(lines[:i]):
+                if child_depth <= depth:
+                    break
+                subtree.append(child)
+            break
+
+    return {
+        "module": module,
+        "cumulative_ms": subtree[0]["cumulative_ms"] if subtree else None,
+        "slowest": sorted(subtree, key=lambda m: m["cumulative_ms"], reverse=True),
+        "heavy_loaded": [m for m in proc.stdout.strip().split(",") if m],
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per entry point")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        result = profile_import(module)
+        print(f"{module}: {result['cumulative_ms']:.1f} ms "
+              f"(heavy: {', '.join(result['heavy_loaded']) or 'none'})")
+        for m in result["slowest"][1:args.top + 1]:
+            print(f"    {m['cumulative_ms']:8.1f} ms  {m['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Offline pipeline benchmark.
+
+Runs the real ingestor, relevance and extraction workers in threads against
+local fakes (Gemini, Redis, RSS feeds, prices) and reports:
+
+- headlines/sec per pipeline stage and end-to-end latency percentiles
+- SQLite write rate for news and price rows (one by one, and batched ticks)
+- anomaly detection cost as the number of tickers grows
+
+Usage:
+    python -m app.bench.run --headlines 300 --llm-latency-ms 100 --out bench_results.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from app.bench import fakes
+
+
+def _stage_throughput(rows: list) -> dict:
+    from app.storage.sqlite_db import STAGES
+
+    throughput = {}
+    for stage in STAGES:
+        times = sorted(row[stage] for row in rows if row.get(stage) is not None)
+        span = times[-1] - times[0] if len(times) > 1 else 0.0
+        throughput[stage] = {
+            "items": len(times),
+            "per_s": round(len(times) / span, 2) if span > 0 else None,
+        }
+    return throughput
+
+
+def bench_pipeline(args, genai: fakes.FakeGenai) -> dict:
+    from app.storage.dedup import NewsStorage
+    from app.storage.stage_timings import summarize_stage_latencies
+    from app.workers.extractor import run_extraction_worker
+    from app.workers.ingestor import run_ingestor
+    from app.workers.relevance import run_relevance_worker
+
+    headlines = fakes.synthetic_headlines(args.headlines)
+    feed_server = fakes.FeedServer(headlines, feeds=args.feeds)
+    os.environ["RSS_FEEDS"] = ",".join(feed_server.urls)
+
+    if args.sqlite_writer:
+        from app.workers.sqlite_writer import run_sqlite_writer
+
+        os.environ["SQLITE_WRITER"] = "redis"
+        threading.Thread(target=run_sqlite_writer, daemon=True).start()
+
+    storage = NewsStorage()
+    if args.sqlite_writer:
+        from app.registry import list_workers
+
+        # Workers only read the database, over read-only connections: the writer creates it
+        # and its schema, and registers once that is done
+        while not any(w["stage"] == "sqlite-writer" for w in list_workers(storage.client)):
+            time.sleep(0.05)
+    start = time.time()
+    for worker in (run_ingestor, run_relevance_worker, run_extraction_worker):
+        threading.Thread(target=worker, daemon=True).start()
+
+    done = 0
+    deadline = start + args.timeout_s
+    while time.time() < deadline:
+        counts = storage.db.count_by_status()
+        done = sum(counts.get(s, 0) for s in ("relevant", "ignored", "failed", "stale"))
+        if done >= len(headlines):
+            break
+        time.sleep(0.2)
+    elapsed = time.time() - start
+    feed_server.close()
+
+    rows = storage.db.get_stage_timings(since=start)
+    return {
+        "headlines": len(headlines),
+        "completed": done,
+        "timed_out": done < len(headlines),
+        "duration_s": round(elapsed, 3),
+        "end_to_end_per_s": round(done / elapsed, 2) if elapsed else None,
+        "stage_throughput": _stage_throughput(rows),
+        "latency_s": summarize_stage_latencies(rows),
+        "llm_calls": dict(genai.calls),
+        "llm_injected_errors": genai.errors,
+    }
+
+
+def bench_sqlite(rows: int) -> dict:
+    from app.storage.sqlite_db import DashboardDB
+
+    db = DashboardDB(os.path.join(tempfile.mkdtemp(prefix="bench-sqlite-"), "bench.db"))
+    start = time.perf_counter()
+    for i in range(rows):
+        db.save_news(f"bench-{i}", f"Bench headline {i}", "pending", time.time())
+    news_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(rows):
+        db.save_price(f"T{i % 20}", 100.0 + i)
+    prices_s = time.perf_counter() - start
+
+    # The streaming market worker's path: one transaction per batch of ticks
+    ticks = [(f"T{i % 20}", 100.0 + i, time.time()) for i in range(rows)]
+    start = time.perf_counter()
+    for i in range(0, rows, 1000):
+        db.save_prices(ticks[i:i + 1000])
+    batched_s = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "save_news_per_s": round(rows / news_s, 1),
+        "save_price_per_s": round(rows / prices_s, 1),
+        "save_prices_batched_per_s": round(rows / batched_s, 1),
+    }
+
+
+def bench_anomaly_detection(ticker_counts: list, snapshots: int) -> list:
+    from app.market.anomalies import AnomalyDetector
+    from app.market.prices import MarketData
+    from app.storage.sqlite_db import DashboardDB
+
+    results = []
+    for count in ticker_counts:
+        db = DashboardDB(os.path.join(tempfile.mkdtemp(prefix="bench-anomaly-"), "bench.db"))
+        market = MarketData(tickers=[f"SYM{i}" for i in range(count)])
+        for _ in range(snapshots):
+            for ticker, price in market.fetch_latest().items():
+                db.save_price(ticker, price)
+
+        detector = AnomalyDetector(db, threshold=0.005)
+        start = time.perf_counter()
+        anomalies = detector.detect_anomalies()
+        for anomaly in anomalies:
+            detector.correlate_with_news(anomaly)
+        seconds = time.perf_counter() - start
+        results.append({
+            "tickers": count,
+            "anomalies": len(anomalies),
+            "seconds": round(seconds, 4),
+            "ms_per_ticker": round(seconds * 1000 / count, 3),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headlines", type=int, default=200)
+    parser.add_argument("--feeds", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--sqlite-rows", type=int, default=2000)
+    parser.add_argument("--tickers", default="5,50,200", help="comma-separated ticker counts for the anomaly benchmark")
+    parser.add_argument("--snapshots", type=int, default=10)
+    parser.add_argument("--timeout-s", type=float, default=300)
+    parser.add_argument("--sqlite-writer", action="store_true", help="route pipeline writes through the single-writer service")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--verbose", action="store_true", help="show worker output")
+    args = parser.parse_args(argv)
+
+    genai = fakes.FakeGenai(latency_s=args.llm_latency_ms / 1000, error_rate=args.llm_error_rate)
+    fakes.install(genai, fakes.FakeYFinance())
+    redis_host, redis_port, stop_redis = fakes.start_redis()
+
+    os.environ.update({
+        "DB_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-"), "market_monitor.db"),
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_RPM": "100000",
+        "REDIS_HOST": redis_host,
+        "REDIS_PORT": str(redis_port or 6379),
+    })
+
+    out = sys.stdout
+    quiet = open(os.devnull, "w") if not args.verbose else sys.stdout
+    try:
+        with contextlib.redirect_stdout(quiet):
+            results = {
+                "config": vars(args),
+                "pipeline": bench_pipeline(args, genai),
+                "sqlite": bench_sqlite(args.sqlite_rows),
+                "anomaly_detection": bench_anomaly_detection(
+                    [int(n) for n in args.tickers.split(",") if n], args.snapshots
+                ),
+            }
+    finally:
+        stop_redis()
+
+    text = json.dumps(results, indent=2)
+    with open(args.out, "w") as f:
+        f.write(text)
+    print(text, file=out)
+    print(f"Saved benchmark results to {args.out}", file=out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+SQLite write throughput and latency: direct DashboardDB writes versus the
+single-writer service with group commit (app.storage.writer).
+
+Each of `--writers` threads plays one worker process with its own DashboardDB
+(so writers contend on SQLite's file lock, as separate containers do) or its
+own WriterClientDB, and issues a mix of headline saves, status transitions and
+price ticks as fast as it can.
+
+Usage:
+    python -m app.bench.sqlite_writer --writers 6 --ops 300
+    python -m app.bench.sqlite_writer --flush-ms 1,5 --max-batch 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from app.bench import fakes
+from app.storage.stage_timings import percentile
+
+
+def _workload(db, writer_id: int, ops: int, latencies: list, errors: list):
+    for i in range(ops):
+        news_hash = f"w{writer_id}-{i}"
+        start = time.perf_counter()
+        try:
+            if i % 3 == 0:
+                db.save_price(f"T{writer_id}", 100.0 + i)
+            else:
+                db.save_news(news_hash, f"Bench headline {writer_id}/{i}", "pending", time.time())
+                db.transition_news([(news_hash, "pending", "analyzing", None)])
+        except Exception as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def _run(make_db, writers: int, ops: int) -> dict:
+    dbs = [make_db() for _ in range(writers)]
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=_workload, args=(db, i, ops, latencies, errors), daemon=True)
+        for i, db in enumerate(dbs)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "errors": len(errors),
+        "calls_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def bench_direct(writers: int, ops: int) -> dict:
+    from app.storage.sqlite_db import DashboardDB
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-direct-"), "bench.db")
+    DashboardDB(path)
+    return _run(lambda: DashboardDB(path), writers, ops)
+
+
+def bench_writer(writers: int, ops: int, flush_ms: float, max_batch: int) -> dict:
+    import redis
+
+    from app.storage.writer import GroupCommitDB, SQLiteWriter, WriterClientDB
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-writer-"), "bench.db")
+    client = redis.Redis()
+    client.flushdb()
+    writer = SQLiteWriter(client, GroupCommitDB(path), flush_ms=flush_ms, max_batch=max_batch)
+    stop = threading.Event()
+    groups = []
+
+    def serve():
+        while not stop.is_set():
+            group = writer.next_group(timeout=0.1)
+            if group:
+                writer.process(group)
+                groups.append(len(group))
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        result = _run(lambda: WriterClientDB(redis.Redis(), path), writers, ops)
+    finally:
+        stop.set()
+        thread.join()
+    result.update({
+        "flush_ms": flush_ms,
+        "groups": len(groups),
+        "mean_group_size": round(sum(groups) / len(groups), 1) if groups else None,
+    })
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=6, help="concurrent writers (one per worker process)")
+    parser.add_argument("--ops", type=int, default=300, help="calls per writer")
+    parser.add_argument("--flush-ms", default="0,2", help="comma-separated writer flush windows to try")
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--out", default="bench_sqlite_writer.json")
+    args = parser.parse_args(argv)
+
+    _, _, stop_redis = fakes.start_redis()
+    try:
+        results = {
+            "config": vars(args),
+            "direct": bench_direct(args.writers, args.ops),
+            "writer": [
+                bench_writer(args.writers, args.ops, float(ms), args.max_batch)
+                for ms in args.flush_ms.split(",") if ms
+            ],
+        }
+    finally:
+        stop_redis()
+
+    text = json.dumps(results, indent=2)
+    with open(args.out, "w") as f:
+        f.write(text)
+    print(text)
+    print(f"Saved benchmark results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,29 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from app.storage.dedup import NewsStorage
+from app.ingestion.pipeline import has_capacity, normalize_entry, process_entries
+from app.storage.export import FORMATS, csv_chunks, gzip_chunks, ndjson_chunks
+from app.storage.sqlite_db import EXPORTS
+from app.metrics import metrics, render_prometheus
+from app.ai.breaker import llm_breaker
+from app.ai.router import usage_summary
+from app.registry import list_workers, stage_summary
+from app.storage.stage_timings import summarize_stage_latencies
+import asyncio
+import json
+import math
 import os
+import time
 
 app = FastAPI()
 storage = NewsStorage()
+llm_breaker.attach(storage.client)
+price_series = None  # app.market.price_series.PriceSeries, created on first use (numpy)
+# Concurrent /api/ingest requests; with the per-line and per-chunk limits this bounds ingest memory
+ingest_slots = asyncio.Semaphore(int(os.getenv("INGEST_MAX_CONCURRENT", "4")))
 
 
 templates = Jinja2Templates(directory="app/dashboard/templates")
@@ -28,7 +45,167 @@ async def get_status():
             "relevance": storage.get_queue_length("relevance"),
             "extraction": storage.get_queue_length("extraction")
         },
-        "prices": storage.db.get_latest_prices(),
+        "queue_details": {
+            "relevance": storage.get_queue_stats("relevance"),
+            "extraction": storage.get_queue_stats("extraction")
+        },
+        "prices": storage.get_latest_prices(),
         "anomalies": storage.db.get_recent_anomalies(limit=5),
-        "model": os.getenv("GEMINI_MODEL", "unknown")
+        "cross_asset": storage.get_snapshot("cross_asset"),
+        "model": os.getenv("GEMINI_MODEL", "unknown"),
+        "llm": usage_summary(*_collect_metrics()),
+        "llm_breaker": llm_breaker.status(),
+        "workers": _worker_stages(list_workers(storage.client))
+    }
+
+def _worker_stages(workers):
+    return stage_summary(workers, {q: storage.get_queue_length(q) for q in ("relevance", "extraction")})
+
+@app.get("/api/workers")
+def get_workers():
+    """Registered workers with their heartbeat stats, and per-stage capacity and lag."""
+    workers = list_workers(storage.client)
+    return {"workers": workers, "stages": _worker_stages(workers)}
+
+@app.get("/api/prices/{ticker}")
+def get_price_chart(
+    ticker: str,
+    range: str = "1d",
+    start: float = None,
+    end: float = None,
+    points: int = Query(500, ge=3, le=5000),
+):
+    """Downsampled price series; `range` counts back from `end` (default now) unless `start` is given."""
+    global price_series
+    from app.market.price_series import RANGES, PriceSeries
+
+    if price_series is None:
+        price_series = PriceSeries(storage.db)
+    if start is None and range not in RANGES:
+        raise HTTPException(status_code=400, detail=f"range must be one of {', '.join(RANGES)}")
+    if end is None:
+        # Round up to the market poll interval so repeat requests within a minute hit the cache
+        end = math.ceil(time.time() / 60) * 60
+    if start is None:
+        start = end - RANGES[range]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return price_series.get(ticker, start, end, points)
+
+@app.get("/api/export/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    start: float = 0.0,
+    end: float = None,
+    ticker: str = None,
+    gzip: bool = False,
+):
+    """Streams every row of `dataset` (news, anomalies, prices) with start <= timestamp < end."""
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=400, detail=f"dataset must be one of {', '.join(EXPORTS)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    end = time.time() if end is None else end
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    columns = EXPORTS[dataset][1]
+    encode = ndjson_chunks if format == "ndjson" else csv_chunks
+    body = encode(columns, storage.db.iter_export(dataset, start, end, ticker))
+    filename = f"{dataset}.{format}"
+    media_type = FORMATS[format]
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.post("/api/ingest")
+async def ingest_news(request: Request):
+    """
+    Bulk push of news entries as NDJSON, one {"title", "link", "published"}
+    object per line. Lines are parsed as the body arrives, and the entries of
+    each received chunk (at most INGEST_CHUNK at a time) go through dedup into
+    the relevance queue, so a long-lived stream's items aren't held. While the
+    queue is full the body is not read further (up to INGEST_MAX_WAIT_S, then
+    429). Duplicates are skipped, so a failed push can be retried whole.
+    """
+    CHUNK = int(os.getenv("INGEST_CHUNK", "100"))
+    MAX_LINE_BYTES = 64 * 1024
+    MAX_WAIT_S = float(os.getenv("INGEST_MAX_WAIT_S", "30"))
+    MAX_ERRORS_REPORTED = 20
+
+    token = os.getenv("INGEST_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="invalid ingest token")
+    if ingest_slots.locked():
+        raise HTTPException(status_code=429, detail="too many concurrent ingests", headers={"Retry-After": "1"})
+
+    counts = {"received": 0, "new": 0, "rejected": 0, "errors": []}
+
+    async def flush(batch):
+        waited = 0.0
+        while not await run_in_threadpool(has_capacity, storage):
+            if waited >= MAX_WAIT_S:
+                raise HTTPException(status_code=429, headers={"Retry-After": "30"},
+                                    detail={"error": "relevance queue is full", **counts})
+            await asyncio.sleep(0.5)
+            waited += 0.5
+        counts["new"] += await run_in_threadpool(process_entries, storage, batch)
+
+    def parse(line: bytes, batch: list):
+        if not line.strip():
+            return
+        counts["received"] += 1
+        try:
+            batch.append(normalize_entry(json.loads(line)))
+        except ValueError as e:  # includes malformed JSON
+            counts["rejected"] += 1
+            metrics.inc("pipeline_items_total", stage="ingestion", outcome="rejected")
+            if len(counts["errors"]) < MAX_ERRORS_REPORTED:
+                counts["errors"].append({"line": counts["received"], "error": str(e)})
+
+    async with ingest_slots:
+        buffer = b""
+        batch = []
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > MAX_LINE_BYTES:
+                raise HTTPException(status_code=413, detail=f"line longer than {MAX_LINE_BYTES} bytes")
+            for line in lines:
+                parse(line, batch)
+                if len(batch) >= CHUNK:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+                batch = []
+        parse(buffer, batch)
+        if batch:
+            await flush(batch)
+    return counts
+
+@app.get("/api/latency")
+def get_latency(window_s: int = 3600):
+    rows = storage.db.get_stage_timings(since=time.time() - window_s)
+    return {
+        "window_s": window_s,
+        "headlines": len(rows),
+        "segments": summarize_stage_latencies(rows)
     }
+
+def _collect_metrics():
+    if storage.client is None:
+        return metrics.snapshot()
+    return metrics.collect_from_redis(storage.client)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    counters, gauges = _collect_metrics()
+    # Queue depth is read at scrape time rather than reported by a worker
+    for queue in ("relevance", "extraction"):
+        gauges[f'queue_depth{{queue="{queue}"}}'] = storage.get_queue_length(queue)
+    return render_prometheus(counters, gauges)
@@ -1,7 +1,33 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 
 class NewsSource(ABC):
+    """
+    A source of news entries: dicts with `title`, and optionally `link` and
+    `published` (Unix time). Pull sources implement `fetch_headlines`; the
+    default `stream()` polls it. Push sources subclass StreamingNewsSource.
+    """
+
+    poll_interval_s = 120
+
+    @abstractmethod
+    def fetch_headlines(self) -> List[dict]:
+        """Entries that are new since the last call."""
+
+    async def stream(self) -> AsyncIterator[List[dict]]:
+        """Batches of entries as they arrive, forever."""
+        while True:
+            yield await asyncio.to_thread(self.fetch_headlines)
+            await asyncio.sleep(self.poll_interval_s)
+
+class StreamingNewsSource(NewsSource):
+    """A source that pushes entries as they happen (a websocket, a message queue); implement `stream()`."""
+
+    def fetch_headlines(self) -> List[dict]:
+        # Everything arrives through stream()
+        return []
+
     @abstractmethod
-    def fetch_headlines(self) -> List[str]:
-        pass
+    def stream(self) -> AsyncIterator[List[dict]]:
+        """Batches of entries as they arrive, forever."""
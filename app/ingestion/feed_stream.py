@@ -0,0 +1,75 @@
+"""
+Streaming RSS/Atom entry parser.
+
+Yields one plain dict per <item>/<entry> while the document is being parsed,
+so callers can stop as soon as they reach entries they have already seen.
+Keys are normalized to the names feedparser uses (title, link, id, published,
+updated, summary, author) so learned schemas apply to either parser; any other
+simple child element is kept under its local tag name.
+
+Malformed documents raise `xml.etree.ElementTree.ParseError`; callers fall back
+to feedparser, which is far more lenient.
+"""
+
+import io
+from typing import Dict, Iterator
+from xml.etree import ElementTree
+
+ENTRY_TAGS = {"item", "entry"}
+
+# Keys both this parser and feedparser produce for the same entry
+NORMALIZED_KEYS = frozenset({"title", "link", "id", "published", "updated", "summary", "author"})
+
+# RSS 2.0 / Dublin Core tag -> feedparser key
+KEY_ALIASES = {
+    "guid": "id",
+    "pubDate": "published",
+    "description": "summary",
+    "creator": "author",
+    "date": "published",
+    "content": "summary",
+}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if "}" in tag else tag
+
+
+def _entry_to_dict(elem: ElementTree.Element) -> Dict[str, str]:
+    entry: Dict[str, str] = {}
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == "link" and child.get("href"):
+            # Atom: prefer rel="alternate" (or no rel) over enclosures/self links
+            if child.get("rel", "alternate") == "alternate" or "link" not in entry:
+                entry["link"] = child.get("href")
+            continue
+        if name == "author" and len(child):
+            # Atom: <author><name>...</name></author>
+            for sub in child:
+                if _local_name(sub.tag) == "name" and sub.text:
+                    entry["author"] = sub.text.strip()
+            continue
+        if len(child) or not child.text:
+            continue
+        key = KEY_ALIASES.get(name, name)
+        # Keep the first occurrence, e.g. Atom <published> over a later <updated>
+        entry.setdefault(key, child.text.strip())
+    return entry
+
+
+def iter_feed_entries(content: bytes) -> Iterator[Dict[str, str]]:
+    """Lazily yield normalized entry dicts from an RSS or Atom document."""
+    depth_in_entry = 0
+    for event, elem in ElementTree.iterparse(io.BytesIO(content), events=("start", "end")):
+        is_entry = _local_name(elem.tag) in ENTRY_TAGS
+        if event == "start":
+            if is_entry:
+                depth_in_entry += 1
+            continue
+        if is_entry:
+            depth_in_entry -= 1
+            if depth_in_entry == 0:
+                entry = _entry_to_dict(elem)
+                elem.clear()
+                yield entry
@@ -0,0 +1,150 @@
+"""
+The dedup -> relevance entry point shared by every way news arrives.
+
+- the ingestor's RSS polling,
+- streaming NewsSources (NEWS_SOURCES, run by the ingestor, see `ingest_stream`),
+- HTTP pushes to /api/ingest.
+
+All of them hand batches of entries to `process_entries`. Entries are dicts
+with `title`, and optionally `link` and `published` (Unix time). Pushed
+entries are checked with `normalize_entry` first.
+
+Backpressure: new entries are only taken while the relevance queue holds
+fewer than INGEST_MAX_QUEUE_DEPTH items (see `has_capacity`). A streaming
+source is not iterated further until there is room, and the HTTP endpoint
+stops reading the request body.
+"""
+
+import asyncio
+import importlib
+import os
+import time
+from datetime import datetime
+from typing import List
+
+from app.ingestion.base import NewsSource
+from app.metrics import metrics
+from app.storage.dedup import NewsStorage
+
+MAX_ITEM_AGE_S = 86400  # news older than a day is skipped
+MAX_TITLE_CHARS = 1000
+
+
+def has_capacity(storage: NewsStorage, max_queue_depth: int = None) -> bool:
+    max_queue_depth = max_queue_depth or int(os.getenv("INGEST_MAX_QUEUE_DEPTH", "5000"))
+    return storage.get_queue_length("relevance") < max_queue_depth
+
+
+def normalize_entry(raw) -> dict:
+    """A pushed entry in the shape process_entries expects; raises ValueError if it is unusable."""
+    if not isinstance(raw, dict):
+        raise ValueError("entry must be a JSON object")
+    title = raw.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title is required")
+    if len(title) > MAX_TITLE_CHARS:
+        raise ValueError(f"title is longer than {MAX_TITLE_CHARS} characters")
+    link = raw.get("link")
+    if link is not None and not isinstance(link, str):
+        raise ValueError("link must be a string")
+
+    published = raw.get("published")
+    if isinstance(published, str):
+        try:
+            published = datetime.fromisoformat(published.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            raise ValueError("published must be Unix time or ISO 8601") from None
+    elif published is not None and (isinstance(published, bool) or not isinstance(published, (int, float))):
+        raise ValueError("published must be Unix time or ISO 8601")
+    return {"title": title.strip(), "link": link, "published": float(published) if published else None}
+
+
+def process_entries(storage: NewsStorage, entries: list, max_item_age_s: float = MAX_ITEM_AGE_S) -> int:
+    """Dedup fetched entries, store the new ones as pending and queue them for relevance."""
+    new_count = 0
+    skipped_old = 0
+    oldest_allowed = time.time() - max_item_age_s
+
+    fresh = []
+    for entry in entries:
+        published = entry.get('published')
+        # Skip news older than 1 day
+        if published and published < oldest_allowed:
+            skipped_old += 1
+            continue
+        fresh.append((entry, storage._get_hash(entry['title'])))
+
+    # One lookup for the whole batch instead of one or two queries per entry
+    known = storage.db.get_news_by_hashes([news_hash for _, news_hash in fresh])
+    seen = set()  # the same title twice in one batch
+
+    for entry, news_hash in fresh:
+        if news_hash in seen:
+            continue
+        seen.add(news_hash)
+        h = entry['title']
+        link = entry['link']
+        published = entry.get('published')
+        existing = known.get(news_hash)
+
+        if existing is None:
+            # Other producers (RSS, streaming sources, /api/ingest) may have stored it since the
+            # lookup: only the one whose insert applies queues it, and a row that moved on stays put
+            if storage.add_headline(h, status="pending", link=link, published=published, news_hash=news_hash):
+                new_count += 1
+                print(f"  [NEW] {h}", flush=True)
+                storage.push_to_queue("relevance", {"hash": news_hash, "title": h, "link": link, "published": published})
+                metrics.inc("pipeline_items_total", stage="ingestion", outcome="new")
+        elif published:
+            # Update publication date for existing entries if we have it
+            if abs(existing.timestamp - published) > 86400:  # More than 1 day difference
+                print(f"  [BACKFILL] Updating timestamp for: {h[:60]}...", flush=True)
+                # Conditional on the status we read, so a worker's concurrent transition wins
+                storage.transition([(news_hash, existing.status, existing.status, {"link": link, "timestamp": published})])
+
+    if skipped_old > 0:
+        print(f"  [FILTERED] Skipped {skipped_old} articles older than 1 day", flush=True)
+    return new_count
+
+
+async def ingest_stream(storage: NewsStorage, source: NewsSource, max_item_age_s: float = MAX_ITEM_AGE_S):
+    """Feeds a NewsSource's batches into the pipeline as they arrive, waiting while the relevance queue is full."""
+    name = type(source).__name__
+    async for batch in source.stream():
+        while not has_capacity(storage):
+            await asyncio.sleep(1)
+        entries = []
+        for raw in batch:
+            try:
+                entries.append(normalize_entry(raw))
+            except ValueError as e:
+                print(f"  [{name}] Rejected entry: {e}", flush=True)
+                metrics.inc("pipeline_items_total", stage="ingestion", outcome="rejected")
+        if entries:
+            new_count = await asyncio.to_thread(process_entries, storage, entries, max_item_age_s)
+            print(f"  [{name}] {len(entries)} entries, {new_count} new", flush=True)
+
+
+async def _run_source(storage: NewsStorage, source: NewsSource, restart_s: float):
+    while True:
+        try:
+            await ingest_stream(storage, source)
+        except Exception as e:
+            print(f"News Source Error ({type(source).__name__}): {e}", flush=True)
+        await asyncio.sleep(restart_s)
+
+
+def run_sources(storage: NewsStorage, sources: List[NewsSource], restart_s: float = 10):
+    """Runs streaming sources on one event loop until the process exits, restarting any that fail."""
+    async def run_all():
+        await asyncio.gather(*(_run_source(storage, source, restart_s) for source in sources))
+    asyncio.run(run_all())
+
+
+def load_sources(spec: str) -> List[NewsSource]:
+    """Instantiates streaming sources from NEWS_SOURCES-style `package.module:ClassName` entries."""
+    sources = []
+    for path in filter(None, (part.strip() for part in spec.split(","))):
+        module, _, name = path.partition(":")
+        sources.append(getattr(importlib.import_module(module), name)())
+    return sources
@@ -1,14 +1,31 @@
-import feedparser
+import email.utils
 import os
-import requests
-from typing import List
+import re
+import time
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError
 from app.ingestion.base import NewsSource
+from app.ingestion.feed_stream import iter_feed_entries
 from app.ingestion.schema_learner import FeedSchemaLearner
+from app.storage.sqlite_db import DashboardDB
+from app.metrics import metrics
 
 class RSSIngestor(NewsSource):
-    def __init__(self):
+    # Number of most recent entry ids remembered per feed (the high-water mark)
+    SEEN_IDS_KEPT = 50
+    # Entries published this long before the newest seen item count as already seen
+    PUBLISHED_GRACE_S = 3600
+    TTL_RE = re.compile(rb"<ttl>\s*(\d+)\s*</ttl>", re.IGNORECASE)
+    MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+    def __init__(self, db: Optional[DashboardDB] = None):
         self.feeds = self._get_feeds()
-        self.schema_learner = FeedSchemaLearner()
+        self.db = db
+        self.schema_learner = FeedSchemaLearner(db=db)
+        self._feed_state: Dict[str, dict] = {}
+        # Conditional GET validators (ETag / Last-Modified) per feed URL
+        self._validators: Dict[str, dict] = {}
 
     def _get_feeds(self) -> List[str]:
         feeds_str = os.getenv("RSS_FEEDS", "")
@@ -19,31 +36,151 @@ class RSSIngestor(NewsSource):
     def fetch_headlines(self) -> List[dict]:
         results = []
         for url in self.feeds:
-            try:
-                print(f"Fetching feed: {url}", flush=True)
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                
-                feed = feedparser.parse(response.content)
-                
-                # Learn schema directly from feed response entries
-                if feed.entries:
-                    schema = self.schema_learner.learn_schema(url, feed.entries)
-                else:
-                    schema = self.schema_learner._default_schema()
-                
-                # Parse all entries using the schema
-                for entry in feed.entries:
-                    if hasattr(entry, 'title'):
-                        parsed = self.schema_learner.parse_entry(entry, schema)
-                        
-                        results.append({
-                            "title": parsed["title"] or entry.title,
-                            "link": parsed["link"],
-                            "published": parsed["published"]
-                        })
-                
-                print(f"Success: Found {len(feed.entries)} items from {url}", flush=True)
-            except Exception as e:
-                print(f"Error fetching {url}: {e}", flush=True)
+            result = self.fetch_feed(url)
+            self.commit_feed(url, result)
+            results.extend(result["items"])
         return results
+
+    def fetch_feed(self, url: str) -> dict:
+        """
+        Fetch one feed and return its new items plus the publisher's polling hints.
+
+        Returns a dict with `ok`, `items`, `ttl_s` (channel <ttl>), `max_age_s`
+        (Cache-Control), `retry_after_s` (Retry-After, mostly on 429/503) and
+        `feed_state`, the advanced high-water mark. Neither the mark nor the
+        new ETag/Last-Modified is saved here: call `commit_feed` once the items
+        are stored, so a failure in between leaves them to be fetched again.
+        """
+        start = time.perf_counter()
+        result = self._fetch_feed(url)
+        metrics.observe("feed_fetch_seconds", time.perf_counter() - start, result="ok" if result["ok"] else "error")
+        return result
+
+    def _fetch_feed(self, url: str) -> dict:
+        result = {"ok": False, "items": [], "ttl_s": None, "max_age_s": None, "retry_after_s": None,
+                  "feed_state": None, "validators": None}
+        try:
+            print(f"Fetching feed: {url}", flush=True)
+            import requests
+            response = requests.get(url, headers=self._validators.get(url, {}), timeout=10)
+            result["retry_after_s"] = self._parse_retry_after(response.headers.get("Retry-After"))
+            max_age = self.MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+            result["max_age_s"] = float(max_age.group(1)) if max_age else None
+
+            if response.status_code == 304:
+                print(f"Not modified: {url}", flush=True)
+                result["ok"] = True
+                return result
+            response.raise_for_status()
+            result["validators"] = self._validators_from(response)
+
+            # <ttl> sits in the channel header, ahead of the items
+            ttl = self.TTL_RE.search(response.content[:8192])
+            result["ttl_s"] = int(ttl.group(1)) * 60 if ttl else None
+
+            try:
+                items, feed_state = self._parse_new_entries(url, iter_feed_entries(response.content))
+            except ParseError:
+                metrics.inc("parse_failures_total", stage="feed")
+                # Not well-formed XML (HTML entities, broken encodings): let feedparser cope
+                import feedparser
+                items, feed_state = self._parse_new_entries(url, feedparser.parse(response.content).entries)
+            result["items"] = items
+            result["feed_state"] = feed_state
+            result["ok"] = True
+
+            print(f"Success: Found {len(items)} new items from {url}", flush=True)
+        except Exception as e:
+            print(f"Error fetching {url}: {e}", flush=True)
+        return result
+
+    @staticmethod
+    def _validators_from(response) -> dict:
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        return validators
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Retry-After is either delay-seconds or an HTTP-date."""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def _parse_new_entries(self, url: str, entries: Iterable[dict]) -> Tuple[List[dict], Optional[dict]]:
+        """
+        Parse entries until the feed's high-water mark is reached.
+
+        `entries` is consumed lazily, so for a streaming source only the new
+        items (plus a small sample for schema fingerprinting) are ever built.
+        Returns the items and the advanced feed state (None if nothing is new).
+        """
+        state = self._get_feed_state(url)
+        seen_ids = set(state["seen_ids"])
+        last_published = state["last_published"]
+
+        entries = iter(entries)
+        sample = list(islice(entries, self.schema_learner.FINGERPRINT_SAMPLE))
+        if not sample:
+            return [], None
+        schema = self.schema_learner.learn_schema(url, sample)
+
+        items = []
+        new_ids = []
+        for entry in chain(sample, entries):
+            entry_id = self._entry_id(entry)
+            if entry_id in seen_ids:
+                break
+            if not entry.get("title"):
+                continue
+
+            parsed = self.schema_learner.parse_entry(entry, schema)
+            published = parsed["published"]
+            if published and last_published and published < last_published - self.PUBLISHED_GRACE_S:
+                break
+
+            new_ids.append(entry_id)
+            items.append({
+                "title": parsed["title"] or entry["title"],
+                "link": parsed["link"],
+                "published": published
+            })
+
+        if not new_ids:
+            return items, None
+        newest = max((i["published"] for i in items if i["published"]), default=None)
+        if last_published and (newest is None or newest < last_published):
+            newest = last_published
+        return items, {"seen_ids": (new_ids + state["seen_ids"])[:self.SEEN_IDS_KEPT], "last_published": newest}
+
+    def commit_feed(self, url: str, result: dict):
+        """Saves the high-water mark and validators from a `fetch_feed` result, once its items are stored."""
+        if result["validators"] is not None:
+            self._validators[url] = result["validators"]
+        if result["feed_state"]:
+            self._save_feed_state(url, result["feed_state"]["seen_ids"], result["feed_state"]["last_published"])
+
+    @staticmethod
+    def _entry_id(entry: dict) -> str:
+        return entry.get("id") or entry.get("link") or entry.get("title") or ""
+
+    def _get_feed_state(self, url: str) -> dict:
+        state = self._feed_state.get(url)
+        if state is None:
+            state = (self.db.get_feed_state(url) if self.db else None) or {"seen_ids": [], "last_published": None}
+            self._feed_state[url] = state
+        return state
+
+    def _save_feed_state(self, url: str, seen_ids: List[str], last_published: Optional[float]):
+        self._feed_state[url] = {"seen_ids": seen_ids, "last_published": last_published}
+        if self.db:
+            self.db.save_feed_state(url, seen_ids, last_published)
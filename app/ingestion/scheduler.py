@@ -0,0 +1,144 @@
+import heapq
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+class FeedScheduler:
+    """
+    Adaptive per-feed polling schedule.
+
+    Every feed gets its own interval, derived from the observed rate of new
+    items (aiming for roughly one new item per poll) and floored by whatever the
+    publisher asks for (`<ttl>`, `Cache-Control: max-age`, `Retry-After`).
+    Failures back off exponentially per host, so one broken server does not get
+    hammered through each of its feeds. Next-due times live in a heap.
+    """
+
+    RATE_SMOOTHING = 0.3  # EWMA weight of the newest rate observation
+    TARGET_ITEMS_PER_POLL = 1.0
+    IDLE_GROWTH = 1.5  # interval multiplier while a feed has no measurable rate
+
+    def __init__(
+        self,
+        feeds: List[str],
+        default_interval_s: float = 120,
+        min_interval_s: float = 30,
+        max_interval_s: float = 3600,
+        max_backoff_s: float = 6 * 3600,
+        jitter: float = 0.1,
+    ):
+        self.default_interval_s = default_interval_s
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.max_backoff_s = max_backoff_s
+        self.jitter = jitter
+
+        self._state: Dict[str, dict] = {}
+        self._host_failures: Dict[str, int] = {}
+        self._heap: List[tuple] = []
+        now = time.time()
+        for i, url in enumerate(feeds):
+            self._state[url] = {"interval": default_interval_s, "rate": None, "last_success": None, "due": now}
+            # Spread the initial fetches slightly so feeds on one host don't burst together
+            self._push(url, now + i * 0.5)
+
+    def _push(self, url: str, due: float):
+        self._state[url]["due"] = due
+        heapq.heappush(self._heap, (due, url))
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Remove and return every feed whose next fetch is due."""
+        now = now or time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, url = heapq.heappop(self._heap)
+            # Skip stale heap entries left behind by a reschedule
+            if self._state[url]["due"] == when:
+                due.append(url)
+        return due
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        now = now or time.time()
+        if not self._heap:
+            return self.max_interval_s
+        return max(0.0, self._heap[0][0] - now)
+
+    def record_success(
+        self,
+        url: str,
+        new_items: int,
+        ttl_s: Optional[float] = None,
+        max_age_s: Optional[float] = None,
+        retry_after_s: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> float:
+        """Update the feed's publish rate and schedule its next fetch. Returns the chosen interval."""
+        now = now or time.time()
+        state = self._state[url]
+        self._host_failures.pop(self._host(url), None)
+
+        # The first fetch after start-up has nothing to measure elapsed time against
+        measured = state["last_success"] is not None
+        if measured:
+            elapsed = max(now - state["last_success"], 1.0)
+            observed = new_items / elapsed
+            if state["rate"] is None:
+                state["rate"] = observed
+            else:
+                state["rate"] = self.RATE_SMOOTHING * observed + (1 - self.RATE_SMOOTHING) * state["rate"]
+        state["last_success"] = now
+
+        if state["rate"]:
+            interval = self.TARGET_ITEMS_PER_POLL / state["rate"]
+        elif measured:
+            interval = state["interval"] * self.IDLE_GROWTH
+        else:
+            interval = state["interval"]
+        interval = min(max(interval, self.min_interval_s), self.max_interval_s)
+
+        # Publisher hints are floors, capped so a huge ttl can't park a feed for days
+        for hint in (ttl_s, max_age_s, retry_after_s):
+            if hint:
+                interval = max(interval, min(hint, self.max_interval_s))
+
+        state["interval"] = interval
+        self._push(url, now + self._jittered(interval))
+        return interval
+
+    def record_failure(self, url: str, retry_after_s: Optional[float] = None, now: Optional[float] = None) -> float:
+        """Back off every feed on the failing host. Returns the delay before the next attempt."""
+        now = now or time.time()
+        host = self._host(url)
+        failures = self._host_failures.get(host, 0) + 1
+        self._host_failures[host] = failures
+
+        delay = min(self._state[url]["interval"] * 2 ** failures, self.max_backoff_s)
+        if retry_after_s:
+            delay = max(delay, retry_after_s)
+        delay = self._jittered(delay)
+
+        for other, state in self._state.items():
+            if other == url:
+                self._push(url, now + delay)
+            elif self._host(other) == host and state["due"] < now + delay:
+                self._push(other, now + delay)
+        return delay
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            url: {
+                "interval_s": round(s["interval"], 1),
+                "items_per_hour": round(s["rate"] * 3600, 2) if s["rate"] is not None else None,
+                "next_due_in_s": round(max(0.0, s["due"] - time.time()), 1),
+            }
+            for url, s in self._state.items()
+        }
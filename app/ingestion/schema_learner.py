@@ -1,30 +1,48 @@
-from google import genai
-import feedparser
+import email.utils
+import hashlib
 import time
 import os
 import json
+from datetime import datetime
 from typing import Optional, Dict, List
+from app.ingestion.feed_stream import NORMALIZED_KEYS
+from app.storage.sqlite_db import DashboardDB
+from app.metrics import metrics
 
 class FeedSchemaLearner:
     """
     AI-powered RSS feed schema learner that analyzes feed structures
     directly from RSS feed responses.
+
+    Learned schemas are persisted per feed URL together with a fingerprint of
+    the entry structure, so restarts reuse them and a schema is only re-learned
+    when the feed structure drifts.
+    Failed attempts are cached too and retried with exponential backoff.
     """
-    
-    def __init__(self):
+
+    FAILURE_BACKOFF_S = 300
+    MAX_FAILURE_BACKOFF_S = 6 * 3600
+    FINGERPRINT_SAMPLE = 5
+
+    def __init__(self, db: Optional[DashboardDB] = None):
         self.api_key = os.getenv("GEMINI_API_KEY")
-        # In-memory cache to avoid re-learning on every request
+        self.db = db
+        # In-memory copy of the persisted cache rows, keyed by feed URL
         self._schema_cache: Dict[str, Dict] = {}
         
         if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-            self.model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
             self.ai_enabled = True
         else:
             self.ai_enabled = False
             print("⚠ Feed schema learning disabled: GEMINI_API_KEY not set", flush=True)
     
-    def learn_schema(self, feed_url: str, feed_entries: List[feedparser.FeedParserDict]) -> Dict:
+    @property
+    def router(self):
+        # Most runs reuse persisted schemas; the router only imports the SDK on its first call
+        from app.ai.router import ModelRouter
+        return ModelRouter.shared(self.api_key)
+
+    def learn_schema(self, feed_url: str, feed_entries: List[Dict]) -> Dict:
         """
         Use AI to analyze RSS feed entries and determine the optimal parsing schema.
         
@@ -35,12 +53,20 @@ class FeedSchemaLearner:
         Returns:
             Schema dict with field mappings
         """
-        # Check in-memory cache first
-        if feed_url in self._schema_cache:
-            return self._schema_cache[feed_url]
-        
         if not self.ai_enabled or not feed_entries:
             return self._default_schema()
+
+        fingerprint = self.fingerprint(feed_entries)
+        cached = self._get_cached(feed_url)
+        failures = 0
+        if cached and cached["fingerprint"] == fingerprint:
+            if cached["schema"] is not None:
+                return cached["schema"]
+            if time.time() < cached["retry_at"]:
+                return self._default_schema()
+            failures = cached["failures"]
+        elif cached:
+            print(f"Schema drift detected for {feed_url}, re-learning", flush=True)
         
         # Extract sample data from multiple entries to get a better understanding
         sample_entries = []
@@ -76,26 +102,66 @@ Rules:
 - Only return the JSON, nothing else"""
 
         try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
+            response = self.router.generate("schema", prompt)
             
             text = response.text.strip()
             # Remove markdown code blocks if present
             text = text.replace('```json', '').replace('```', '').strip()
             
             schema = json.loads(text)
+            if not isinstance(schema, dict):
+                raise ValueError(f"expected a JSON object, got {type(schema).__name__}")
             
-            # Cache in memory
-            self._schema_cache[feed_url] = schema
+            self._store(feed_url, fingerprint, schema)
             
             print(f"✓ Learned schema for {feed_url} from feed response", flush=True)
             return schema
             
         except Exception as e:
-            print(f"⚠ Schema learning failed for {feed_url}: {e}", flush=True)
+            metrics.inc("parse_failures_total", stage="schema")
+            failures += 1
+            backoff = min(self.FAILURE_BACKOFF_S * 2 ** (failures - 1), self.MAX_FAILURE_BACKOFF_S)
+            self._store(feed_url, fingerprint, None, failures=failures, retry_at=time.time() + backoff)
+            print(f"⚠ Schema learning failed for {feed_url}: {e} (retry in {backoff}s)", flush=True)
             return self._default_schema()
+
+    def fingerprint(self, feed_entries: List[Dict]) -> str:
+        """
+        Fingerprint the entry structure as the set of keys shared by the first few entries.
+
+        Optional per-item fields (media, enclosures) come and go between entries,
+        so only the consistently present keys are used to detect real schema drift.
+        Only the normalized keys both parsers produce count: feedparser adds its
+        own (`title_detail`, `links`, `tags`...), and a feed that alternates
+        between the streaming parser and the feedparser fallback must keep
+        its fingerprint.
+        """
+        keys = None
+        for entry in feed_entries[:self.FINGERPRINT_SAMPLE]:
+            entry_keys = NORMALIZED_KEYS.intersection(entry.keys())
+            keys = entry_keys if keys is None else keys & entry_keys
+        return hashlib.sha1(",".join(sorted(keys or ())).encode("utf-8")).hexdigest()[:16]
+
+    def _get_cached(self, feed_url: str) -> Optional[Dict]:
+        cached = self._schema_cache.get(feed_url)
+        if cached is None and self.db is not None:
+            cached = self.db.get_feed_schema(feed_url)
+            if cached:
+                self._schema_cache[feed_url] = cached
+        return cached
+
+    def _store(self, feed_url: str, fingerprint: str, schema: Optional[Dict], failures: int = 0, retry_at: float = 0.0):
+        self._schema_cache[feed_url] = {
+            "fingerprint": fingerprint,
+            "schema": schema,
+            "failures": failures,
+            "retry_at": retry_at
+        }
+        if self.db is not None:
+            try:
+                self.db.save_feed_schema(feed_url, fingerprint, schema, failures=failures, retry_at=retry_at)
+            except Exception as e:
+                print(f"⚠ Could not persist schema for {feed_url}: {e}", flush=True)
     
     def _default_schema(self) -> Dict:
         """Return a default schema for standard RSS feeds."""
@@ -107,12 +173,12 @@ Rules:
             "author_field": "author"
         }
     
-    def parse_entry(self, entry: feedparser.FeedParserDict, schema: Dict) -> Dict:
+    def parse_entry(self, entry: Dict, schema: Dict) -> Dict:
         """
         Parse an RSS entry using the provided schema.
         
         Args:
-            entry: RSS entry from feedparser
+            entry: RSS entry from feedparser or the streaming feed parser
             schema: Schema dict with field mappings
         
         Returns:
@@ -126,48 +192,48 @@ Rules:
             "author": None
         }
         
-        # Extract title
+        # Entries are dicts (FeedParserDict subclasses dict), so plain lookups
+        # replace the attribute probing feedparser would otherwise route through.
         title_field = schema.get("title_field")
-        if title_field and hasattr(entry, title_field):
-            result["title"] = getattr(entry, title_field)
+        if title_field:
+            result["title"] = entry.get(title_field)
         
-        # Extract link
         link_field = schema.get("link_field")
-        if link_field and hasattr(entry, link_field):
-            result["link"] = getattr(entry, link_field)
+        if link_field:
+            result["link"] = entry.get(link_field)
         
         # Extract publication date (try multiple fields)
-        date_fields = schema.get("date_fields", [])
-        for field in date_fields:
-            # Try parsed time struct first
-            parsed_field = f"{field}_parsed"
-            if hasattr(entry, parsed_field):
-                try:
-                    result["published"] = time.mktime(getattr(entry, parsed_field))
-                    break
-                except:
-                    pass
-            
-            # Try raw string
-            if hasattr(entry, field):
-                try:
-                    import email.utils
-                    date_str = getattr(entry, field)
-                    if date_str:
-                        parsed = email.utils.parsedate_to_datetime(date_str)
-                        result["published"] = parsed.timestamp()
-                        break
-                except:
-                    pass
+        for field in schema.get("date_fields") or []:
+            published = parse_timestamp(entry.get(f"{field}_parsed"), entry.get(field))
+            if published is not None:
+                result["published"] = published
+                break
         
-        # Extract description
         desc_field = schema.get("description_field")
-        if desc_field and hasattr(entry, desc_field):
-            result["description"] = getattr(entry, desc_field)
+        if desc_field:
+            result["description"] = entry.get(desc_field)
         
-        # Extract author
         author_field = schema.get("author_field")
-        if author_field and hasattr(entry, author_field):
-            result["author"] = getattr(entry, author_field)
+        if author_field:
+            result["author"] = entry.get(author_field)
         
         return result
+
+
+def parse_timestamp(parsed_struct, raw: Optional[str]) -> Optional[float]:
+    """Convert a feedparser time struct or a raw RFC 822 / ISO 8601 date string to epoch seconds."""
+    if parsed_struct:
+        try:
+            return time.mktime(parsed_struct)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    if not raw or not isinstance(raw, str):
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(raw).timestamp()
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        return datetime.fromisoformat(raw.strip()).timestamp()
+    except ValueError:
+        return None
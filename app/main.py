@@ -7,7 +7,7 @@ from app.runtime import wait_for
 def main():
     storage = NewsStorage()
     ok = wait_for(
-        lambda: bool(storage.client.ping()),
+        storage.ping,
         attempts=10,
         delay_s=2,
         on_retry=lambda i, e: print(f"Waiting for Redis... (Attempt {i}/10)", flush=True),
@@ -1,18 +1,51 @@
+import os
 import time
 from typing import List, Optional
 from app.storage.sqlite_db import DashboardDB
 
+ASSET_KEYWORDS = {
+    "^GSPC": ["S&P 500", "US Stocks", "Stock Market", "Wall Street", "Equity"],
+    "GC=F": ["Gold", "XAU", "Precious Metals"],
+    "BTC-USD": ["Bitcoin", "BTC", "Crypto", "Cryptocurrency"],
+    "CL=F": ["Crude Oil", "Brent", "Energy", "OPEC"],
+    "EURUSD=X": ["Euro", "EUR", "Forex", "Currency"]
+}
+
+# What news that moves each asset tends to talk about, for similarity matching
+ASSET_DESCRIPTORS = {
+    "^GSPC": "S&P 500 US stocks stock market Wall Street equities shares index Dow Nasdaq earnings "
+             "Fed interest rates recession selloff rally investors",
+    "GC=F": "gold XAU precious metals bullion silver safe haven central bank buying inflation hedge",
+    "BTC-USD": "bitcoin BTC crypto cryptocurrency digital assets blockchain ether ETF exchange "
+               "token stablecoin SEC mining",
+    "CL=F": "crude oil Brent WTI energy OPEC barrels output production cut supply Saudi Arabia Russia "
+            "pipeline refinery gasoline Middle East",
+    "EURUSD=X": "euro EUR dollar USD forex currency exchange rate ECB eurozone Lagarde "
+                "European Central Bank",
+}
+
+
 class AnomalyDetector:
+    CORRELATION_WINDOW_S = 4 * 3600
+    MAX_CORRELATIONS = 10
+
     def __init__(self, db: DashboardDB, threshold: float = 0.01):
         self.db = db
         self.threshold = threshold  # 1% move by default
+        self.min_similarity = float(os.getenv("CORRELATION_MIN_SIMILARITY", "0.1"))
+        if os.getenv("CORRELATION_MODE", "semantic") == "semantic":
+            from app.ai.embeddings import NewsIndex  # numpy, only needed for this mode
+            self.index = NewsIndex()
+        else:
+            self.index = None
 
     def detect_anomalies(self) -> List[dict]:
         latest_prices = self.db.get_latest_prices()
         anomalies = []
         
         for ticker, current_price in latest_prices.items():
-            history = self.db.get_price_history(ticker, limit=10) # Look back at last 10 snapshots
+            # Minute closes, not raw rows: with a streaming price source consecutive ticks are milliseconds apart
+            history = self.db.get_price_closes(ticker, resolution_s=60, limit=10)  # Look back at last 10 snapshots
             if len(history) < 2:
                 continue
             
@@ -31,40 +64,65 @@ class AnomalyDetector:
         
         return anomalies
 
+    @staticmethod
+    def changes_over_threshold(prices, threshold: float):
+        """
+        Vectorized detect_anomalies rule over a whole price series (numpy array,
+        oldest first): indices `i` where snapshot i moved >= threshold from
+        snapshot i-1, and the change of every snapshot (0 for the first).
+        """
+        import numpy as np
+
+        change = np.zeros(len(prices))
+        change[1:] = prices[1:] / prices[:-1] - 1
+        return np.flatnonzero(np.abs(change) >= threshold), change
+
     def correlate_with_news(self, anomaly: dict) -> List[dict]:
+        """
+        Relevant news from within 4 hours of the anomaly that concerns the asset,
+        best match first. Tickers without a descriptor (or CORRELATION_MODE=keyword)
+        use keyword matching.
+        """
+        descriptor = ASSET_DESCRIPTORS.get(anomaly['ticker'])
+        if self.index is None or descriptor is None:
+            return self._correlate_by_keywords(anomaly)
+
+        self.index.refresh(self.db)
+        anomaly_time = anomaly['timestamp']
+        matches = self.index.search(
+            descriptor,
+            k=self.MAX_CORRELATIONS,
+            start=anomaly_time - self.CORRELATION_WINDOW_S,
+            end=anomaly_time + self.CORRELATION_WINDOW_S,
+            min_score=self.min_similarity,
+        )
+        correlations = []
+        for news, score in matches:
+            news = {key: value for key, value in news.items() if key not in ("hash", "created")}
+            news["similarity"] = round(score, 3)
+            correlations.append(news)
+        return correlations
+
+    def _correlate_by_keywords(self, anomaly: dict) -> List[dict]:
         # Look for news events within the last 4 hours that mention the asset
         all_news = self.db.get_recent(limit=100)
         correlations = []
-        
-        asset_keywords = {
-            "^GSPC": ["S&P 500", "US Stocks", "Stock Market", "Wall Street", "Equity"],
-            "GC=F": ["Gold", "XAU", "Precious Metals"],
-            "BTC-USD": ["Bitcoin", "BTC", "Crypto", "Cryptocurrency"],
-            "CL=F": ["Crude Oil", "Brent", "Energy", "OPEC"],
-            "EURUSD=X": ["Euro", "EUR", "Forex", "Currency"]
-        }
-        
-        keywords = asset_keywords.get(anomaly['ticker'], [])
         anomaly_time = anomaly['timestamp']
-        
+
         for news in all_news:
             if news['status'] != 'relevant' or not news['event']:
                 continue
-            
-            # Check for keyword match in title or event data
-            match = False
-            title = news['title'].lower()
-            event_assets = str(news['event'].get('affected_assets', [])).lower()
-            
-            for kw in keywords:
-                if kw.lower() in title or kw.lower() in event_assets:
-                    match = True
-                    break
-            
-            if match:
+
+            if keyword_match(anomaly['ticker'], news):
                 # Check time proximity (within 4 hours)
-                time_diff = abs(anomaly_time - news['timestamp']) / 3600
-                if time_diff <= 4:
+                if abs(anomaly_time - news['timestamp']) <= self.CORRELATION_WINDOW_S:
                     correlations.append(news)
-                    
+
         return correlations
+
+
+def keyword_match(ticker: str, news: dict) -> bool:
+    """The original matcher: any of the ticker's keywords in the title or event assets."""
+    title = news['title'].lower()
+    event_assets = str((news.get('event') or {}).get('affected_assets', [])).lower()
+    return any(kw.lower() in title or kw.lower() in event_assets for kw in ASSET_KEYWORDS.get(ticker, []))
@@ -0,0 +1,192 @@
+"""
+Cross-asset correlation monitor.
+
+Keeps exponentially weighted covariance matrices of log returns across all
+tracked tickers, one fast (recent regime) and one slow (baseline), updated in
+O(tickers^2) numpy operations per price snapshot. From them it reports:
+
+- correlation breaks: pairs whose recent correlation departs from the baseline
+- co-moving clusters: tickers that made a large move this snapshot in the
+  direction their recent correlations predict, i.e. a market-wide move
+  (risk-off: S&P down, gold up, BTC down) rather than an idiosyncratic one
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _alpha(halflife: float) -> float:
+    return 1 - math.exp(math.log(0.5) / halflife)
+
+
+class _EWCovariance:
+    def __init__(self, n: int, halflife: float):
+        self.alpha = _alpha(halflife)
+        self.mean = np.zeros(n)
+        self.cov = np.zeros((n, n))
+
+    def update(self, r: np.ndarray):
+        a = self.alpha
+        d = r - self.mean
+        self.mean += a * d
+        self.cov = (1 - a) * (self.cov + a * np.outer(d, d))
+
+    def correlation(self) -> np.ndarray:
+        std = np.sqrt(np.clip(np.diag(self.cov), 0, None))
+        denom = np.outer(std, std)
+        corr = np.divide(self.cov, denom, out=np.zeros_like(self.cov), where=denom > 0)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+
+class CrossAssetMonitor:
+    FAST_HALFLIFE = 30      # snapshots (~30 minutes at the market worker's 60s poll)
+    SLOW_HALFLIFE = 1440    # ~1 day
+    MIN_OBSERVATIONS = 30   # no breaks/clusters reported before this many snapshots
+    BREAK_DELTA = 0.5       # |fast corr - slow corr| that counts as a break
+    BREAK_MIN_BASELINE = 0.3  # ... where the baseline |corr| is at least this
+    CLUSTER_MIN_CORR = 0.5
+    CLUSTER_MIN_Z = 2.0     # move size, in fast-window standard deviations
+
+    def __init__(self, tickers: List[str], interval_s: float = 60):
+        self.tickers = list(tickers)
+        # A snapshot further than this from the previous one starts over instead
+        # of pairing with it: one return spanning the gap would inflate both covariances
+        self.max_gap_s = 2 * interval_s
+        n = len(self.tickers)
+        self.fast = _EWCovariance(n, self.FAST_HALFLIFE)
+        self.slow = _EWCovariance(n, self.SLOW_HALFLIFE)
+        self.observations = 0
+        self._last_prices: Optional[np.ndarray] = None
+        self._last_ts: Optional[float] = None
+        self._last_z = np.zeros(n)
+        self._updated: Optional[float] = None
+
+    def update(self, prices: Dict[str, float], ts: Optional[float] = None) -> bool:
+        """
+        Feeds one snapshot of prices. Snapshots missing a ticker are skipped, as
+        returns must line up across assets, and one more than `max_gap_s` after
+        the previous snapshot only becomes the new starting point. Returns True
+        if the state changed.
+        """
+        if any(prices.get(t) is None or prices[t] <= 0 for t in self.tickers):
+            return False
+        ts = ts or time.time()
+        current = np.array([prices[t] for t in self.tickers], dtype=float)
+        previous, self._last_prices = self._last_prices, current
+        last_ts, self._last_ts = self._last_ts, ts
+        if previous is None or ts - last_ts > self.max_gap_s:
+            return False
+
+        r = np.log(current / previous)
+        # Standardize against the fast window *before* it absorbs this move
+        std = np.sqrt(np.clip(np.diag(self.fast.cov), 0, None))
+        self._last_z = np.divide(r - self.fast.mean, std, out=np.zeros_like(r), where=std > 0)
+        self.fast.update(r)
+        self.slow.update(r)
+        self.observations += 1
+        self._updated = ts
+        return True
+
+    def warm_up(self, history: Dict[str, List[Tuple[float, float]]], bucket_s: float = 60):
+        """
+        Seeds the estimators from per-ticker (timestamp, price) histories.
+        Rows are aligned on time, not position: each ticker's last price per
+        `bucket_s` bucket (one market worker cycle), and only buckets where
+        every ticker has a price, since a cycle that missed a ticker would
+        otherwise pair prices from different minutes. Returns only come from
+        adjacent buckets, so downtime in the history doesn't make one return.
+        """
+        buckets: Dict[int, Dict[str, float]] = {}
+        for ticker in self.tickers:
+            for ts, price in sorted(history.get(ticker, [])):
+                buckets.setdefault(int(ts // bucket_s), {})[ticker] = price
+        previous = None
+        for bucket in sorted(buckets):
+            if len(buckets[bucket]) < len(self.tickers):
+                continue
+            if previous is not None and bucket != previous + 1:
+                self._last_prices = None
+            # Stamped with the bucket's end, the time of its close
+            self.update(buckets[bucket], (bucket + 1) * bucket_s)
+            previous = bucket
+
+    def correlation_breaks(self) -> List[dict]:
+        fast, slow = self.fast.correlation(), self.slow.correlation()
+        delta = fast - slow
+        i, j = np.nonzero(np.triu((np.abs(delta) >= self.BREAK_DELTA) & (np.abs(slow) >= self.BREAK_MIN_BASELINE), k=1))
+        return [
+            {
+                "pair": [self.tickers[a], self.tickers[b]],
+                "recent": round(float(fast[a, b]), 3),
+                "baseline": round(float(slow[a, b]), 3),
+            }
+            for a, b in zip(i, j)
+        ]
+
+    def co_moving_clusters(self) -> List[dict]:
+        """
+        Connected groups of tickers that all moved >= CLUSTER_MIN_Z this
+        snapshot, linked where the move's sign agrees with a strong recent
+        correlation (positively correlated moving together, or negatively
+        correlated moving apart).
+        """
+        corr = self.fast.correlation()
+        z = self._last_z
+        big = np.abs(z) >= self.CLUSTER_MIN_Z
+        linked = (np.abs(corr) >= self.CLUSTER_MIN_CORR) & (np.sign(np.outer(z, z)) == np.sign(corr))
+        linked &= np.outer(big, big)
+        np.fill_diagonal(linked, False)
+
+        clusters, seen = [], set()
+        for start in np.flatnonzero(big):
+            if start in seen or not linked[start].any():
+                continue
+            members, stack = [], [start]
+            seen.add(start)
+            while stack:
+                k = stack.pop()
+                members.append(k)
+                for other in np.flatnonzero(linked[k]):
+                    if other not in seen:
+                        seen.add(other)
+                        stack.append(other)
+            clusters.append({
+                "tickers": [self.tickers[k] for k in sorted(members)],
+                "moves_z": {self.tickers[k]: round(float(z[k]), 2) for k in sorted(members)},
+            })
+        return sorted(clusters, key=lambda c: len(c["tickers"]), reverse=True)
+
+    def snapshot(self) -> dict:
+        ready = self.observations >= self.MIN_OBSERVATIONS
+        clusters = self.co_moving_clusters() if ready else []
+        return {
+            "updated": self._updated,
+            "observations": self.observations,
+            "ready": ready,
+            "tickers": self.tickers,
+            "correlation": np.round(self.fast.correlation(), 3).tolist(),
+            "breaks": self.correlation_breaks() if ready else [],
+            "clusters": clusters,
+            # Half or more of the tracked assets moving as one
+            "market_wide": bool(clusters) and len(clusters[0]["tickers"]) * 2 >= len(self.tickers),
+        }
+
+
+def ticker_context(snapshot: Optional[dict], ticker: str) -> Optional[dict]:
+    """
+    The parts of a monitor snapshot that concern one ticker, for scoring and
+    narration; None until the monitor has enough history.
+    """
+    if not snapshot or not snapshot.get("ready"):
+        return None
+    cluster = next((c["tickers"] for c in snapshot.get("clusters", []) if ticker in c["tickers"]), [])
+    return {
+        "cluster": cluster,
+        "breaks": [b for b in snapshot.get("breaks", []) if ticker in b["pair"]],
+        "market_wide": bool(cluster) and snapshot.get("market_wide", False)
+        and cluster == snapshot["clusters"][0]["tickers"],
+    }
@@ -0,0 +1,108 @@
+"""
+Downsampled price series for dashboard charts.
+
+A chart never needs more points than it has pixels, so a range is served at a
+requested point count. Points are read from raw ticks or, when the range is
+long enough that a rollup still leaves OVERSAMPLE buckets per output point,
+from each price_rollups bucket's low and high (so spikes survive). They are
+then reduced with Largest-Triangle-Three-Buckets, which keeps the visual shape
+far better than taking every k-th point. Results are kept in a small
+LRU cache keyed by (ticker, range, resolution, points).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.storage.sqlite_db import ROLLUP_RESOLUTIONS
+
+# Named ranges accepted by /api/prices/{ticker}
+RANGES = {
+    "1h": 3600,
+    "6h": 6 * 3600,
+    "1d": 86400,
+    "1w": 7 * 86400,
+    "4w": 28 * 86400,
+    "12w": 84 * 86400,
+}
+
+OVERSAMPLE = 4
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Indices of the `n` points Largest-Triangle-Three-Buckets keeps: the first
+    and last, plus one per equal-count bucket in between, the one forming the
+    largest triangle with the point kept before it and the next bucket's
+    average. Bucket averages are computed in one pass; only the choice within
+    each bucket, which depends on the previous choice, loops.
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:size - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:size - 1], edges[:-1]) / counts
+    # The third vertex for bucket i is bucket i+1's average; the last bucket uses the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    kept = np.empty(n, dtype=int)
+    kept[0], kept[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def pick_resolution(span_s: float, points: int) -> int:
+    """Coarsest rollup leaving OVERSAMPLE buckets per output point, or 0 for raw ticks."""
+    for resolution in sorted(ROLLUP_RESOLUTIONS, reverse=True):
+        if span_s / resolution >= points * OVERSAMPLE:
+            return resolution
+    return 0
+
+
+class PriceSeries:
+    def __init__(self, db, cache_size: Optional[int] = None):
+        self.db = db
+        self.cache_size = cache_size or int(os.getenv("PRICE_SERIES_CACHE_SIZE", "256"))
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str, start: float, end: float, points: int = 500) -> dict:
+        resolution = pick_resolution(end - start, points)
+        key = (ticker, start, end, resolution, points)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        times, prices = self.db.get_price_series(ticker, start, end, resolution)
+        x = np.asarray(times, dtype=float)
+        y = np.asarray(prices, dtype=float)
+        kept = lttb_indices(x, y, points)
+        series = {
+            "ticker": ticker,
+            "start": start,
+            "end": end,
+            "resolution_s": resolution,
+            "source_points": len(x),
+            "timestamps": x[kept].tolist(),
+            "prices": y[kept].tolist(),
+        }
+
+        with self._lock:
+            self._cache[key] = series
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return series
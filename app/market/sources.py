@@ -0,0 +1,114 @@
+"""
+Price sources for the market worker.
+
+A PriceSource delivers ticks through `stream()`, an async iterator of
+Tick(ticker, price, timestamp). The worker batches them for persistence and
+publishing (see app.workers.market). Select a source with PRICE_SOURCE:
+
+- `poll` (default): MarketData (yfinance), one tick per ticker every
+  MARKET_POLL_S (60s). This is the original minute-level snapshot.
+- `simulator`: a local random walk with occasional jumps at SIM_TICKS_PER_S,
+  for exercising the streaming path without a live feed.
+"""
+
+import asyncio
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+from app.market.prices import MarketData
+
+
+class Tick(NamedTuple):
+    ticker: str
+    price: float
+    timestamp: float
+
+
+class PriceSource(ABC):
+    tickers: List[str]
+
+    @abstractmethod
+    def stream(self) -> AsyncIterator[Tick]:
+        """Yields ticks as they happen, forever."""
+
+
+class PollingSource(PriceSource):
+    def __init__(self, market: MarketData, interval_s: float = 60):
+        self.market = market
+        self.tickers = market.tickers
+        self.interval_s = interval_s
+
+    async def stream(self) -> AsyncIterator[Tick]:
+        while True:
+            # yfinance is blocking; fetch off the event loop
+            prices = await asyncio.to_thread(self.market.fetch_latest)
+            now = time.time()
+            for ticker, price in prices.items():
+                yield Tick(ticker, price, now)
+            await asyncio.sleep(self.interval_s)
+
+
+class SimulatedSource(PriceSource):
+    """
+    Random walk per ticker: each tick moves the price by a Gaussian step of
+    `volatility`, plus a `jump_size` move up or down with `jump_probability`.
+    Ticks go to random tickers at `ticks_per_s` overall, generated in 10ms
+    slices.
+    """
+
+    SLICE_S = 0.01
+
+    def __init__(self, tickers: List[str], ticks_per_s: float = 1000, volatility: float = 0.0002,
+                 jump_probability: float = 0.0005, jump_size: float = 0.02,
+                 start_prices: Optional[Dict[str, float]] = None, seed: Optional[int] = None):
+        self.tickers = list(tickers)
+        self.ticks_per_s = ticks_per_s
+        self.volatility = volatility
+        self.jump_probability = jump_probability
+        self.jump_size = jump_size
+        self._random = random.Random(seed)
+        start_prices = start_prices or {}
+        self.prices = {t: start_prices.get(t) or self._random.uniform(10, 5000) for t in self.tickers}
+
+    def next_tick(self, now: float) -> Tick:
+        ticker = self._random.choice(self.tickers)
+        step = self._random.gauss(0, self.volatility)
+        if self._random.random() < self.jump_probability:
+            step += self._random.choice((-1, 1)) * self.jump_size
+        self.prices[ticker] *= 1 + step
+        return Tick(ticker, self.prices[ticker], now)
+
+    async def stream(self) -> AsyncIterator[Tick]:
+        loop = asyncio.get_running_loop()
+        next_slice = loop.time()
+        owed = 0.0
+        while True:
+            owed += self.ticks_per_s * self.SLICE_S
+            now = time.time()
+            for _ in range(int(owed)):
+                yield self.next_tick(now)
+            owed -= int(owed)
+            next_slice += self.SLICE_S
+            # A slow consumer makes this fall behind; skip ahead rather than burst
+            next_slice = max(next_slice, loop.time())
+            await asyncio.sleep(next_slice - loop.time())
+
+
+def price_source_from_env(start_prices: Optional[Dict[str, float]] = None) -> PriceSource:
+    market = MarketData()
+    kind = os.getenv("PRICE_SOURCE", "poll")
+    if kind == "simulator":
+        return SimulatedSource(
+            market.tickers,
+            ticks_per_s=float(os.getenv("SIM_TICKS_PER_S", "1000")),
+            volatility=float(os.getenv("SIM_VOLATILITY", "0.0002")),
+            jump_probability=float(os.getenv("SIM_JUMP_PROBABILITY", "0.0005")),
+            jump_size=float(os.getenv("SIM_JUMP_SIZE", "0.02")),
+            start_prices=start_prices,
+        )
+    if kind != "poll":
+        raise ValueError(f"Unknown PRICE_SOURCE {kind!r} (expected poll or simulator)")
+    return PollingSource(market, interval_s=float(os.getenv("MARKET_POLL_S", "60")))
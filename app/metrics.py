@@ -0,0 +1,218 @@
+"""
+Process-local metrics with Redis aggregation and Prometheus text rendering.
+
+Workers record counters, gauges and histograms into the module-level `metrics`
+registry. A background thread periodically folds the accumulated deltas into
+Redis hashes (HINCRBYFLOAT for counters and histogram buckets, HSET for gauges),
+so every worker contributes to one shared view. The dashboard renders that view
+at `/metrics` in the Prometheus text exposition format.
+
+Keep this module dependency-light; it is imported from storage and AI code.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+# name -> (type, help, buckets)
+DEFINITIONS: Dict[str, Tuple[str, str, Optional[tuple]]] = {
+    "pipeline_items_total": ("counter", "Headlines leaving each pipeline stage, by outcome.", None),
+    "llm_request_seconds": ("histogram", "LLM call latency by stage and model.", LATENCY_BUCKETS),
+    "llm_batch_size": ("histogram", "Headlines per LLM call by stage.", SIZE_BUCKETS),
+    "llm_errors_total": ("counter", "LLM calls that failed on every model of the stage's tier, by stage.", None),
+    "llm_requests_total": ("counter", "LLM calls by stage, model and outcome (ok/error).", None),
+    "llm_tokens_total": ("counter", "LLM tokens by stage, model and direction (input/output).", None),
+    "llm_cost_usd_total": ("counter", "Estimated LLM spend in USD by stage and model.", None),
+    "llm_model_latency_seconds": ("gauge", "Smoothed LLM latency per model, as seen by each worker.", None),
+    "llm_model_available": ("gauge", "1 unless the model is cooling down after quota errors or repeated failures.", None),
+    "llm_breaker_open": ("gauge", "1 while the LLM circuit breaker is open or half-open.", None),
+    "llm_breaker_transitions_total": ("counter", "LLM circuit breaker state changes, by target state.", None),
+    "rate_limiter_wait_seconds": ("histogram", "Time spent waiting on the LLM rate limiter.", LATENCY_BUCKETS),
+    "parse_failures_total": ("counter", "Responses or documents that could not be parsed, by stage.", None),
+    "sqlite_write_seconds": ("histogram", "SQLite write latency by operation.", LATENCY_BUCKETS),
+    "sqlite_group_commit_size": ("histogram", "Write intents committed together by the SQLite writer.", SIZE_BUCKETS),
+    "sqlite_writes_expired_total": ("counter", "Write intents the SQLite writer dropped because their caller had timed out.", None),
+    "queue_depth": ("gauge", "Items waiting in each work queue.", None),
+    "feed_fetch_seconds": ("histogram", "RSS feed fetch and parse duration, by result.", LATENCY_BUCKETS),
+    "anomaly_detection_seconds": ("histogram", "Duration of one anomaly detection run.", LATENCY_BUCKETS),
+    "worker_last_flush_timestamp_seconds": ("gauge", "Unix time of each worker's last metrics flush.", None),
+}
+
+REDIS_COUNTERS_KEY = "metrics:counters"
+REDIS_GAUGES_KEY = "metrics:gauges"
+
+
+def _escape(value) -> str:
+    """A label value as the text format requires: backslash, double quote and newline escaped."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    # `le` goes last so histogram buckets of one series share a common prefix
+    items = sorted(labels.items(), key=lambda kv: (kv[0] == "le", kv[0]))
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return f"{name}{{{body}}}"
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Deltas since the last flush, keyed by full series string
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        # Cumulative totals, used when rendering without Redis
+        self._totals: Dict[str, float] = {}
+        self._client = None
+        self._worker: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        self._add(_series(name, labels), value)
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_series(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = DEFINITIONS[name][2] or LATENCY_BUCKETS
+        series = []
+        for le in buckets:
+            if value <= le:
+                series.append(_series(f"{name}_bucket", {**labels, "le": repr(float(le))}))
+        series.append(_series(f"{name}_bucket", {**labels, "le": "+Inf"}))
+        series.append(_series(f"{name}_count", labels))
+        with self._lock:
+            for s in series:
+                self._counters[s] = self._counters.get(s, 0.0) + 1
+                self._totals[s] = self._totals.get(s, 0.0) + 1
+            s = _series(f"{name}_sum", labels)
+            self._counters[s] = self._counters.get(s, 0.0) + value
+            self._totals[s] = self._totals.get(s, 0.0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def _add(self, series: str, value: float):
+        with self._lock:
+            self._counters[series] = self._counters.get(series, 0.0) + value
+            self._totals[series] = self._totals.get(series, 0.0) + value
+
+    def start(self, client, worker: str, flush_every_s: float = 5.0):
+        """
+        Begin flushing this process's metrics to Redis under the given worker name.
+
+        With no client (all-in-one runtime) metrics stay in-process and the
+        dashboard renders `snapshot()` directly.
+        """
+        self._client = client
+        self._worker = worker
+        if client is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, args=(flush_every_s,), daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self, flush_every_s: float):
+        while True:
+            time.sleep(flush_every_s)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Metrics flush failed: {e}", flush=True)
+
+    def flush(self):
+        if self._client is None:
+            return
+        self.set("worker_last_flush_timestamp_seconds", time.time())
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            gauges, self._gauges = self._gauges, {}
+        try:
+            pipe = self._client.pipeline()
+            for series, value in counters.items():
+                pipe.hincrbyfloat(REDIS_COUNTERS_KEY, series, value)
+            for series, value in gauges.items():
+                pipe.hset(REDIS_GAUGES_KEY, self._with_worker(series), value)
+            pipe.execute()
+        except Exception:
+            # Put the deltas back so nothing is lost while Redis is unreachable
+            with self._lock:
+                for series, value in counters.items():
+                    self._counters[series] = self._counters.get(series, 0.0) + value
+                for series, value in gauges.items():
+                    self._gauges.setdefault(series, value)
+            raise
+
+    def _with_worker(self, series: str) -> str:
+        label = f'worker="{_escape(self._worker)}"'
+        if series.endswith("}"):
+            return f"{series[:-1]},{label}}}"
+        return f"{series}{{{label}}}"
+
+    def snapshot(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Cumulative counters and current gauges recorded by this process."""
+        with self._lock:
+            return dict(self._totals), dict(self._gauges)
+
+    def collect_from_redis(self, client) -> Tuple[Dict[str, float], Dict[str, float]]:
+        counters = {k.decode(): float(v) for k, v in client.hgetall(REDIS_COUNTERS_KEY).items()}
+        gauges = {k.decode(): float(v) for k, v in client.hgetall(REDIS_GAUGES_KEY).items()}
+        return counters, gauges
+
+
+def render_prometheus(counters: Dict[str, float], gauges: Dict[str, float]) -> str:
+    """Render aggregated series in the Prometheus text exposition format."""
+    by_metric: Dict[str, list] = {}
+    for series, value in list(counters.items()) + list(gauges.items()):
+        base = series.split("{", 1)[0]
+        for suffix in ("_bucket", "_count", "_sum"):
+            if base.endswith(suffix) and base[: -len(suffix)] in DEFINITIONS:
+                base = base[: -len(suffix)]
+                break
+        by_metric.setdefault(base, []).append((series, value))
+
+    lines = []
+    for name in sorted(by_metric):
+        kind, help_text, _ = DEFINITIONS.get(name, ("untyped", "", None))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for series, value in sorted(by_metric[name], key=_sort_key):
+            lines.append(f"{series} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    # Full precision: `rate()` over a large counter needs every digit
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _sort_key(item):
+    # Keep histogram buckets in ascending `le` order with +Inf last
+    series = item[0]
+    if 'le="' not in series:
+        return (series, 0.0)
+    # `le` is always the last label, so an escaped quote in an earlier value can't be mistaken for it
+    prefix, rest = series.rsplit('le="', 1)
+    le = rest.split('"', 1)[0]
+    return (prefix, float("inf") if le == "+Inf" else float(le))
+
+
+metrics = Metrics()
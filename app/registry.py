@@ -0,0 +1,171 @@
+"""
+Worker registry with TTL heartbeats.
+
+Each worker registers a WorkerEntry and brackets every batch with
+`entry.begin(n)` and `entry.done()`, reporting loop errors with `entry.error(e)`.
+A background thread publishes the entry's stats to Redis as JSON under
+`workers:{stage}:{host}:{pid}` every REGISTRY_HEARTBEAT_S (5s), with a TTL of
+three heartbeats, so a dead worker drops out on its own. A worker that is
+still heartbeating but has had a batch in flight for REGISTRY_STALL_S (120s)
+without finishing is reported as stalled.
+
+Without Redis (all-in-one runtime) entries are kept in-process.
+
+Keep this module dependency-light; every worker imports it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+KEY_PREFIX = "workers:"
+
+
+class WorkerEntry:
+    _local: Dict[str, "WorkerEntry"] = {}
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.started = time.time()
+        self.items = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.busy_s = 0.0
+        self.batch_started: Optional[float] = None
+        self.last_progress = self.started
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+        self.paused = False
+        self._client = None
+        self._lock = threading.Lock()
+        self._rate_items = 0
+        self._rate_at = self.started
+        self.items_per_s = 0.0
+
+    @property
+    def key(self) -> str:
+        return f"{KEY_PREFIX}{self.stage}:{self.id}"
+
+    @classmethod
+    def register(cls, client, stage: str, heartbeat_s: float = None) -> "WorkerEntry":
+        """Creates the entry and starts heartbeating it (to Redis, or in-process with no client)."""
+        entry = cls(stage)
+        entry._client = client
+        heartbeat_s = heartbeat_s or float(os.getenv("REGISTRY_HEARTBEAT_S", "5"))
+        if client is None:
+            cls._local[entry.key] = entry
+        threading.Thread(target=entry._heartbeat_loop, args=(heartbeat_s,), daemon=True).start()
+        return entry
+
+    def begin(self, n: int):
+        """Marks a batch of `n` items as in flight (one batch at a time per worker)."""
+        with self._lock:
+            self.in_flight = n
+            self.batch_started = time.time()
+
+    def done(self):
+        """The batch in flight finished."""
+        with self._lock:
+            self.items += self.in_flight
+            self._end_batch()
+            self.last_progress = time.time()
+
+    def error(self, e: Exception):
+        """Records a worker loop error; a batch in flight is dropped without counting as done."""
+        with self._lock:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"[:300]
+            self.last_error_at = time.time()
+            self._end_batch()
+
+    def _end_batch(self):
+        if self.batch_started is not None:
+            self.busy_s += time.time() - self.batch_started
+        self.in_flight = 0
+        self.batch_started = None
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "stage": self.stage,
+                "id": self.id,
+                "started": self.started,
+                "heartbeat": time.time(),
+                "items": self.items,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "items_per_s": round(self.items_per_s, 3),
+                # Throughput while working, i.e. what one more replica would add
+                "capacity_per_s": round(self.items / self.busy_s, 3) if self.busy_s else None,
+                "batch_started": self.batch_started,
+                "last_progress": self.last_progress,
+                "last_error": self.last_error,
+                "last_error_at": self.last_error_at,
+                "paused": self.paused,
+            }
+
+    def _update_rate(self):
+        now = time.time()
+        with self._lock:
+            if now > self._rate_at:
+                self.items_per_s = (self.items - self._rate_items) / (now - self._rate_at)
+            self._rate_items, self._rate_at = self.items, now
+
+    def _heartbeat_loop(self, heartbeat_s: float):
+        while True:
+            self._update_rate()
+            if self._client is not None:
+                try:
+                    self._client.set(self.key, json.dumps(self.to_dict()), ex=max(1, int(heartbeat_s * 3)))
+                except Exception as e:
+                    print(f"Registry heartbeat failed: {e}", flush=True)
+            time.sleep(heartbeat_s)
+
+
+def list_workers(client, stall_s: float = None) -> List[dict]:
+    """Live registry entries, each with a `status`: busy, idle, paused or stalled."""
+    stall_s = stall_s or float(os.getenv("REGISTRY_STALL_S", "120"))
+    if client is None:
+        entries = [entry.to_dict() for entry in WorkerEntry._local.values()]
+    else:
+        keys = list(client.scan_iter(match=f"{KEY_PREFIX}*", count=100))
+        entries = [json.loads(raw) for raw in (client.mget(keys) if keys else []) if raw]
+
+    now = time.time()
+    for entry in entries:
+        if entry["batch_started"] and now - entry["batch_started"] > stall_s:
+            entry["status"] = "stalled"
+        elif entry["paused"]:
+            entry["status"] = "paused"
+        elif entry["in_flight"]:
+            entry["status"] = "busy"
+        else:
+            entry["status"] = "idle"
+    return sorted(entries, key=lambda e: (e["stage"], e["id"]))
+
+
+def stage_summary(workers: List[dict], depths: Dict[str, int]) -> Dict[str, dict]:
+    """
+    Per stage: replica count by status, combined throughput and capacity, and
+    `lag_s`, the time the current queue would take to drain at full capacity.
+    """
+    summary: Dict[str, dict] = {}
+    for stage in set(depths) | {w["stage"] for w in workers}:
+        members = [w for w in workers if w["stage"] == stage]
+        capacity = sum(w["capacity_per_s"] or 0.0 for w in members if w["status"] != "stalled")
+        depth = depths.get(stage, 0)
+        summary[stage] = {
+            "replicas": len(members),
+            "statuses": {s: sum(1 for w in members if w["status"] == s) for s in {w["status"] for w in members}},
+            "items_per_s": round(sum(w["items_per_s"] for w in members), 3),
+            "capacity_per_s": round(capacity, 3),
+            "queue_depth": depth,
+            "lag_s": round(depth / capacity, 1) if capacity else (None if depth else 0.0),
+        }
+    return summary
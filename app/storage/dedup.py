@@ -1,11 +1,42 @@
-import redis
-from typing import Optional, List
+from collections import defaultdict, deque
+from typing import Dict, Optional, List, Tuple
 import hashlib
+import heapq
+import itertools
 import os
 import json
+import threading
 import time
 
 from app.storage.sqlite_db import DashboardDB
+from app.storage import priority
+
+try:
+    import orjson
+except ImportError:  # optional: plain json works, just slower and bigger
+    orjson = None
+
+
+def encode_task(data: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode('utf-8')
+
+
+def decode_task(raw: bytes) -> dict:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def task_id(data: dict) -> str:
+    """The news hash a task is queued under (tasks queued before it was added only have the title)."""
+    return data.get("hash") or hashlib.sha256(data["title"].encode('utf-8')).hexdigest()
+
+LATEST_PRICES_KEY = "prices:latest"
+# Set once prices:latest was filled from SQLite; a Redis restart clears both
+LATEST_PRICES_FILLED_KEY = "prices:latest:filled"
+# Redis stream of tick batches from the market worker, one entry per batch
+TICKS_STREAM_KEY = "prices:ticks"
+TICKS_STREAM_MAXLEN = 10000
 
 class NewsMetadata:
     def __init__(self, title: str, link: str = None, status: str = "pending", timestamp: float = None, event: dict = None):
@@ -24,11 +55,169 @@ class NewsMetadata:
             "event": self.event
         }
 
+class RedisQueues:
+    """
+    Priority work queues as Redis sorted sets, shared by every worker process.
+
+    Each queue has a main lane (`pqueue:<name>`) and a low-priority lane for
+    stale items (`pqueue:<name>:low`). Members are task ids (the news hash,
+    see task_id) and scores are priorities; higher pops first. Payloads (see
+    encode_task) live in the hash `pqueue:<name>:tasks`.
+
+    A task is queued at most once: pushing one that is already waiting in
+    either lane keeps the queued copy, whatever the new payload says (the
+    ingestor's and requeue_pending's payloads for one headline differ).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _key(queue_name: str, lane: str) -> str:
+        return f"pqueue:{queue_name}" if lane == "main" else f"pqueue:{queue_name}:{lane}"
+
+    @staticmethod
+    def _payloads_key(queue_name: str) -> str:
+        return f"pqueue:{queue_name}:tasks"
+
+    def push(self, queue_name: str, data: dict, score: float, lane: str = "main") -> bool:
+        """Queues `data`; returns False if its task was already queued."""
+        member = task_id(data)
+        other = "low" if lane == "main" else "main"
+        if self.client.zscore(self._key(queue_name, other), member) is not None:
+            return False
+        if not self.client.zadd(self._key(queue_name, lane), {member: score}, nx=True):
+            return False
+        # A pop that gets in between finds no payload and skips the task; its row stays
+        # pending and requeue_pending brings it back
+        self.client.hset(self._payloads_key(queue_name), member, encode_task(data))
+        return True
+
+    def _take(self, queue_name: str, popped: List[tuple]) -> List[Tuple[dict, float]]:
+        """Payloads for popped (member, score) pairs, removed from the payload hash."""
+        if not popped:
+            return []
+        members = [member for member, _ in popped]
+        pipe = self.client.pipeline()
+        pipe.hmget(self._payloads_key(queue_name), members)
+        pipe.hdel(self._payloads_key(queue_name), *members)
+        raws = pipe.execute()[0]
+        return [(decode_task(raw), score) for raw, (_, score) in zip(raws, popped) if raw]
+
+    def pop(self, queue_name: str, timeout: int = 5) -> Optional[dict]:
+        result = self.client.bzpopmax([self._key(queue_name, "main"), self._key(queue_name, "low")], timeout=timeout)
+        if result:
+            taken = self._take(queue_name, [(result[1], result[2])])
+            return taken[0][0] if taken else None
+        return None
+
+    def pop_batch(self, queue_name: str, batch_size: int = 5, lane: str = "main") -> List[Tuple[dict, float]]:
+        return self._take(queue_name, self.client.zpopmax(self._key(queue_name, lane), batch_size))
+
+    def length(self, queue_name: str, lane: str = "main") -> int:
+        return self.client.zcard(self._key(queue_name, lane))
+
+    def trim(self, queue_name: str, lane: str, max_items: int) -> List[dict]:
+        """Drop the lowest-priority items beyond `max_items`; returns what was dropped."""
+        overflow = self.length(queue_name, lane) - max_items
+        if overflow <= 0:
+            return []
+        return [item for item, _ in self._take(queue_name, self.client.zpopmin(self._key(queue_name, lane), overflow))]
+
+    def lowest(self, queue_name: str, lane: str = "main") -> Optional[dict]:
+        results = self.client.zrange(self._key(queue_name, lane), 0, 0)
+        raw = self.client.hget(self._payloads_key(queue_name), results[0]) if results else None
+        return decode_task(raw) if raw else None
+
+
+class LocalQueues:
+    """
+    In-process priority queues for the all-in-one runtime, with the same lanes
+    and once-per-task rule as RedisQueues. Items are passed as-is, without
+    serialization.
+    """
+
+    def __init__(self):
+        self._heaps: Dict[Tuple[str, str], list] = defaultdict(list)
+        # Task ids waiting in either lane, per queue
+        self._queued: Dict[str, set] = defaultdict(set)
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def push(self, queue_name: str, data: dict, score: float, lane: str = "main") -> bool:
+        member = task_id(data)
+        with self._cond:
+            if member in self._queued[queue_name]:
+                return False
+            self._queued[queue_name].add(member)
+            heapq.heappush(self._heaps[(queue_name, lane)], (-score, next(self._seq), data))
+            self._cond.notify_all()
+            return True
+
+    def _forget(self, queue_name: str, items: list):
+        for data in items:
+            self._queued[queue_name].discard(task_id(data))
+
+    def pop(self, queue_name: str, timeout: int = 5) -> Optional[dict]:
+        with self._cond:
+            heaps = [self._heaps[(queue_name, "main")], self._heaps[(queue_name, "low")]]
+            if not self._cond.wait_for(lambda: any(heaps), timeout=timeout):
+                return None
+            data = heapq.heappop(heaps[0] if heaps[0] else heaps[1])[2]
+            self._forget(queue_name, [data])
+            return data
+
+    def pop_batch(self, queue_name: str, batch_size: int = 5, lane: str = "main") -> List[Tuple[dict, float]]:
+        with self._cond:
+            heap = self._heaps[(queue_name, lane)]
+            popped = [heapq.heappop(heap) for _ in range(min(batch_size, len(heap)))]
+            self._forget(queue_name, [data for _, _, data in popped])
+            return [(data, -neg_score) for neg_score, _, data in popped]
+
+    def length(self, queue_name: str, lane: str = "main") -> int:
+        with self._cond:
+            return len(self._heaps[(queue_name, lane)])
+
+    def trim(self, queue_name: str, lane: str, max_items: int) -> List[dict]:
+        with self._cond:
+            heap = self._heaps[(queue_name, lane)]
+            if len(heap) <= max_items:
+                return []
+            heap.sort()
+            dropped = heap[max_items:]
+            del heap[max_items:]
+            self._forget(queue_name, [data for _, _, data in dropped])
+            return [data for _, _, data in dropped]
+
+    def lowest(self, queue_name: str, lane: str = "main") -> Optional[dict]:
+        with self._cond:
+            heap = self._heaps[(queue_name, lane)]
+            return max(heap)[2] if heap else None
+
+
 class NewsStorage:
-    def __init__(self, redis_host: str = None, redis_port: int = 6379):
+    def __init__(self, redis_host: str = None, redis_port: int = None, local: bool = False):
+        """
+        With `local=True` no Redis connection is made: queues live in this
+        process (see LocalQueues) and `client` is None.
+        """
+        if local:
+            self.db = DashboardDB()
+            self.client = None
+            self.queues = LocalQueues()
+            self._snapshots: Dict[str, dict] = {}
+            self._latest_prices: Dict[str, float] = {}
+            self._latest_filled = False
+            self._tick_batches: deque = deque(maxlen=TICKS_STREAM_MAXLEN)
+            self._tick_seq = 0
+            return
+
         if redis_host is None:
             redis_host = os.getenv("REDIS_HOST", "localhost")
+        if redis_port is None:
+            redis_port = int(os.getenv("REDIS_PORT", "6379"))
         
+        import redis  # not needed by the all-in-one runtime
         self.client = redis.Redis(
             host=redis_host, 
             port=redis_port, 
@@ -36,7 +225,17 @@ class NewsStorage:
             retry_on_timeout=True,
             health_check_interval=30
         )
-        self.db = DashboardDB()
+        self.queues = RedisQueues(self.client)
+        if os.getenv("SQLITE_WRITER") == "redis":
+            # Writes go through the single-writer service (app.workers.sqlite_writer), which
+            # also owns the schema: this process never opens the file for writing
+            from app.storage.writer import WriterClientDB
+            self.db = WriterClientDB(self.client)
+        else:
+            self.db = DashboardDB()
+
+    def ping(self) -> bool:
+        return self.client is None or bool(self.client.ping())
 
     def _get_hash(self, text: str) -> str:
         return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -44,69 +243,226 @@ class NewsStorage:
     def exists(self, headline: str) -> bool:
         return self.db.exists(self._get_hash(headline))
 
-    def save_headline(self, title: str, status: str, link: str = None, event: dict = None, published: float = None):
-        h = self._get_hash(title)
-        
-        existing = self.db.get_news_by_hash(h)
-        
-        # Use published timestamp if provided, otherwise use existing or current time
-        if published:
-            timestamp = published
-        elif existing:
-            timestamp = existing['timestamp']
+    def task_hash(self, task: dict) -> str:
+        return task_id(task)
+
+    def save_headline(self, title: str, status: str, link: str = None, event: dict = None, published: float = None, news_hash: str = None):
+        """
+        Saves a status transition. A missing link or event keeps the stored
+        one, and without `published` the stored timestamp is kept (the current
+        time is used for new headlines).
+        """
+        h = news_hash or self._get_hash(title)
+        self.db.save_news(h, title, status, published or time.time(), link, event, keep_timestamp=not published)
+        if status == "relevant" and event:
+            # Only relevant headlines are correlated with anomalies, so only they get a vector
+            from app.ai import embeddings
+            self.db.save_embeddings([(h, embeddings.to_bytes(embeddings.embed(embeddings.news_text(title, event))))])
+
+    def add_headline(self, title: str, status: str, link: str = None, published: float = None, news_hash: str = None) -> bool:
+        """
+        Stores a new headline (with the current time when `published` is
+        unknown). Returns False, changing nothing, if the hash is already
+        stored: another producer got there first and the row may have moved on.
+        """
+        h = news_hash or self._get_hash(title)
+        return self.db.insert_news(h, title, status, published or time.time(), link)
+
+    def transition(self, transitions: List[tuple]) -> set:
+        """
+        Conditional batch status change, see DashboardDB.transition_news.
+        Returns the set of hashes that applied; the rest were already moved on
+        by another worker (or never existed) and should be skipped. Payloads
+        moving to "relevant" with an event also need the `title`, to embed it.
+        """
+        applied = self.db.transition_news(transitions)
+        vectors = []
+        for news_hash, _, to_status, payload in transitions:
+            event = (payload or {}).get("event")
+            if to_status == "relevant" and event and news_hash in applied:
+                from app.ai import embeddings
+                vectors.append((news_hash, embeddings.to_bytes(embeddings.embed(embeddings.news_text(payload["title"], event)))))
+        if vectors:
+            self.db.save_embeddings(vectors)
+        return set(applied)
+
+    def record_stage(self, tasks: List[dict], stage: str):
+        self.db.record_stage([self.task_hash(t) for t in tasks], stage)
+
+    def save_price(self, ticker: str, price: float):
+        """Stores a price snapshot and updates the hot latest-price cache."""
+        self.save_prices([(ticker, price, time.time())])
+
+    def save_prices(self, ticks: List[tuple]):
+        """
+        Stores a batch of (ticker, price, timestamp) ticks, updates the latest-price
+        cache and publishes the batch to the tick stream (see `read_ticks`).
+        """
+        self.db.save_prices(ticks)
+        self.publish_prices(ticks)
+
+    def publish_prices(self, ticks: List[tuple]):
+        """The Redis half of save_prices, for callers that retry it separately from the SQLite write."""
+        latest = {}
+        for ticker, price, _ in sorted(ticks, key=lambda t: t[2]):
+            latest[ticker] = price
+        if self.client is None:
+            self._latest_prices.update(latest)
+            self._tick_seq += 1
+            self._tick_batches.append((str(self._tick_seq), ticks))
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(LATEST_PRICES_KEY, mapping=latest)
+        pipe.xadd(TICKS_STREAM_KEY, {"ticks": json.dumps(ticks)}, maxlen=TICKS_STREAM_MAXLEN, approximate=True)
+        pipe.execute()
+
+    def read_ticks(self, last_id: str = "$", block_ms: int = 1000) -> Tuple[str, List[tuple]]:
+        """
+        Ticks published after `last_id`, for downstream consumers. Pass the
+        returned id back in to continue; "$" starts from new batches only. In
+        the all-in-one runtime this polls the in-process buffer without blocking.
+        """
+        if self.client is None:
+            batches = list(self._tick_batches)
+            if last_id == "$":
+                return (batches[-1][0] if batches else "0"), []
+            newer = [(seq, ticks) for seq, ticks in batches if int(seq) > int(last_id)]
+            return (newer[-1][0] if newer else last_id), [tuple(t) for _, ticks in newer for t in ticks]
+
+        response = self.client.xread({TICKS_STREAM_KEY: last_id}, block=block_ms)
+        ticks = []
+        for _, entries in response:
+            for entry_id, fields in entries:
+                last_id = entry_id.decode()
+                ticks.extend(tuple(t) for t in json.loads(fields[b"ticks"]))
+        return last_id, ticks
+
+    def get_latest_prices(self) -> Dict[str, float]:
+        """
+        Latest price per ticker from memory/Redis; SQLite is only read to fill
+        a cold cache. The cache only counts as warm once it was filled: after
+        a Redis restart the market worker's first batches leave a hash that
+        holds some tickers only, and the rest come from SQLite.
+        """
+        if self.client is None:
+            if not self._latest_filled:
+                stored = self.db.get_latest_prices()
+                self._latest_prices = {**stored, **self._latest_prices}
+                self._latest_filled = True
+            return dict(self._latest_prices)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(LATEST_PRICES_KEY)
+        pipe.exists(LATEST_PRICES_FILLED_KEY)
+        cached, filled = pipe.execute()
+        cached = {ticker.decode('utf-8'): float(price) for ticker, price in cached.items()}
+        if filled:
+            return cached
+        stored = self.db.get_latest_prices()
+        pipe = self.client.pipeline(transaction=False)
+        for ticker, price in stored.items():
+            # HSETNX: a price the market worker cached meanwhile is newer than SQLite's
+            pipe.hsetnx(LATEST_PRICES_KEY, ticker, price)
+        pipe.set(LATEST_PRICES_FILLED_KEY, 1)
+        pipe.execute()
+        return {**stored, **cached}
+
+    def set_snapshot(self, name: str, data: dict):
+        """Publishes a small JSON-able state blob (e.g. the cross-asset monitor) for other processes."""
+        if self.client is None:
+            self._snapshots[name] = data
         else:
-            timestamp = time.time()
-        
-        if link is None and existing:
-            link = existing.get('link')
+            self.client.set(f"snapshot:{name}", json.dumps(data))
 
-        if event is None and status != "pending" and existing:
-            event = existing.get('event')
-            
-        self.db.save_news(h, title, status, timestamp, link, event)
+    def get_snapshot(self, name: str) -> Optional[dict]:
+        if self.client is None:
+            return self._snapshots.get(name)
+        raw = self.client.get(f"snapshot:{name}")
+        return json.loads(raw) if raw else None
 
     def get_recent_news(self, limit: int = 100):
         return self.db.get_recent(limit)
 
     def push_to_queue(self, queue_name: str, data: dict):
-        self.client.lpush(f"queue:{queue_name}", json.dumps(data))
+        """
+        Queue a task by priority (see app.storage.priority). Tasks already past
+        the staleness horizon go straight to the low-priority lane.
+        """
+        if not data.get("published") and not data.get("queued_at"):
+            data = {**data, "queued_at": time.time()}
+        if priority.is_stale(data):
+            self._demote(queue_name, data)
+        else:
+            self.queues.push(queue_name, data, priority.priority_score(data))
+
+    def _demote(self, queue_name: str, data: dict):
+        self.queues.push(queue_name, data, priority.priority_score(data), lane="low")
+        shed = self.queues.trim(queue_name, "low", priority.MAX_LOW_LANE)
+        if not shed:
+            return
+        # Terminal status, so requeue_pending won't bring it back
+        self.transition([(self.task_hash(t), ("pending", "analyzing", "extracting"), "stale", None) for t in shed])
+        for t in shed:
+            print(f"Status: STALE (shed from {queue_name} queue) - {t['title']}", flush=True)
 
     def pop_from_queue(self, queue_name: str, timeout: int = 5):
-        result = self.client.brpop(f"queue:{queue_name}", timeout=timeout)
-        if result:
-            return json.loads(result[1].decode('utf-8'))
-        return None
+        return self.queues.pop(queue_name, timeout=timeout)
 
     def get_queue_length(self, queue_name: str) -> int:
-        return self.client.llen(f"queue:{queue_name}")
+        return self.queues.length(queue_name) + self.queues.length(queue_name, "low")
+
+    def get_queue_stats(self, queue_name: str) -> dict:
+        """Depth per lane, plus the age of the item that would be served last (`tail_age_s`)."""
+        now = time.time()
+        stats = {}
+        for lane in ("main", "low"):
+            tail = self.queues.lowest(queue_name, lane)
+            stats[lane] = {
+                "depth": self.queues.length(queue_name, lane),
+                "tail_age_s": round(now - priority.task_time(tail), 1) if tail else None,
+            }
+        return stats
 
     def pop_batch_from_queue(self, queue_name: str, batch_size: int = 5) -> List[dict]:
-        pipe = self.client.pipeline()
-        for _ in range(batch_size):
-            pipe.rpop(f"queue:{queue_name}")
-        
-        results = pipe.execute()
+        """
+        Highest-priority tasks first. Main-lane tasks that went stale while
+        waiting are demoted on the way out; the low lane is only drained once
+        the main lane is empty.
+        """
         items = []
-        for r in results:
-            if r:
-                items.append(json.loads(r.decode('utf-8')))
+        while len(items) < batch_size:
+            popped = self.queues.pop_batch(queue_name, batch_size - len(items))
+            if not popped:
+                break
+            now = time.time()
+            for data, _ in popped:
+                if priority.is_stale(data, now):
+                    self._demote(queue_name, data)
+                else:
+                    items.append(data)
+        if len(items) < batch_size:
+            items.extend(data for data, _ in self.queues.pop_batch(queue_name, batch_size - len(items), lane="low"))
         return items
 
+    def retry_later(self, queue_name: str, task: dict, max_attempts: int) -> bool:
+        """
+        Re-queue a single task whose result was missing, counting attempts in
+        the payload. Returns False once `max_attempts` is used up.
+        """
+        attempts = task.get("attempts", 0) + 1
+        if attempts >= max_attempts:
+            return False
+        self.push_to_queue(queue_name, {**task, "attempts": attempts})
+        return True
+
     def requeue_pending(self):
-        stuck = self.db.get_stuck_hashes()
         requeued_count = 0
-        for item_info in stuck:
-            h = item_info['hash']
-            status = item_info['status']
-            item = self.db.get_news_by_hash(h)
-            
-            if not item:
-                continue
-                
-            if status in ["pending", "analyzing"]:
-                self.push_to_queue("relevance", {"title": item['title']})
-            elif status == "extracting":
-                self.push_to_queue("extraction", {"title": item['title']})
+        for item in self.db.get_stuck():
+            task = {"hash": item.hash, "title": item.title, "link": item.link, "published": item.timestamp}
+            if item.status in ["pending", "analyzing"]:
+                self.push_to_queue("relevance", task)
+            elif item.status == "extracting":
+                self.push_to_queue("extraction", task)
             
             requeued_count += 1
         return requeued_count
@@ -0,0 +1,72 @@
+"""
+Priority and staleness rules for the LLM work queues.
+
+A task's priority is expressed as an "effective publish time": its publish
+timestamp plus bonuses for trusted sources and market keywords. Newer, more
+important headlines therefore sort first, and a bonus is easy to reason about
+("a Fed headline counts as if it were an hour fresher").
+
+Tasks older than the staleness horizon go to a low-priority lane that is only
+drained when the main lane is empty; the low lane is capped, and the oldest
+overflow is shed.
+"""
+
+import os
+import re
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+STALE_AFTER_S = float(os.getenv("QUEUE_STALE_AFTER_S", str(6 * 3600)))
+MAX_LOW_LANE = int(os.getenv("QUEUE_MAX_LOW_LANE", "5000"))
+
+KEYWORD_BONUS_S = 3600
+SOURCE_BONUS_S = 1800  # per unit of source weight above 1.0
+
+MARKET_KEYWORDS = re.compile(
+    r"\b(fed|fomc|ecb|boj|central bank|rate (?:hike|cut)s?|interest rates?|inflation|cpi|gdp|jobs report|payrolls|"
+    r"recession|tariffs?|sanctions?|opec|crude|oil|gold|bitcoin|earnings|default|bankrupt\w*|war|ceasefire|election)\b",
+    re.IGNORECASE,
+)
+
+
+def _parse_source_weights(spec: str) -> Dict[str, float]:
+    """`reuters.com=2,bloomberg.com=2,cnn.com=0.5` -> {host suffix: weight}."""
+    weights = {}
+    for part in spec.split(","):
+        host, _, weight = part.strip().partition("=")
+        if host and weight:
+            try:
+                weights[host.lower()] = float(weight)
+            except ValueError:
+                pass
+    return weights
+
+
+SOURCE_WEIGHTS = _parse_source_weights(os.getenv("SOURCE_WEIGHTS", ""))
+
+
+def source_weight(link: Optional[str]) -> float:
+    if not link or not SOURCE_WEIGHTS:
+        return 1.0
+    host = urlparse(link).netloc.lower()
+    for suffix, weight in SOURCE_WEIGHTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return weight
+    return 1.0
+
+
+def task_time(task: dict) -> float:
+    return task.get("published") or task.get("queued_at") or time.time()
+
+
+def priority_score(task: dict) -> float:
+    score = task_time(task)
+    score += (source_weight(task.get("link")) - 1.0) * SOURCE_BONUS_S
+    if MARKET_KEYWORDS.search(task.get("title", "")):
+        score += KEYWORD_BONUS_S
+    return score
+
+
+def is_stale(task: dict, now: Optional[float] = None) -> bool:
+    return (now or time.time()) - task_time(task) > STALE_AFTER_S
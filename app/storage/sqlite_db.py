@@ -1,13 +1,76 @@
 import sqlite3
 import json
 import os
+import threading
 import time
-from typing import List, Optional
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List, Optional
+from app.metrics import metrics
+
+# Pipeline stage reached when a headline is saved with a given status
+STATUS_STAGES = {
+    "pending": "ingested",
+    "analyzing": "analyzing",
+    "extracting": "decided",
+    "ignored": "decided",
+    "relevant": "extracted",
+}
+STAGES = ("ingested", "analyzing", "decided", "extracting", "extracted")
+
+NEWS_COLUMNS = "hash, title, link, status, timestamp, event_data"
+
+# Bucket widths (seconds) of the price_rollups table, kept in step by save_price.
+# 60s is the market worker's poll cycle: anomaly detection and the cross-asset
+# warm-up read minute closes, however fast ticks arrive.
+ROLLUP_RESOLUTIONS = (60, 300, 3600)
+
+# Seconds a starting process waits for another one's schema setup or migration
+SETUP_TIMEOUT_S = 600
+
+# Tables served by /api/export/{dataset}: (table, columns in output order).
+# Datasets with a ticker column can be filtered by ticker.
+EXPORTS = {
+    "news": ("news", ("hash", "title", "link", "status", "timestamp", "event_data")),
+    "anomalies": ("anomalies", ("ticker", "change_pct", "score", "level", "timestamp", "correlations")),
+    "prices": ("market_prices", ("ticker", "price", "timestamp")),
+}
+
+class NewsRecord:
+    """A row of `news`. The event JSON is only decoded if `event` is read."""
+
+    __slots__ = ("hash", "title", "link", "status", "timestamp", "_event_data", "_event")
+
+    def __init__(self, hash: str, title: str, link: Optional[str], status: str, timestamp: float, event_data: Optional[str]):
+        self.hash = hash
+        self.title = title
+        self.link = link
+        self.status = status
+        self.timestamp = timestamp
+        self._event_data = event_data
+        self._event = None
+
+    @property
+    def event(self) -> Optional[dict]:
+        if self._event is None and self._event_data:
+            self._event = json.loads(self._event_data)
+        return self._event
+
+    def to_dict(self) -> dict:
+        return {
+            "title": self.title,
+            "link": self.link,
+            "status": self.status,
+            "timestamp": self.timestamp,
+            "event": self.event
+        }
 
 class DashboardDB:
-    def __init__(self, db_path: str = "data/market_monitor.db"):
-        self.db_path = db_path
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.getenv("DB_PATH", "data/market_monitor.db")
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Threads sharing one DashboardDB (all-in-one runtime) write one at a time
+        # instead of contending for SQLite's file lock
+        self._write_lock = threading.Lock()
         self._init_db()
 
     def _get_connection(self):
@@ -15,8 +78,19 @@ class DashboardDB:
         conn.row_factory = sqlite3.Row
         return conn
 
+    @contextmanager
+    def _write(self, op: str):
+        """Connection for a write transaction; the commit is included in the timing."""
+        with self._write_lock, metrics.timer("sqlite_write_seconds", op=op):
+            with self._get_connection() as conn:
+                yield conn
+
     def _init_db(self):
-        with self._get_connection() as conn:
+        # Schema setup and migrations can hold the write lock for a while on an
+        # upgraded database: processes starting alongside wait instead of failing
+        with closing(sqlite3.connect(self.db_path, timeout=SETUP_TIMEOUT_S)) as conn, conn:
+            # Readers don't block the writer (and vice versa); the setting persists in the file
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS news (
                     hash TEXT PRIMARY KEY,
@@ -39,6 +113,32 @@ class DashboardDB:
                 )
             """)
             conn.execute("CREATE INDEX IF NOT EXISTS idx_ticker_ts ON market_prices(ticker, timestamp DESC)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prices_ts ON market_prices(timestamp)")
+
+            # Newest row of market_prices per ticker, kept in step by save_price
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS latest_prices (
+                    ticker TEXT PRIMARY KEY,
+                    price REAL NOT NULL,
+                    timestamp REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+            # Per-bucket low, high and close (with their times), so long chart ranges don't scan every tick
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_rollups (
+                    ticker TEXT NOT NULL,
+                    resolution_s INTEGER NOT NULL,
+                    bucket REAL NOT NULL,
+                    low REAL NOT NULL,
+                    low_ts REAL NOT NULL,
+                    high REAL NOT NULL,
+                    high_ts REAL NOT NULL,
+                    close REAL,
+                    close_ts REAL,
+                    PRIMARY KEY (ticker, resolution_s, bucket)
+                ) WITHOUT ROWID
+            """)
 
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS anomalies (
@@ -51,18 +151,218 @@ class DashboardDB:
                     correlations TEXT
                 )
             """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_ts ON anomalies(timestamp)")
 
-    def save_news(self, news_hash: str, title: str, status: str, timestamp: float, link: Optional[str] = None, event: Optional[dict] = None):
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS feed_schemas (
+                    feed_url TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    schema_json TEXT,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    retry_at REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    feed_url TEXT PRIMARY KEY,
+                    seen_ids TEXT NOT NULL,
+                    last_published REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+            # First wall-clock time each headline reached each pipeline stage
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS news_stages (
+                    hash TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    PRIMARY KEY (hash, stage)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_ts ON news_stages(stage, ts)")
+
+            # Hashed TF vectors (float32 bytes, see app.ai.embeddings) of relevant headlines
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS news_embeddings (
+                    hash TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    created REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_created ON news_embeddings(created)")
+
+        self._migrate()
+
+    def _migrate(self):
+        """
+        Applies the one-off data migrations the database hasn't had yet. The
+        first process to get the write lock runs them and bumps PRAGMA
+        user_version; processes starting alongside it wait, then skip them.
+        """
+        steps = (self._backfill_latest_prices, self._add_rollup_closes, self._backfill_rollups)
+        with closing(self._get_connection()) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= len(steps):
+                return
+        conn = sqlite3.connect(self.db_path, timeout=SETUP_TIMEOUT_S, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for step in steps[version:]:
+                print(f"Migrating {self.db_path}: {step.__name__.lstrip('_')}", flush=True)
+                step(conn)
+            if version < len(steps):
+                conn.execute(f"PRAGMA user_version = {len(steps)}")
+            conn.execute("COMMIT")
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+
+    def _backfill_latest_prices(self, conn):
+        """Fills latest_prices for databases created before the table existed."""
+        if conn.execute("SELECT 1 FROM latest_prices LIMIT 1").fetchone() is None:
+            conn.execute("""
+                INSERT OR IGNORE INTO latest_prices (ticker, price, timestamp)
+                SELECT ticker, price, timestamp FROM market_prices
+                WHERE id IN (SELECT MAX(id) FROM market_prices GROUP BY ticker)
+            """)
+
+    def _add_rollup_closes(self, conn):
+        """Adds the close columns to price_rollups tables created before they existed."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(price_rollups)")}
+        if "close" not in columns:
+            # Older buckets stay without a close
+            conn.execute("ALTER TABLE price_rollups ADD COLUMN close REAL")
+            conn.execute("ALTER TABLE price_rollups ADD COLUMN close_ts REAL")
+
+    def _backfill_rollups(self, conn):
+        """Fills price_rollups from market_prices, for each resolution it has no rows for."""
+        for r in ROLLUP_RESOLUTIONS:
+            if conn.execute("SELECT 1 FROM price_rollups WHERE resolution_s = ? LIMIT 1", (r,)).fetchone():
+                continue
+            # With a single MIN/MAX aggregate, SQLite takes the bare columns from that row
+            conn.execute("""
+                INSERT OR IGNORE INTO price_rollups (ticker, resolution_s, bucket, low, low_ts, high, high_ts, close, close_ts)
+                SELECT lo.ticker, ?, lo.bucket, lo.low, lo.ts, hi.high, hi.ts, cl.close, cl.ts
+                FROM (
+                    SELECT ticker, CAST(timestamp / ? AS INTEGER) * ? AS bucket, MIN(price) AS low, timestamp AS ts
+                    FROM market_prices GROUP BY ticker, bucket
+                ) lo JOIN (
+                    SELECT ticker, CAST(timestamp / ? AS INTEGER) * ? AS bucket, MAX(price) AS high, timestamp AS ts
+                    FROM market_prices GROUP BY ticker, bucket
+                ) hi ON hi.ticker = lo.ticker AND hi.bucket = lo.bucket
+                JOIN (
+                    SELECT ticker, CAST(timestamp / ? AS INTEGER) * ? AS bucket, price AS close, MAX(timestamp) AS ts
+                    FROM market_prices GROUP BY ticker, bucket
+                ) cl ON cl.ticker = lo.ticker AND cl.bucket = lo.bucket
+            """, (r, r, r, r, r, r, r))
+
+    def save_news(self, news_hash: str, title: str, status: str, timestamp: float, link: Optional[str] = None, event: Optional[dict] = None, keep_timestamp: bool = False):
+        """
+        Inserts or updates a headline without reading it first: a missing link
+        or event keeps the stored one, and with `keep_timestamp` the stored
+        timestamp wins too (`timestamp` then only applies to new rows).
+        """
         event_json = json.dumps(event) if event else None
-        with self._get_connection() as conn:
+        with self._write("save_news") as conn:
             conn.execute("""
                 INSERT INTO news (hash, title, link, status, timestamp, event_data)
                 VALUES (?, ?, ?, ?, ?, ?)
                 ON CONFLICT(hash) DO UPDATE SET
                     link = COALESCE(excluded.link, news.link),
                     status = excluded.status,
+                    timestamp = CASE WHEN ? THEN news.timestamp ELSE excluded.timestamp END,
                     event_data = COALESCE(excluded.event_data, news.event_data)
-            """, (news_hash, title, link, status, timestamp, event_json))
+            """, (news_hash, title, link, status, timestamp, event_json, keep_timestamp))
+            stage = STATUS_STAGES.get(status)
+            if stage:
+                conn.execute(
+                    "INSERT OR IGNORE INTO news_stages (hash, stage, ts) VALUES (?, ?, ?)",
+                    (news_hash, stage, time.time())
+                )
+
+    def insert_news(self, news_hash: str, title: str, status: str, timestamp: float, link: Optional[str] = None) -> bool:
+        """
+        Inserts a new headline, leaving an existing row untouched. Returns
+        whether the row was inserted, so concurrent producers that both saw
+        the hash as unknown queue it only once.
+        """
+        with self._write("insert_news") as conn:
+            cursor = conn.execute("""
+                INSERT INTO news (hash, title, link, status, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(hash) DO NOTHING
+            """, (news_hash, title, link, status, timestamp))
+            inserted = cursor.rowcount == 1
+            stage = STATUS_STAGES.get(status)
+            if inserted and stage:
+                conn.execute(
+                    "INSERT OR IGNORE INTO news_stages (hash, stage, ts) VALUES (?, ?, ?)",
+                    (news_hash, stage, time.time())
+                )
+        return inserted
+
+    def transition_news(self, transitions: List[tuple]) -> List[str]:
+        """
+        Applies `(hash, from_status, to_status, payload)` status changes in one
+        transaction. `from_status` is a status or a tuple of them, and
+        `payload` (or None) may carry an `event`, a `link` and a `timestamp`.
+        Each change only applies while the row is still in `from_status`, so a
+        late or duplicate task can't move a headline backwards. Returns the
+        hashes that applied.
+        """
+        applied, stages = [], []
+        with self._write("transition_news") as conn:
+            for news_hash, from_status, to_status, payload in transitions:
+                allowed = (from_status,) if isinstance(from_status, str) else tuple(from_status)
+                payload = payload or {}
+                event = payload.get("event")
+                cursor = conn.execute(f"""
+                    UPDATE news SET
+                        status = ?,
+                        link = COALESCE(?, link),
+                        event_data = COALESCE(?, event_data),
+                        timestamp = COALESCE(?, timestamp)
+                    WHERE hash = ? AND status IN ({','.join('?' * len(allowed))})
+                """, (to_status, payload.get("link"), json.dumps(event) if event else None, payload.get("timestamp"),
+                      news_hash, *allowed))
+                if cursor.rowcount:
+                    applied.append(news_hash)
+                    if to_status in STATUS_STAGES:
+                        stages.append((news_hash, STATUS_STAGES[to_status]))
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO news_stages (hash, stage, ts) VALUES (?, ?, ?)",
+                [(h, stage, now) for h, stage in stages]
+            )
+        return applied
+
+    def record_stage(self, news_hashes: List[str], stage: str):
+        """Marks stages that have no status of their own (e.g. extraction pickup)."""
+        now = time.time()
+        with self._write("record_stage") as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO news_stages (hash, stage, ts) VALUES (?, ?, ?)",
+                [(h, stage, now) for h in news_hashes]
+            )
+
+    def get_stage_timings(self, since: float) -> List[dict]:
+        """One row per headline ingested since `since`, with its publish time and per-stage times."""
+        columns = ",\n".join(
+            f"MAX(CASE WHEN s.stage = '{stage}' THEN s.ts END) AS {stage}" for stage in STAGES
+        )
+        with self._get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT n.timestamp AS published,
+                {columns}
+                FROM news_stages s JOIN news n ON n.hash = s.hash
+                WHERE s.hash IN (SELECT hash FROM news_stages WHERE stage = 'ingested' AND ts >= ?)
+                GROUP BY s.hash
+            """, (since,))
+            return [dict(row) for row in cursor.fetchall()]
 
     def exists(self, news_hash: str) -> bool:
         with self._get_connection() as conn:
@@ -91,53 +391,99 @@ class DashboardDB:
                 results.append(item)
             return results
 
+    def count_by_status(self) -> dict:
+        with self._get_connection() as conn:
+            cursor = conn.execute("SELECT status, COUNT(*) AS n FROM news GROUP BY status")
+            return {row["status"]: row["n"] for row in cursor.fetchall()}
+
     def get_pending_hashes(self, limit: int = 500) -> List[str]:
         with self._get_connection() as conn:
             cursor = conn.execute("SELECT hash FROM news WHERE status = 'pending' LIMIT ?", (limit,))
             return [row["hash"] for row in cursor.fetchall()]
 
-    def get_stuck_hashes(self, limit: int = 500) -> List[dict]:
+    def get_stuck(self, limit: int = 500) -> List[NewsRecord]:
         """Finds items that are in a non-final state."""
         with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT hash, status FROM news 
+            cursor = conn.execute(f"""
+                SELECT {NEWS_COLUMNS} FROM news
                 WHERE status IN ('pending', 'analyzing', 'extracting') 
                 LIMIT ?
             """, (limit,))
-            return [{"hash": row["hash"], "status": row["status"]} for row in cursor.fetchall()]
+            return [NewsRecord(*row) for row in cursor.fetchall()]
 
-    def get_news_by_hash(self, news_hash: str) -> Optional[dict]:
+    def get_news_by_hash(self, news_hash: str) -> Optional[NewsRecord]:
         with self._get_connection() as conn:
-            cursor = conn.execute("SELECT * FROM news WHERE hash = ?", (news_hash,))
+            cursor = conn.execute(f"SELECT {NEWS_COLUMNS} FROM news WHERE hash = ?", (news_hash,))
             row = cursor.fetchone()
-            if row:
-                return {
-                    "title": row["title"],
-                    "link": row["link"],
-                    "status": row["status"],
-                    "timestamp": row["timestamp"],
-                    "event": json.loads(row["event_data"]) if row["event_data"] else None
-                }
-        return None
+            return NewsRecord(*row) if row else None
 
-    def save_price(self, ticker: str, price: float):
+    def get_news_by_hashes(self, news_hashes: List[str]) -> Dict[str, NewsRecord]:
+        """One query per 500 hashes instead of one per hash."""
+        found = {}
         with self._get_connection() as conn:
-            conn.execute("""
+            for i in range(0, len(news_hashes), 500):
+                chunk = news_hashes[i:i + 500]
+                cursor = conn.execute(
+                    f"SELECT {NEWS_COLUMNS} FROM news WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update((row[0], NewsRecord(*row)) for row in cursor.fetchall())
+        return found
+
+    def save_price(self, ticker: str, price: float):
+        self.save_prices([(ticker, price, time.time())])
+
+    def save_prices(self, ticks: List[tuple]):
+        """
+        Stores (ticker, price, timestamp) ticks in one transaction. latest_prices
+        and price_rollups get one upsert per ticker and per bucket, not per tick.
+        """
+        latest: Dict[str, tuple] = {}
+        rollups: Dict[tuple, list] = {}
+        for ticker, price, ts in ticks:
+            if ticker not in latest or ts >= latest[ticker][2]:
+                latest[ticker] = (ticker, price, ts)
+            for r in ROLLUP_RESOLUTIONS:
+                bucket = rollups.get((ticker, r, int(ts // r) * r))
+                if bucket is None:
+                    rollups[(ticker, r, int(ts // r) * r)] = [price, ts, price, ts, price, ts]
+                    continue
+                if price < bucket[0]:
+                    bucket[0], bucket[1] = price, ts
+                if price > bucket[2]:
+                    bucket[2], bucket[3] = price, ts
+                if ts >= bucket[5]:
+                    bucket[4], bucket[5] = price, ts
+
+        with self._write("save_prices") as conn:
+            conn.executemany("""
                 INSERT INTO market_prices (ticker, price, timestamp)
                 VALUES (?, ?, ?)
-            """, (ticker, price, time.time()))
+            """, ticks)
+            conn.executemany("""
+                INSERT INTO latest_prices (ticker, price, timestamp)
+                VALUES (?, ?, ?)
+                ON CONFLICT(ticker) DO UPDATE SET price = excluded.price, timestamp = excluded.timestamp
+                WHERE excluded.timestamp >= latest_prices.timestamp
+            """, list(latest.values()))
+            conn.executemany("""
+                INSERT INTO price_rollups (ticker, resolution_s, bucket, low, low_ts, high, high_ts, close, close_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(ticker, resolution_s, bucket) DO UPDATE SET
+                    low_ts = CASE WHEN excluded.low < low THEN excluded.low_ts ELSE low_ts END,
+                    low = MIN(low, excluded.low),
+                    high_ts = CASE WHEN excluded.high > high THEN excluded.high_ts ELSE high_ts END,
+                    high = MAX(high, excluded.high),
+                    close = CASE WHEN close_ts IS NULL OR excluded.close_ts >= close_ts THEN excluded.close ELSE close END,
+                    close_ts = CASE WHEN close_ts IS NULL OR excluded.close_ts >= close_ts THEN excluded.close_ts ELSE close_ts END
+            """, [key + tuple(value) for key, value in rollups.items()])
 
     def get_latest_prices(self) -> dict:
         with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT ticker, price 
-                FROM market_prices 
-                WHERE id IN (SELECT MAX(id) FROM market_prices GROUP BY ticker)
-            """)
+            cursor = conn.execute("SELECT ticker, price FROM latest_prices")
             return {row["ticker"]: row["price"] for row in cursor.fetchall()}
 
     def save_anomaly(self, ticker: str, change_pct: float, score: float, level: str, correlations: List[dict]):
-        with self._get_connection() as conn:
+        with self._write("save_anomaly") as conn:
             conn.execute("""
                 INSERT INTO anomalies (ticker, change_pct, score, level, timestamp, correlations)
                 VALUES (?, ?, ?, ?, ?, ?)
@@ -162,6 +508,53 @@ class DashboardDB:
                 } for row in rows
             ]
 
+    def save_embeddings(self, vectors: List[tuple]):
+        """Stores (hash, vector bytes) pairs, replacing earlier vectors for the same headline."""
+        now = time.time()
+        with self._write("save_embeddings") as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO news_embeddings (hash, vector, created) VALUES (?, ?, ?)",
+                [(h, vector, now) for h, vector in vectors]
+            )
+
+    def get_news_embeddings(self, created_after: float, published_after: float) -> List[dict]:
+        """Relevant headlines with an event, embedded at or after `created_after`, oldest embedding first."""
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT n.hash, n.title, n.link, n.status, n.timestamp, n.event_data, e.vector, e.created
+                FROM news_embeddings e JOIN news n ON n.hash = e.hash
+                WHERE e.created >= ? AND n.timestamp >= ?
+                  AND n.status = 'relevant' AND n.event_data IS NOT NULL
+                ORDER BY e.created
+            """, (created_after, published_after))
+            return [
+                {
+                    "hash": row["hash"],
+                    "title": row["title"],
+                    "link": row["link"],
+                    "status": row["status"],
+                    "timestamp": row["timestamp"],
+                    "event": json.loads(row["event_data"]),
+                    "vector": row["vector"],
+                    "created": row["created"],
+                } for row in cursor.fetchall()
+            ]
+
+    def get_unembedded_news(self, published_after: float, limit: int = 1000) -> List[dict]:
+        """Relevant headlines with an event but no stored vector (e.g. saved before embeddings existed)."""
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT n.hash, n.title, n.event_data FROM news n
+                LEFT JOIN news_embeddings e ON e.hash = n.hash
+                WHERE e.hash IS NULL AND n.timestamp >= ?
+                  AND n.status = 'relevant' AND n.event_data IS NOT NULL
+                LIMIT ?
+            """, (published_after, limit))
+            return [
+                {"hash": row["hash"], "title": row["title"], "event": json.loads(row["event_data"])}
+                for row in cursor.fetchall()
+            ]
+
     def get_price_history(self, ticker: str, limit: int = 20) -> List[dict]:
         with self._get_connection() as conn:
             cursor = conn.execute("""
@@ -172,3 +565,120 @@ class DashboardDB:
                 LIMIT ?
             """, (ticker, limit))
             return [{"price": row["price"], "timestamp": row["timestamp"]} for row in cursor.fetchall()]
+
+
+    def get_price_closes(self, ticker: str, resolution_s: int = 60, limit: int = 20) -> List[dict]:
+        """
+        Last price of each rollup bucket, newest first, in get_price_history's
+        shape: one entry per poll cycle however fast ticks arrive.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT close, close_ts
+                FROM price_rollups
+                WHERE ticker = ? AND resolution_s = ? AND close IS NOT NULL
+                ORDER BY bucket DESC
+                LIMIT ?
+            """, (ticker, resolution_s, limit))
+            return [{"price": row["close"], "timestamp": row["close_ts"]} for row in cursor.fetchall()]
+
+    def get_price_series(self, ticker: str, start: float, end: float, resolution_s: int = 0) -> tuple:
+        """
+        (timestamps, prices) between `start` and `end`, oldest first: raw ticks
+        with `resolution_s=0`, otherwise each rollup bucket's low and high.
+        """
+        with self._get_connection() as conn:
+            if resolution_s:
+                cursor = conn.execute("""
+                    SELECT low_ts, low, high_ts, high FROM price_rollups
+                    WHERE ticker = ? AND resolution_s = ? AND bucket > ? AND bucket <= ?
+                    ORDER BY bucket
+                """, (ticker, resolution_s, start - resolution_s, end))
+                points = []
+                for low_ts, low, high_ts, high in cursor.fetchall():
+                    if low_ts == high_ts:
+                        points.append((low_ts, low))
+                    else:
+                        points.extend(sorted([(low_ts, low), (high_ts, high)]))
+            else:
+                cursor = conn.execute("""
+                    SELECT timestamp, price FROM market_prices
+                    WHERE ticker = ? AND timestamp >= ? AND timestamp <= ?
+                    ORDER BY timestamp
+                """, (ticker, start, end))
+                points = cursor.fetchall()
+        return [p[0] for p in points], [p[1] for p in points]
+
+    def iter_export(self, dataset: str, start: float, end: float, ticker: Optional[str] = None,
+                    chunk_rows: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Rows of an EXPORTS dataset with start <= timestamp < end, oldest first,
+        `chunk_rows` at a time from one open cursor. The read transaction sees
+        a single snapshot, however long the export takes.
+        """
+        table, columns = EXPORTS[dataset]
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE timestamp >= ? AND timestamp < ?"
+        params = [start, end]
+        if ticker and "ticker" in columns:
+            sql += " AND ticker = ?"
+            params.append(ticker)
+        # Read-only, and not tied to the opening thread: a streaming response
+        # may resume the generator on any threadpool thread
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            cursor = conn.execute(sql + " ORDER BY timestamp", params)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def get_feed_schema(self, feed_url: str) -> Optional[dict]:
+        with self._get_connection() as conn:
+            cursor = conn.execute("SELECT * FROM feed_schemas WHERE feed_url = ?", (feed_url,))
+            row = cursor.fetchone()
+            if row:
+                return {
+                    "fingerprint": row["fingerprint"],
+                    "schema": json.loads(row["schema_json"]) if row["schema_json"] is not None else None,
+                    "failures": row["failures"],
+                    "retry_at": row["retry_at"]
+                }
+        return None
+
+    def save_feed_schema(self, feed_url: str, fingerprint: str, schema: Optional[dict], failures: int = 0, retry_at: float = 0.0):
+        """Stores a learned schema, or a failed attempt when `schema` is None."""
+        schema_json = json.dumps(schema) if schema is not None else None
+        with self._write("save_feed_schema") as conn:
+            conn.execute("""
+                INSERT INTO feed_schemas (feed_url, fingerprint, schema_json, failures, retry_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(feed_url) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    schema_json = excluded.schema_json,
+                    failures = excluded.failures,
+                    retry_at = excluded.retry_at,
+                    updated_at = excluded.updated_at
+            """, (feed_url, fingerprint, schema_json, failures, retry_at, time.time()))
+
+    def get_feed_state(self, feed_url: str) -> Optional[dict]:
+        with self._get_connection() as conn:
+            cursor = conn.execute("SELECT seen_ids, last_published FROM feed_state WHERE feed_url = ?", (feed_url,))
+            row = cursor.fetchone()
+            if row:
+                return {"seen_ids": json.loads(row["seen_ids"]), "last_published": row["last_published"]}
+        return None
+
+    def save_feed_state(self, feed_url: str, seen_ids: List[str], last_published: Optional[float]):
+        """Stores a feed's high-water mark: the most recent entry ids and publish time."""
+        with self._write("save_feed_state") as conn:
+            conn.execute("""
+                INSERT INTO feed_state (feed_url, seen_ids, last_published, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(feed_url) DO UPDATE SET
+                    seen_ids = excluded.seen_ids,
+                    last_published = excluded.last_published,
+                    updated_at = excluded.updated_at
+            """, (feed_url, json.dumps(seen_ids), last_published, time.time()))
@@ -0,0 +1,45 @@
+import math
+from typing import Dict, List, Optional
+
+# (name, from, to) over the columns returned by DashboardDB.get_stage_timings
+SEGMENTS = [
+    ("publish_to_ingest", "published", "ingested"),
+    ("relevance_queue_wait", "ingested", "analyzing"),
+    ("relevance", "analyzing", "decided"),
+    ("extraction_queue_wait", "decided", "extracting"),
+    ("extraction", "extracting", "extracted"),
+    ("ingest_to_extracted", "ingested", "extracted"),
+    ("publish_to_extracted", "published", "extracted"),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize_stage_latencies(rows: List[dict]) -> Dict[str, dict]:
+    """
+    Latency percentiles (seconds) for each pipeline segment.
+
+    Headlines that have not reached both ends of a segment are left out of it,
+    so `count` also shows how many items got that far.
+    """
+    summary = {}
+    for name, start, end in SEGMENTS:
+        durations = sorted(
+            row[end] - row[start]
+            for row in rows
+            if row.get(start) is not None and row.get(end) is not None
+        )
+        summary[name] = {
+            "count": len(durations),
+            "p50": percentile(durations, 50),
+            "p90": percentile(durations, 90),
+            "p99": percentile(durations, 99),
+            "max": durations[-1] if durations else None,
+        }
+    return summary
@@ -0,0 +1,195 @@
+"""
+Single-writer SQLite service with group commit.
+
+With SQLITE_WRITER=redis, NewsStorage uses WriterClientDB: reads go straight
+to SQLite over read-only connections, and each write is pushed as an intent
+onto the Redis list `sqlite:writes`. One process (`python -m
+app.workers.sqlite_writer`) pops intents in order and applies them through
+GroupCommitDB: it takes every queued intent (up to WRITER_MAX_BATCH), plus
+whatever arrives within WRITER_FLUSH_MS of the first (default 0: intents that
+queue up while a group commits form the next group), runs each in its own
+savepoint and commits the group once. A caller blocks until its group is committed and gets
+the method's return value (e.g. the hashes a transition applied) back on a
+reply key.
+
+A caller gives up after WRITER_TIMEOUT_S (30s) with a TimeoutError. Its
+intent carries that deadline, and the writer drops intents whose caller has
+already given up instead of applying them late. An intent that was picked up
+just before its deadline may still commit after the caller raised, so a
+TimeoutError means the write may or may not have been applied; retry only
+writes that are safe to repeat (the conditional transitions and upserts are).
+
+Intents are pickled; like the queues, the Redis instance is trusted.
+"""
+
+import functools
+import os
+import pickle
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from app.metrics import metrics
+from app.storage.sqlite_db import DashboardDB
+
+WRITES_KEY = "sqlite:writes"
+REPLY_TTL_S = 60
+
+# DashboardDB methods that write; everything else is a read
+WRITE_METHODS = (
+    "save_news",
+    "insert_news",
+    "transition_news",
+    "record_stage",
+    "save_price",
+    "save_prices",
+    "save_anomaly",
+    "save_embeddings",
+    "save_feed_schema",
+    "save_feed_state",
+)
+
+
+class GroupCommitDB(DashboardDB):
+    """A DashboardDB whose write methods join the open group transaction instead of committing."""
+
+    def __init__(self, db_path: str = None):
+        super().__init__(db_path)
+        # Transactions are managed explicitly: one BEGIN/COMMIT per group, a savepoint per intent
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+    @contextmanager
+    def _write(self, op: str):
+        self._conn.execute("SAVEPOINT intent")
+        try:
+            yield self._conn
+        except Exception:
+            self._conn.execute("ROLLBACK TO intent")
+            self._conn.execute("RELEASE intent")
+            raise
+        self._conn.execute("RELEASE intent")
+
+    def apply(self, intents: List[tuple]) -> List[Tuple[object, Optional[str]]]:
+        """
+        Runs `(op, args, kwargs)` intents in one transaction. Returns a
+        `(result, error)` pair per intent; a failing intent is rolled back
+        alone and the rest of the group still commits.
+        """
+        results = []
+        with self._write_lock, metrics.timer("sqlite_write_seconds", op="group_commit"):
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for op, args, kwargs in intents:
+                    if op not in WRITE_METHODS:
+                        results.append((None, f"unknown write {op!r}"))
+                        continue
+                    try:
+                        results.append((getattr(self, op)(*args, **kwargs), None))
+                    except Exception as e:
+                        results.append((None, f"{type(e).__name__}: {e}"))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        metrics.observe("sqlite_group_commit_size", len(intents))
+        return results
+
+
+def _remote(op: str):
+    @functools.wraps(getattr(DashboardDB, op))
+    def method(self, *args, **kwargs):
+        return self._call(op, args, kwargs)
+    return method
+
+
+class WriterClientDB(DashboardDB):
+    """
+    DashboardDB for worker processes when the writer service is enabled.
+    Writes become intents for the writer; reads use read-only connections.
+    The writer owns the schema, so it must have created the database first.
+    """
+
+    def __init__(self, client, db_path: str = None, timeout_s: float = None):
+        self.db_path = db_path or os.getenv("DB_PATH", "data/market_monitor.db")
+        self.client = client
+        self.timeout_s = timeout_s if timeout_s is not None else float(os.getenv("WRITER_TIMEOUT_S", "30"))
+
+    def _get_connection(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _call(self, op: str, args: tuple, kwargs: dict):
+        reply_key = f"sqlite:reply:{uuid.uuid4().hex}"
+        start = time.perf_counter()
+        expires_at = time.time() + self.timeout_s
+        self.client.lpush(WRITES_KEY, pickle.dumps((op, args, kwargs, reply_key, expires_at)))
+        reply = self.client.brpop([reply_key], timeout=self.timeout_s)
+        metrics.observe("sqlite_write_seconds", time.perf_counter() - start, op=op)
+        if reply is None:
+            # The writer drops the intent if it has not started on it yet; see the module docstring
+            raise TimeoutError(f"SQLite writer did not commit {op} within {self.timeout_s}s")
+        result, error = pickle.loads(reply[1])
+        if error:
+            raise RuntimeError(f"SQLite writer failed {op}: {error}")
+        return result
+
+
+for _op in WRITE_METHODS:
+    setattr(WriterClientDB, _op, _remote(_op))
+
+
+class SQLiteWriter:
+    """Pops intents from Redis and applies them in groups (see module docstring)."""
+
+    def __init__(self, client, db: GroupCommitDB = None, flush_ms: float = None, max_batch: int = None):
+        self.client = client
+        self.db = db or GroupCommitDB()
+        self.flush_s = (flush_ms if flush_ms is not None else float(os.getenv("WRITER_FLUSH_MS", "0"))) / 1000
+        self.max_batch = max_batch or int(os.getenv("WRITER_MAX_BATCH", "500"))
+
+    def next_group(self, timeout: float = 5) -> list:
+        """Blocks for the first intent, then gathers more until the batch is full or the flush window ends."""
+        first = self.client.brpop([WRITES_KEY], timeout=timeout)
+        if not first:
+            return []
+        group = [first[1]]
+        deadline = time.monotonic() + self.flush_s
+        while len(group) < self.max_batch:
+            more = self.client.rpop(WRITES_KEY, self.max_batch - len(group))
+            if more:
+                group.extend(more)
+                continue
+            remaining = deadline - time.monotonic()
+            # Redis reads a timeout that rounds to 0 ms as "block forever"
+            if remaining < 0.001:
+                break
+            item = self.client.brpop([WRITES_KEY], timeout=remaining)
+            if not item:
+                break
+            group.append(item[1])
+        return [pickle.loads(raw) for raw in group]
+
+    def process(self, group: list):
+        now = time.time()
+        # Their callers have raised TimeoutError and stopped waiting: applying them now would surprise them
+        expired = [intent for intent in group if intent[4] < now]
+        if expired:
+            print(f"SQLite Writer: dropped {len(expired)} expired writes", flush=True)
+            metrics.inc("sqlite_writes_expired_total", len(expired))
+            group = [intent for intent in group if intent[4] >= now]
+        if not group:
+            return
+        try:
+            results = self.db.apply([(op, args, kwargs) for op, args, kwargs, _, _ in group])
+        except Exception as e:
+            # The commit itself failed: every intent in the group is lost
+            results = [(None, f"group commit failed: {e}")] * len(group)
+        pipe = self.client.pipeline(transaction=False)
+        for (_, _, _, reply_key, _), result in zip(group, results):
+            pipe.lpush(reply_key, pickle.dumps(result))
+            pipe.expire(reply_key, REPLY_TTL_S)
+        pipe.execute()
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from app.bench.importtime import profile_import
+
+# Cold import budget per worker, generous enough for slow CI machines
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "300"))
+
+WORKERS = [
+    "app.workers.ingestor",
+    "app.workers.relevance",
+    "app.workers.extractor",
+    "app.workers.market",
+    "app.workers.anomaly_worker",
+]
+
+
+@pytest.mark.parametrize("module", WORKERS)
+def test_worker_import_time(module):
+    result = profile_import(module)
+    assert result["cumulative_ms"] is not None
+    assert result["cumulative_ms"] < BUDGET_MS, (
+        f"{module} takes {result['cumulative_ms']:.0f} ms to import (budget {BUDGET_MS:.0f} ms); slowest: "
+        + ", ".join(f"{m['module']} {m['cumulative_ms']:.0f} ms" for m in result["slowest"][1:6])
+    )
+
+
+@pytest.mark.parametrize("module", WORKERS)
+def test_worker_import_skips_heavy_sdks(module):
+    assert profile_import(module)["heavy_loaded"] == []
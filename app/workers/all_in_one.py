@@ -0,0 +1,55 @@
+"""
+All-in-one runtime: every worker plus the dashboard in a single process.
+
+Meant for small deployments and edge boxes. Workers run as daemon threads and
+share one NewsStorage (in-process queues, no Redis), one DashboardDB whose
+writes are serialized through a single lock, and one Gemini rate limiter.
+The SDK imports and SQLite schema setup happen once instead of six times.
+"""
+
+import os
+import threading
+
+import uvicorn
+
+from app.storage.dedup import NewsStorage
+from app.workers.anomaly_worker import run_anomaly_worker
+from app.workers.extractor import run_extraction_worker
+from app.workers.ingestor import run_ingestor
+from app.workers.market import run_market_worker
+from app.workers.relevance import run_relevance_worker
+
+WORKERS = {
+    "ingestor": run_ingestor,
+    "relevance": run_relevance_worker,
+    "extraction": run_extraction_worker,
+    "market": run_market_worker,
+    "anomaly": run_anomaly_worker,
+}
+
+
+def _supervise(name: str, target, storage: NewsStorage):
+    # Worker loops handle their own errors; this only catches start-up crashes
+    try:
+        target(storage=storage)
+        print(f"[all-in-one] {name} worker exited", flush=True)
+    except Exception as e:
+        print(f"[all-in-one] {name} worker crashed: {e}", flush=True)
+
+
+def run_all_in_one():
+    storage = NewsStorage(local=True)
+
+    for name, target in WORKERS.items():
+        threading.Thread(target=_supervise, args=(name, target, storage), name=name, daemon=True).start()
+
+    # The dashboard must read the same in-process queues the workers use
+    from app.dashboard import web
+    web.storage = storage
+
+    print(f"All-in-one runtime started with workers: {', '.join(WORKERS)}", flush=True)
+    uvicorn.run(web.app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")), log_level="error")
+
+
+if __name__ == "__main__":
+    run_all_in_one()
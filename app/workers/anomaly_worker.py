@@ -1,30 +1,39 @@
+import os
 import time
 
+from app.ai.breaker import llm_breaker
 from app.ai.narrate import AlertNarrator
 from app.alerts.scoring import SeverityScorer
 from app.alerts.telegram import TelegramBot
 from app.market.anomalies import AnomalyDetector
 from app.storage.dedup import NewsStorage
+from app.metrics import metrics
+from app.registry import WorkerEntry
 
 
-def run_anomaly_worker():
+def run_anomaly_worker(storage: NewsStorage = None):
     POLL_INTERVAL_S = 60
-    DETECTOR_THRESHOLD = 0.005  # 0.5% for testing
+    DETECTOR_THRESHOLD = float(os.getenv("DETECTOR_THRESHOLD", "0.005"))  # tune with app.backtest
     MAX_SENT_ALERT_KEYS = 100
 
-    storage = NewsStorage()
+    storage = storage or NewsStorage()
     detector = AnomalyDetector(storage.db, threshold=DETECTOR_THRESHOLD)
     scorer = SeverityScorer()
+    from app.market.cross_asset import ticker_context  # numpy
     
     try:
-        narrator = AlertNarrator()
+        # Telegram first: without credentials the Gemini SDK is never loaded
         telegram = TelegramBot()
+        narrator = AlertNarrator()
         alerts_enabled = True
         print("✓ Telegram alerts enabled", flush=True)
     except Exception as e:
         print(f"⚠ Telegram alerts disabled: {e}", flush=True)
         alerts_enabled = False
     
+    metrics.start(storage.client, "anomaly")
+    llm_breaker.attach(storage.client)
+    worker_entry = WorkerEntry.register(storage.client, "anomaly")
     print("Anomaly Detection Worker started (Polling every 60s)...", flush=True)
     
     sent_alerts = set()
@@ -34,11 +43,21 @@ def run_anomaly_worker():
             time.sleep(POLL_INTERVAL_S)  # Run slightly after market worker
             print(f"--- Anomaly Check Started at {time.ctime()} ---", flush=True)
             
+            worker_entry.begin(1)
+            detection_start = time.perf_counter()
             anomalies = detector.detect_anomalies()
+            cross_asset = storage.get_snapshot("cross_asset")
+            scored = []
             for anomaly in anomalies:
+                anomaly["cross_asset"] = ticker_context(cross_asset, anomaly["ticker"])
                 correlations = detector.correlate_with_news(anomaly)
                 score = scorer.calculate_score(anomaly, correlations)
-                level = scorer.get_level(score)
+                anomaly["score"], anomaly["level"] = score, scorer.get_level(score)
+                scored.append((anomaly, correlations, score, anomaly["level"]))
+            metrics.observe("anomaly_detection_seconds", time.perf_counter() - detection_start)
+
+            for anomaly, correlations, score, level in scored:
+                metrics.inc("pipeline_items_total", stage="anomaly", outcome=level.lower())
                 
                 print(f"  [ANOMALY] {anomaly['ticker']} {anomaly['change_pct']:.2f}% | Score: {score} ({level})", flush=True)
                 
@@ -69,9 +88,11 @@ def run_anomaly_worker():
                             sent_alerts.add(alert_key)
                             if len(sent_alerts) > MAX_SENT_ALERT_KEYS:
                                 sent_alerts.pop()
-                    
+            worker_entry.done()
+
         except Exception as e:
             print(f"Anomaly Worker Error: {e}", flush=True)
+            worker_entry.error(e)
             time.sleep(10)
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+"""
+Optional autoscaler for the LLM workers, run as local child processes.
+
+Every AUTOSCALE_INTERVAL_S it reads the queue depths and the worker registry
+(app.registry) and sets, per stage, how many `python -m app.workers.<module>`
+processes run:
+
+- enough replicas to drain the queue within AUTOSCALE_TARGET_DRAIN_S at the
+  measured per-replica capacity, between AUTOSCALE_MIN and AUTOSCALE_MAX;
+- fewer, across both stages, when the replicas' combined LLM call rate would
+  exceed the account quota (LLM_QUOTA_RPM, default GEMINI_RPM), since extra
+  processes past that point only collect 429s;
+- the minimum while the LLM circuit breaker is open.
+
+Scaling up is immediate; scaling down stops one replica per
+AUTOSCALE_SCALE_DOWN_S. Replicas it did not start (e.g. compose services) are
+counted but never stopped.
+"""
+
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from app.ai.breaker import llm_breaker
+from app.registry import list_workers
+from app.runtime import wait_for
+from app.storage.dedup import NewsStorage
+
+# stage -> (worker module, headlines per LLM call)
+STAGES = {
+    "relevance": ("app.workers.relevance", 5),
+    "extraction": ("app.workers.extractor", 3),
+}
+
+
+def desired_replicas(depth: int, capacity_per_s: Optional[float], current: int,
+                     min_replicas: int, max_replicas: int, target_drain_s: float) -> int:
+    """Replicas needed to drain `depth` items within `target_drain_s`, at `capacity_per_s` each."""
+    if depth == 0:
+        return min_replicas
+    if not capacity_per_s:
+        # No replica has finished a batch yet: make sure one runs, then wait for a measurement
+        return min(max(current, min_replicas, 1), max_replicas)
+    needed = math.ceil(depth / (capacity_per_s * target_drain_s))
+    return min(max(needed, min_replicas), max_replicas)
+
+
+def fit_quota(desired: Dict[str, int], calls_per_replica_s: Dict[str, float],
+              quota_per_s: float, min_replicas: int) -> Dict[str, int]:
+    """Scales every stage down by the same factor if their combined LLM call rate exceeds the quota."""
+    total = sum(n * calls_per_replica_s.get(stage, 0.0) for stage, n in desired.items())
+    if total <= quota_per_s:
+        return desired
+    factor = quota_per_s / total
+    return {stage: max(min_replicas, math.floor(n * factor)) for stage, n in desired.items()}
+
+
+class Autoscaler:
+    def __init__(self, storage: NewsStorage):
+        self.storage = storage
+        self.min_replicas = int(os.getenv("AUTOSCALE_MIN", "1"))
+        self.max_replicas = int(os.getenv("AUTOSCALE_MAX", "4"))
+        self.target_drain_s = float(os.getenv("AUTOSCALE_TARGET_DRAIN_S", "120"))
+        self.scale_down_s = float(os.getenv("AUTOSCALE_SCALE_DOWN_S", "60"))
+        self.process_rpm = int(os.getenv("GEMINI_RPM", "30"))
+        self.quota_rpm = int(os.getenv("LLM_QUOTA_RPM", str(self.process_rpm)))
+        self.children: Dict[str, List[subprocess.Popen]] = {stage: [] for stage in STAGES}
+        self.last_scale_down: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+
+    def plan(self, workers: List[dict]) -> Dict[str, int]:
+        """Target replica count per stage, including replicas this autoscaler did not start."""
+        breaker_closed = llm_breaker.is_closed()
+        desired, calls = {}, {}
+        for stage, (_, per_call) in STAGES.items():
+            members = [w for w in workers if w["stage"] == stage and w["status"] != "stalled"]
+            measured = [w["capacity_per_s"] for w in members if w["capacity_per_s"]]
+            capacity = sum(measured) / len(measured) if measured else None
+            if not breaker_closed:
+                desired[stage] = self.min_replicas
+            else:
+                desired[stage] = desired_replicas(
+                    self.storage.get_queue_length(stage), capacity, len(members),
+                    self.min_replicas, self.max_replicas, self.target_drain_s,
+                )
+            # Each process's own rate limiter caps it at GEMINI_RPM
+            calls[stage] = min((capacity or 0.0) / per_call, self.process_rpm / 60)
+        return fit_quota(desired, calls, self.quota_rpm / 60, self.min_replicas)
+
+    def apply(self, plan: Dict[str, int], registered: Dict[str, int]):
+        now = time.time()
+        for stage, target in plan.items():
+            children = self.children[stage]
+            external = max(0, registered.get(stage, 0) - len(children))
+            want = max(0, target - external)
+            if want > len(children):
+                for _ in range(want - len(children)):
+                    children.append(subprocess.Popen([sys.executable, "-m", STAGES[stage][0]]))
+                print(f"[autoscaler] {stage}: scaled up to {want + external} replicas ({want} local)", flush=True)
+            elif want < len(children) and now - self.last_scale_down[stage] >= self.scale_down_s:
+                self._stop(children.pop())
+                self.last_scale_down[stage] = now
+                print(f"[autoscaler] {stage}: scaled down to {len(children) + external} replicas", flush=True)
+
+    def reap(self):
+        """Forgets children that exited on their own; they are replaced on the next step."""
+        for stage, children in self.children.items():
+            for proc in [p for p in children if p.poll() is not None]:
+                print(f"[autoscaler] {stage} replica {proc.pid} exited with {proc.returncode}", flush=True)
+                children.remove(proc)
+
+    def step(self):
+        self.reap()
+        workers = list_workers(self.storage.client)
+        registered: Dict[str, int] = {}
+        for w in workers:
+            registered[w["stage"]] = registered.get(w["stage"], 0) + 1
+        self.apply(self.plan(workers), registered)
+
+    def stop_all(self):
+        for children in self.children.values():
+            while children:
+                self._stop(children.pop())
+
+    @staticmethod
+    def _stop(proc: subprocess.Popen):
+        # Its batch in flight stays "analyzing"/"extracting" and is requeued by the ingestor's recovery
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def run_autoscaler(storage: NewsStorage = None):
+    INTERVAL_S = float(os.getenv("AUTOSCALE_INTERVAL_S", "15"))
+    REDIS_CONNECT_ATTEMPTS = 5
+    REDIS_CONNECT_DELAY_S = 2
+
+    storage = storage or NewsStorage()
+    if storage.client is None:
+        print("Autoscaler needs Redis: workers find each other through the registry.", flush=True)
+        return
+    wait_for(
+        storage.ping,
+        attempts=REDIS_CONNECT_ATTEMPTS,
+        delay_s=REDIS_CONNECT_DELAY_S,
+        on_retry=lambda i, e: None,
+    )
+    llm_breaker.attach(storage.client)
+    autoscaler = Autoscaler(storage)
+    # `docker stop` sends SIGTERM: exit through the finally below so the replicas stop too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Autoscaler started ({autoscaler.min_replicas}-{autoscaler.max_replicas} replicas per stage, "
+          f"quota {autoscaler.quota_rpm} rpm)...", flush=True)
+
+    try:
+        while True:
+            try:
+                autoscaler.step()
+            except Exception as e:
+                print(f"Autoscaler Error: {e}", flush=True)
+            time.sleep(INTERVAL_S)
+    finally:
+        autoscaler.stop_all()
+
+if __name__ == "__main__":
+    run_autoscaler()
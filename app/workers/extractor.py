@@ -2,14 +2,19 @@ import time
 import json
 from app.storage.dedup import NewsStorage
 from app.ai.extract import EventExtractor
+from app.ai.breaker import llm_breaker
+from app.ai.heuristics import HeuristicAnalyzer
 from app.runtime import heartbeat_sleep
+from app.metrics import metrics
+from app.registry import WorkerEntry
 
-def run_extraction_worker():
+def run_extraction_worker(storage: NewsStorage = None):
     BATCH_SIZE = 3
+    MAX_ATTEMPTS = 3
     IDLE_POLL_S = 2
     HEARTBEAT_EVERY_S = 60
 
-    storage = NewsStorage()
+    storage = storage or NewsStorage()
     extractor = None
     
     try:
@@ -18,10 +23,21 @@ def run_extraction_worker():
         print(f"Extractor Init Error: {e}")
         return
 
+    heuristics = HeuristicAnalyzer()
+    metrics.start(storage.client, "extraction")
+    llm_breaker.attach(storage.client)
+    worker_entry = WorkerEntry.register(storage.client, "extraction")
     print("Extraction Worker started...")
 
     while True:
         try:
+            degraded = llm_breaker.is_open()
+            worker_entry.paused = degraded and not llm_breaker.heuristic
+            if degraded and not llm_breaker.heuristic:
+                # Leave headlines queued until the circuit half-opens
+                time.sleep(IDLE_POLL_S)
+                continue
+
             tasks = storage.pop_batch_from_queue("extraction", batch_size=BATCH_SIZE)
             if not tasks:
                 heartbeat_sleep(
@@ -35,24 +51,52 @@ def run_extraction_worker():
                 )
                 continue
             
+            worker_entry.begin(len(tasks))
             headlines = [t['title'] for t in tasks]
+            storage.record_stage(tasks, "extracting")
             for h in headlines:
                 print(f"Status: EXTRACTING - {h}", flush=True)
 
             if headlines:
                 print(f"Processing batch of {len(headlines)} extractions...", flush=True)
-                batch_data = extractor.extract_events_batch(headlines)
+                batch_data = (heuristics if degraded else extractor).extract_events_batch(headlines)
                 
-                for i, event_data in enumerate(batch_data):
-                    headline = headlines[i]
+                done = []
+                for task, event_data in zip(tasks, batch_data):
+                    headline = task['title']
+                    if event_data is None and not llm_breaker.is_closed():
+                        # The API is down, not this headline: requeue it without using up an attempt
+                        storage.push_to_queue("extraction", task)
+                        print(f"Status: REQUEUED (LLM circuit open) - {headline}", flush=True)
+                        metrics.inc("pipeline_items_total", stage="extraction", outcome="requeued")
+                        continue
+                    if event_data is None and storage.retry_later("extraction", task, MAX_ATTEMPTS):
+                        print(f"Status: RETRY EXTRACTION - {headline}", flush=True)
+                        metrics.inc("pipeline_items_total", stage="extraction", outcome="retried")
+                        continue
                     if event_data:
                         print(f"EXTRACTED DATA for '{headline}': {json.dumps(event_data)}", flush=True)
-                    
-                    storage.save_headline(headline, status="relevant", event=event_data)
+                    done.append((task, event_data))
+
+                # Only headlines still waiting for extraction move on; duplicates are skipped
+                applied = storage.transition([
+                    (storage.task_hash(task), "extracting", "relevant", {"title": task['title'], "event": event_data})
+                    for task, event_data in done
+                ])
+                for task, event_data in done:
+                    headline = task['title']
+                    if storage.task_hash(task) not in applied:
+                        print(f"Status: SKIPPED (already advanced) - {headline}", flush=True)
+                        metrics.inc("pipeline_items_total", stage="extraction", outcome="skipped")
+                        continue
+                    applied.discard(storage.task_hash(task))
                     print(f"Status: RELEVANT - {headline}", flush=True)
-                
+                    metrics.inc("pipeline_items_total", stage="extraction", outcome="extracted" if event_data else "empty")
+            worker_entry.done()
+
         except Exception as e:
             print(f"Extraction Worker Error: {e}", flush=True)
+            worker_entry.error(e)
             time.sleep(5)
 
 if __name__ == "__main__":
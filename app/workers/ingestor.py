@@ -1,70 +1,99 @@
+import os
+import threading
 import time
+from app.ai.breaker import llm_breaker
+from app.ingestion.pipeline import MAX_ITEM_AGE_S, load_sources, process_entries, run_sources
 from app.ingestion.rss import RSSIngestor
+from app.ingestion.scheduler import FeedScheduler
 from app.storage.dedup import NewsStorage
 from app.runtime import wait_for
+from app.metrics import metrics
+from app.registry import WorkerEntry
 
-def run_ingestor():
-    FETCH_INTERVAL_S = 120
+def run_ingestor(storage: NewsStorage = None):
+    FETCH_INTERVAL_S = 120  # starting interval; each feed then adapts to its publish rate
+    MIN_FETCH_INTERVAL_S = 30
+    MAX_FETCH_INTERVAL_S = 3600
+    REQUEUE_EVERY_S = 120
+    MAX_IDLE_SLEEP_S = 30
     REDIS_CONNECT_ATTEMPTS = 5
     REDIS_CONNECT_DELAY_S = 2
-    MAX_ITEM_AGE_S = 86400  # 24h
 
-    ingestor = RSSIngestor()
-    storage = NewsStorage()
+    storage = storage or NewsStorage()
+    ingestor = RSSIngestor(db=storage.db)
+    scheduler = FeedScheduler(
+        ingestor.feeds,
+        default_interval_s=FETCH_INTERVAL_S,
+        min_interval_s=MIN_FETCH_INTERVAL_S,
+        max_interval_s=MAX_FETCH_INTERVAL_S,
+    )
     wait_for(
-        lambda: bool(storage.client.ping()),
+        storage.ping,
         attempts=REDIS_CONNECT_ATTEMPTS,
         delay_s=REDIS_CONNECT_DELAY_S,
         on_retry=lambda i, e: None,
     )
 
-    print("Ingestor Worker started...")
-    
+    metrics.start(storage.client, "ingestor")
+    llm_breaker.attach(storage.client)
+    worker_entry = WorkerEntry.register(storage.client, "ingestor")
+    # Push-style sources (NEWS_SOURCES="package.module:ClassName,...") feed the same pipeline from their own event loop
+    sources = load_sources(os.getenv("NEWS_SOURCES", ""))
+    if sources:
+        threading.Thread(target=run_sources, args=(storage, sources), name="news-sources", daemon=True).start()
+    print(f"Ingestor Worker started ({len(sources)} streaming sources)...")
+    last_requeue = 0.0
+
     while True:
         try:
-            print(f"--- Fetch Cycle Started at {time.ctime()} ---", flush=True)
-            
-            # Auto-recovery: Requeue any items that were stuck in pending/analyzing/extracting
-            requeued = storage.requeue_pending()
-            if requeued > 0:
-                print(f"  [RECOVERY] Requeued {requeued} stuck tasks.", flush=True)
+            now = time.time()
+            if now - last_requeue >= REQUEUE_EVERY_S:
+                # Auto-recovery: Requeue any items that were stuck in pending/analyzing/extracting
+                requeued = storage.requeue_pending()
+                if requeued > 0:
+                    print(f"  [RECOVERY] Requeued {requeued} stuck tasks.", flush=True)
+                last_requeue = now
 
-            entries = ingestor.fetch_headlines()
+            due = scheduler.pop_due(now)
+            if not due:
+                time.sleep(min(scheduler.seconds_until_next(), MAX_IDLE_SLEEP_S))
+                continue
+
+            print(f"--- Fetch Cycle Started at {time.ctime()} ({len(due)} feeds due) ---", flush=True)
+            total = 0
             new_count = 0
-            skipped_old = 0
-            current_time = time.time()
-            oldest_allowed = current_time - MAX_ITEM_AGE_S
-            
-            for entry in entries:
-                h = entry['title']
-                link = entry['link']
-                published = entry.get('published')
-                
-                # Skip news older than 1 day
-                if published and published < oldest_allowed:
-                    skipped_old += 1
+            worker_entry.begin(len(due))
+            for url in due:
+                # pop_due took the feed off the schedule: whatever happens, it has to be put back
+                try:
+                    result = ingestor.fetch_feed(url)
+                    new_count += process_entries(storage, result["items"], MAX_ITEM_AGE_S)
+                    # Only now are the items stored: a failure above leaves them to the next fetch
+                    ingestor.commit_feed(url, result)
+                except Exception as e:
+                    print(f"Ingestor Error ({url}): {e}", flush=True)
+                    delay = scheduler.record_failure(url)
+                    print(f"  Backing off {url} for ~{delay:.0f}s", flush=True)
                     continue
-                
-                if not storage.exists(h):
-                    new_count += 1
-                    print(f"  [NEW] {h}", flush=True)
-                    storage.save_headline(h, status="pending", link=link, published=published)
-                    storage.push_to_queue("relevance", {"title": h})
+                total += len(result["items"])
+                if result["ok"]:
+                    interval = scheduler.record_success(
+                        url,
+                        len(result["items"]),
+                        ttl_s=result["ttl_s"],
+                        max_age_s=result["max_age_s"],
+                        retry_after_s=result["retry_after_s"],
+                    )
+                    print(f"  Next fetch of {url} in ~{interval:.0f}s", flush=True)
                 else:
-                    # Update publication date for existing entries if we have it
-                    if published:
-                        existing = storage.db.get_news_by_hash(storage._get_hash(h))
-                        if existing and abs(existing['timestamp'] - published) > 86400:  # More than 1 day difference
-                            print(f"  [BACKFILL] Updating timestamp for: {h[:60]}...", flush=True)
-                            storage.save_headline(h, status=existing['status'], link=link, published=published, event=existing.get('event'))
-            
-            if skipped_old > 0:
-                print(f"  [FILTERED] Skipped {skipped_old} articles older than 1 day", flush=True)
-            print(f"--- Fetch Cycle Finished. Total: {len(entries)} items, New: {new_count} ---", flush=True)
-            print(f"Sleeping for {FETCH_INTERVAL_S}s...", flush=True)
-            time.sleep(FETCH_INTERVAL_S)
+                    delay = scheduler.record_failure(url, retry_after_s=result["retry_after_s"])
+                    print(f"  Backing off {url} for ~{delay:.0f}s", flush=True)
+
+            worker_entry.done()
+            print(f"--- Fetch Cycle Finished. Total: {total} items, New: {new_count} ---", flush=True)
         except Exception as e:
             print(f"Ingestor Error: {e}", flush=True)
+            worker_entry.error(e)
             time.sleep(10)
 
 if __name__ == "__main__":
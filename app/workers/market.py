@@ -1,28 +1,137 @@
-import time
-from app.market.prices import MarketData
+import asyncio
+import os
+from app.market.sources import PriceSource, price_source_from_env
 from app.storage.dedup import NewsStorage
+from app.metrics import metrics
+from app.registry import WorkerEntry
 
-def run_market_worker():
-    POLL_INTERVAL_S = 60
-
-    storage = NewsStorage()
-    market = MarketData()
-    
-    print("Market Data Worker started (Polling every 60s)...", flush=True)
-    
+async def _pump(source: PriceSource, queue: asyncio.Queue, restart_s: float):
+    """Feeds ticks from the source into the queue, restarting the stream if it fails."""
     while True:
         try:
-            print(f"--- Market Fetch Started at {time.ctime()} ---", flush=True)
-            prices = market.fetch_latest()
-            
-            for ticker, price in prices.items():
-                print(f"  [MARKET] {ticker}: {price}", flush=True)
-                storage.db.save_price(ticker, price)
-            
-            time.sleep(POLL_INTERVAL_S)
+            async for tick in source.stream():
+                await queue.put(tick)
+        except Exception as e:
+            print(f"Price Source Error: {e}", flush=True)
+        await asyncio.sleep(restart_s)
+
+async def _next_batch(queue: asyncio.Queue, flush_s: float, max_batch: int) -> list:
+    """Waits for a tick, then gathers more until the batch is full or `flush_s` has passed."""
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + flush_s
+    while len(batch) < max_batch:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+def run_market_worker(storage: NewsStorage = None):
+    WARMUP_SNAPSHOTS = 2000
+    # The cross-asset monitor's half-lives are counted in minute snapshots, however fast ticks arrive
+    MONITOR_EVERY_S = 60
+    FLUSH_MS = float(os.getenv("MARKET_FLUSH_MS", "200"))
+    MAX_BATCH = int(os.getenv("MARKET_MAX_BATCH", "5000"))
+    # Bounds memory if persistence falls behind: the source waits instead
+    MAX_PENDING_TICKS = 50000
+    SOURCE_RESTART_S = 10
+    RETRY_S = 1
+    MAX_RETRY_S = 30
+
+    storage = storage or NewsStorage()
+    source = price_source_from_env(start_prices=storage.get_latest_prices())
+
+    from app.market.cross_asset import CrossAssetMonitor  # numpy
+    monitor = CrossAssetMonitor(source.tickers, interval_s=MONITOR_EVERY_S)
+    # Minute closes from the 60s rollups: the last raw rows of a streaming source span milliseconds
+    monitor.warm_up({
+        t: [(row["timestamp"], row["price"]) for row in storage.db.get_price_closes(t, resolution_s=MONITOR_EVERY_S, limit=WARMUP_SNAPSHOTS)]
+        for t in source.tickers
+    }, bucket_s=MONITOR_EVERY_S)
+    storage.set_snapshot("cross_asset", monitor.snapshot())
+
+    metrics.start(storage.client, "market")
+    worker_entry = WorkerEntry.register(storage.client, "market")
+    print(f"Market Data Worker started ({type(source).__name__}, flush every {FLUSH_MS:g}ms or {MAX_BATCH} ticks)...", flush=True)
+
+    latest = {}
+    # Tickers that ticked since the monitor's last snapshot: returns must line up across assets
+    fresh = set()
+    last_monitor_ts = 0.0
+
+    def store(batch: list):
+        # One SQLite transaction: a failure leaves nothing behind, so the batch can be retried whole
+        storage.db.save_prices([tuple(tick) for tick in batch])
+
+    def publish(batch: list):
+        storage.publish_prices([tuple(tick) for tick in batch])
+
+    def observe(batch: list):
+        nonlocal last_monitor_ts
+        metrics.inc("pipeline_items_total", len(batch), stage="market", outcome="price")
+        for tick in batch:
+            latest[tick.ticker] = tick.price
+            fresh.add(tick.ticker)
+        print(f"  [MARKET] {len(batch)} ticks: " + ", ".join(f"{t} {p:.6g}" for t, p in sorted(latest.items())), flush=True)
+
+        newest = max(tick.timestamp for tick in batch)
+        if newest - last_monitor_ts >= MONITOR_EVERY_S and fresh.issuperset(source.tickers):
+            last_monitor_ts = newest
+            fresh.clear()
+            if monitor.update(latest, newest):
+                snapshot = monitor.snapshot()
+                storage.set_snapshot("cross_asset", snapshot)
+                for cluster in snapshot["clusters"]:
+                    print(f"  [CO-MOVE] {cluster['moves_z']}", flush=True)
+                for b in snapshot["breaks"]:
+                    print(f"  [CORR BREAK] {b['pair'][0]}/{b['pair'][1]}: {b['baseline']} -> {b['recent']}", flush=True)
+
+    async def persist(batch: list):
+        """
+        Stores, then publishes the batch, retrying each step until it succeeds
+        (so a stored batch is never stored twice). Meanwhile ticks pile up in
+        the bounded queue and then hold the source back.
+        """
+        for step in (store, publish):
+            delay = RETRY_S
+            while True:
+                worker_entry.begin(len(batch))
+                try:
+                    # SQLite and Redis are blocking; ticks keep queueing while the batch is written
+                    await asyncio.to_thread(step, batch)
+                    break
+                except Exception as e:
+                    print(f"Market Worker Error ({step.__name__}, retrying {len(batch)} ticks in {delay}s): {e}", flush=True)
+                    worker_entry.error(e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_S)
+        try:
+            await asyncio.to_thread(observe, batch)
         except Exception as e:
             print(f"Market Worker Error: {e}", flush=True)
-            time.sleep(10)
+            worker_entry.error(e)
+            return
+        worker_entry.done()
+
+    async def consume():
+        queue = asyncio.Queue(maxsize=MAX_PENDING_TICKS)
+        pump = asyncio.create_task(_pump(source, queue, SOURCE_RESTART_S))
+        try:
+            while True:
+                await persist(await _next_batch(queue, FLUSH_MS / 1000, MAX_BATCH))
+        finally:
+            pump.cancel()
+
+    asyncio.run(consume())
 
 if __name__ == "__main__":
     run_market_worker()
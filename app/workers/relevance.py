@@ -1,26 +1,106 @@
+import os
 import time
 from app.storage.dedup import NewsStorage
+from app.ai.fused import FusedAnalyzer
 from app.ai.relevance import RelevanceFilter
+from app.ai.breaker import llm_breaker
+from app.ai.heuristics import HeuristicAnalyzer
 from app.runtime import heartbeat_sleep
+from app.metrics import metrics
+from app.registry import WorkerEntry
 
-def run_relevance_worker():
+def _next_task(task: dict) -> dict:
+    """Carry the priority fields on to the next queue, with a fresh attempt count."""
+    return {k: v for k, v in task.items() if k != "attempts"}
+
+def _retry_or_fail(storage: NewsStorage, task: dict, max_attempts: int):
+    """Re-queue a headline the model gave no answer for, or mark it failed after `max_attempts`."""
+    h = task['title']
+    if not llm_breaker.is_closed():
+        # The API is down, not this headline: requeue it without using up an attempt
+        storage.push_to_queue("relevance", task)
+        print(f"Status: REQUEUED (LLM circuit open) - {h}", flush=True)
+        metrics.inc("pipeline_items_total", stage="relevance", outcome="requeued")
+    elif storage.retry_later("relevance", task, max_attempts):
+        print(f"Status: RETRY ({task.get('attempts', 0) + 1}/{max_attempts}) - {h}", flush=True)
+        metrics.inc("pipeline_items_total", stage="relevance", outcome="retried")
+    elif storage.transition([(storage.task_hash(task), "analyzing", "failed", None)]):
+        print(f"Status: FAILED - {h}", flush=True)
+        metrics.inc("pipeline_items_total", stage="relevance", outcome="failed")
+
+def _claim(storage: NewsStorage, tasks: list) -> list:
+    """
+    Moves a batch to "analyzing" in one transaction and keeps the tasks that
+    moved. Headlines already decided (e.g. a late requeue) and duplicates
+    within the batch are dropped.
+    """
+    claimed = storage.transition([(storage.task_hash(t), ("pending", "analyzing"), "analyzing", None) for t in tasks])
+    fresh = []
+    for task in tasks:
+        news_hash = storage.task_hash(task)
+        if news_hash in claimed:
+            claimed.discard(news_hash)
+            fresh.append(task)
+            print(f"Status: ANALYZING - {task['title']}", flush=True)
+        else:
+            print(f"Status: SKIPPED (already advanced) - {task['title']}", flush=True)
+            metrics.inc("pipeline_items_total", stage="relevance", outcome="skipped")
+    return fresh
+
+def _apply_decisions(storage: NewsStorage, stage: str, decisions: list):
+    """Applies (task, status, event, outcome) decisions for "analyzing" headlines in one transaction."""
+    applied = storage.transition([
+        (storage.task_hash(task), "analyzing", status, {"title": task['title'], "event": event} if event else None)
+        for task, status, event, _ in decisions
+    ])
+    for task, status, _, outcome in decisions:
+        h = task['title']
+        if storage.task_hash(task) not in applied:
+            print(f"Status: SKIPPED (already advanced) - {h}", flush=True)
+            metrics.inc("pipeline_items_total", stage=stage, outcome="skipped")
+            continue
+        print(f"Status: {status.upper()} - {h}", flush=True)
+        if status == "extracting":
+            storage.push_to_queue("extraction", _next_task(task))
+        metrics.inc("pipeline_items_total", stage=stage, outcome=outcome)
+
+def run_relevance_worker(storage: NewsStorage = None):
     BATCH_SIZE = 5
+    MAX_ATTEMPTS = 3
     IDLE_POLL_S = 2
     HEARTBEAT_EVERY_S = 60
 
-    storage = NewsStorage()
+    # "fused" asks for relevance and the event in one call and skips the extraction queue
+    fused = os.getenv("PIPELINE_MODE", "two-stage") == "fused"
+
+    storage = storage or NewsStorage()
     relevance_filter = None
+    analyzer = None
     
     try:
-        relevance_filter = RelevanceFilter()
+        if fused:
+            analyzer = FusedAnalyzer()
+        else:
+            relevance_filter = RelevanceFilter()
     except Exception as e:
         print(f"Filter Init Error: {e}")
         return
 
-    print("Relevance Worker started...")
+    heuristics = HeuristicAnalyzer()
+    metrics.start(storage.client, "relevance")
+    llm_breaker.attach(storage.client)
+    worker_entry = WorkerEntry.register(storage.client, "relevance")
+    print(f"Relevance Worker started ({'fused' if fused else 'two-stage'} mode)...")
 
     while True:
         try:
+            degraded = llm_breaker.is_open()
+            worker_entry.paused = degraded and not llm_breaker.heuristic
+            if degraded and not llm_breaker.heuristic:
+                # Leave headlines queued until the circuit half-opens
+                time.sleep(IDLE_POLL_S)
+                continue
+
             tasks = storage.pop_batch_from_queue("relevance", batch_size=BATCH_SIZE)
             if not tasks:
                 heartbeat_sleep(
@@ -34,27 +114,46 @@ def run_relevance_worker():
                 )
                 continue
             
+            tasks = _claim(storage, tasks)
+            # Only what this worker claimed counts towards its throughput, which the autoscaler sizes from
+            worker_entry.begin(len(tasks))
             headlines = [t['title'] for t in tasks]
-            for h in headlines:
-                storage.save_headline(h, status="analyzing")
-                print(f"Status: ANALYZING - {h}", flush=True)
+            decisions = []
 
-            if headlines:
-                print(f"Processing batch of {len(headlines)} relevance checks...", flush=True)
-                results = relevance_filter.is_relevant_batch(headlines)
+            if headlines and fused:
+                print(f"Processing batch of {len(headlines)} fused analyses...", flush=True)
+                results = (heuristics if degraded else analyzer).analyze_batch(headlines)
+                storage.record_stage(tasks, "decided")
                 
-                for i, is_relevant in enumerate(results):
-                    h = headlines[i]
-                    if is_relevant:
-                        storage.save_headline(h, status="extracting")
-                        print(f"Status: EXTRACTING - {h}", flush=True)
-                        storage.push_to_queue("extraction", {"title": h})
+                for task, result in zip(tasks, results):
+                    if result is None:
+                        _retry_or_fail(storage, task, MAX_ATTEMPTS)
+                    elif result["relevant"] and result["event"]:
+                        decisions.append((task, "relevant", result["event"], "extracted"))
+                    elif result["relevant"]:
+                        # Relevant but no usable event: let the extraction worker retry it
+                        decisions.append((task, "extracting", None, "relevant"))
                     else:
-                        storage.save_headline(h, status="ignored")
-                        print(f"Status: IGNORED - {h}", flush=True)
+                        decisions.append((task, "ignored", None, "ignored"))
+                _apply_decisions(storage, "fused", decisions)
+
+            elif headlines:
+                print(f"Processing batch of {len(headlines)} relevance checks...", flush=True)
+                results = (heuristics if degraded else relevance_filter).is_relevant_batch(headlines)
                 
+                for task, is_relevant in zip(tasks, results):
+                    if is_relevant is None:
+                        _retry_or_fail(storage, task, MAX_ATTEMPTS)
+                    elif is_relevant:
+                        decisions.append((task, "extracting", None, "relevant"))
+                    else:
+                        decisions.append((task, "ignored", None, "ignored"))
+                _apply_decisions(storage, "relevance", decisions)
+            worker_entry.done()
+
         except Exception as e:
             print(f"Relevance Worker Error: {e}", flush=True)
+            worker_entry.error(e)
             time.sleep(5)
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+import time
+from app.storage.dedup import NewsStorage
+from app.storage.writer import SQLiteWriter
+from app.runtime import wait_for
+from app.metrics import metrics
+from app.registry import WorkerEntry
+
+def run_sqlite_writer(storage: NewsStorage = None):
+    REDIS_CONNECT_ATTEMPTS = 5
+    REDIS_CONNECT_DELAY_S = 2
+
+    storage = storage or NewsStorage()
+    wait_for(
+        storage.ping,
+        attempts=REDIS_CONNECT_ATTEMPTS,
+        delay_s=REDIS_CONNECT_DELAY_S,
+        on_retry=lambda i, e: None,
+    )
+    writer = SQLiteWriter(storage.client)
+
+    metrics.start(storage.client, "sqlite-writer")
+    worker_entry = WorkerEntry.register(storage.client, "sqlite-writer")
+    print(f"SQLite Writer started (flush every {writer.flush_s * 1000:g}ms or {writer.max_batch} writes)...", flush=True)
+
+    while True:
+        try:
+            group = writer.next_group()
+            if group:
+                worker_entry.begin(len(group))
+                writer.process(group)
+                worker_entry.done()
+        except Exception as e:
+            print(f"SQLite Writer Error: {e}", flush=True)
+            worker_entry.error(e)
+            time.sleep(1)
+
+if __name__ == "__main__":
+    run_sqlite_writer()